@@ -0,0 +1,114 @@
+"""
+Compare exact LOF with the subsampled reference LOF (approx_lof.py): fit and
+score time as the number of claims grows, and how closely the rankings agree
+with exact LOF, both for the LOF score alone and for AnomalyDetector's
+combined IsolationForest + LOF score.
+
+Usage: python bench_approx_lof.py [max_rows] [max_samples] [n_estimators]
+
+Rows are the engineered features of generated claims (feature store path),
+so the benchmark runs on realistic feature distributions. As a noise floor,
+the last line compares exact LOF at n_neighbors=10 with n_neighbors=20.
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+from sklearn.preprocessing import minmax_scale
+
+from fraud_detection_agent.database.db_setup import stream_claims_to_db
+from fraud_detection_agent.models.approx_lof import SubsampledLOF
+from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+from fraud_detection_agent.preprocessing.feature_store import update_feature_store
+
+_FEATURE_QUERY = """
+    SELECT f.claim_amount, f.length_of_stay, h.amount_sum / h.claim_count AS avg_claim_per_hospital,
+           c.claim_frequency_per_month, c.procedure_cost_deviation, c.patient_repeat_ratio
+    FROM claim_facts AS f
+    JOIN fs_claim_features AS c ON c.claim_key = f.claim_key
+    JOIN fs_hospital AS h ON h.hospital_key = f.hospital_key
+    ORDER BY f.claim_key
+"""
+
+
+def load_features(n_rows: int) -> np.ndarray:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "claims.db"
+        stream_claims_to_db(n_rows, db_path=db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            update_feature_store(conn)
+            df = pd.read_sql_query(_FEATURE_QUERY, conn)
+        finally:
+            conn.close()
+    amount = df.pop("claim_amount")
+    df.insert(0, "claim_amount_norm", (amount - amount.min()) / (amount.max() - amount.min()))
+    return df[TARGET_FEATURE_COLUMNS].to_numpy(dtype=float)
+
+
+def top_overlap(a: np.ndarray, b: np.ndarray, frac: float = 0.1) -> float:
+    k = max(1, int(len(a) * frac))
+    return len(np.intersect1d(np.argpartition(a, -k)[-k:], np.argpartition(b, -k)[-k:])) / k
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    return pd.Series(a).rank().corr(pd.Series(b).rank())
+
+
+def combined(if_scores: np.ndarray, lof_scores: np.ndarray) -> np.ndarray:
+    # AnomalyDetector's combination: average of the MinMax-scaled scores
+    return (minmax_scale(if_scores) + minmax_scale(lof_scores)) / 2.0
+
+
+def main() -> None:
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    max_samples = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    n_estimators = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    X_all = load_features(max_rows)
+    rng = np.random.default_rng(0)
+    new_rows = X_all[rng.choice(len(X_all), 10_000, replace=False)]
+    print(f"LOF n_neighbors=20; approximate: max_samples={max_samples:,}, n_estimators={n_estimators}\n")
+    print(f"{'rows':>9} | {'exact fit':>9} {'approx fit':>10} {'speedup':>7} | "
+          f"{'LOF rho':>7} {'top-10%':>7} | {'combined rho':>12} {'top-10%':>7} | {'score 10k new':>13}")
+
+    n = 25_000
+    while n <= len(X_all):
+        X = X_all[:n]
+        start = time.perf_counter()
+        exact = LocalOutlierFactor(n_neighbors=20, novelty=True, n_jobs=-1).fit(X)
+        exact_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        approx = SubsampledLOF(max_samples=max_samples, n_estimators=n_estimators, n_jobs=-1, random_state=42).fit(X)
+        approx_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        approx.score_samples(new_rows)
+        score_time = time.perf_counter() - start
+
+        exact_scores = -exact.negative_outlier_factor_
+        approx_scores = -approx.negative_outlier_factor_
+        if_scores = -IsolationForest(n_estimators=200, random_state=42, n_jobs=-1).fit(X).decision_function(X)
+        exact_combined = combined(if_scores, exact_scores)
+        approx_combined = combined(if_scores, approx_scores)
+        print(f"{n:>9,} | {exact_time:>8.2f}s {approx_time:>9.2f}s {exact_time / approx_time:>6.1f}x | "
+              f"{spearman(exact_scores, approx_scores):>7.3f} {top_overlap(exact_scores, approx_scores):>7.1%} | "
+              f"{spearman(exact_combined, approx_combined):>12.3f} {top_overlap(exact_combined, approx_combined):>7.1%} | "
+              f"{score_time:>12.3f}s")
+        n *= 2
+
+    k10_scores = -LocalOutlierFactor(n_neighbors=10, novelty=True, n_jobs=-1).fit(X).negative_outlier_factor_
+    print(f"\nnoise floor, exact LOF k=10 vs k=20 on {len(X):,} rows: "
+          f"rho {spearman(exact_scores, k10_scores):.3f}, top-10% {top_overlap(exact_scores, k10_scores):.1%}; "
+          f"combined rho {spearman(exact_combined, combined(if_scores, k10_scores)):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark near-duplicate claim detection (scoring/duplicates.py): one-shot
+and incremental indexing time as claims grow, agreement of the incremental
+index with the one-shot pass, a check against an exhaustive join on a
+sample, and precision / recall on the planted ``DUP_`` claims.
+
+Usage: python bench_duplicates.py [max_rows] [batch_rows]
+
+Rows are generated claims (``_inject_fraud_patterns`` plants ~5% exact
+duplicates). Sizes double from 125k up to ``max_rows``.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from fraud_detection_agent.database.db_setup import _build_hospital_master, _generate_claim_chunk
+from fraud_detection_agent.scoring.duplicates import (
+    DUPLICATE_BLOCK_COLUMNS,
+    DuplicateIndex,
+)
+
+
+def make_claims(n_rows: int) -> pd.DataFrame:
+    master = _build_hospital_master(np.random.default_rng(42))
+    return _generate_claim_chunk((1, n_rows, np.random.SeedSequence(7), master, None))
+
+
+def exhaustive_duplicates(df: pd.DataFrame, index: DuplicateIndex) -> np.ndarray:
+    """
+    Every pair sharing the block columns, filtered by the tolerances, then
+    clustered: a claim is a duplicate when it is not its cluster's first.
+    """
+    left = df[DUPLICATE_BLOCK_COLUMNS + ["admission_date", "claim_amount"]].reset_index(names="row")
+    pairs = left.merge(left, on=DUPLICATE_BLOCK_COLUMNS, suffixes=("_a", "_b"))
+    pairs = pairs[pairs["row_a"] < pairs["row_b"]]
+    days = (pd.to_datetime(pairs["admission_date_a"]) - pd.to_datetime(pairs["admission_date_b"])).dt.days.abs()
+    a, b = pairs["claim_amount_a"].to_numpy(), pairs["claim_amount_b"].to_numpy()
+    amount_ok = np.abs(a - b) <= index.amount_tolerance * np.maximum(np.abs(a), np.abs(b))
+    pairs = pairs[(days.to_numpy() <= index.date_tolerance_days) & amount_ok]
+    n = len(df)
+    graph = coo_matrix((np.ones(len(pairs)), (pairs["row_a"], pairs["row_b"])), shape=(n, n))
+    _, component = connected_components(graph, directed=False)
+    first = np.full(component.max() + 1, n)
+    np.minimum.at(first, component, np.arange(n))
+    return first[component] < np.arange(n)
+
+
+def main() -> None:
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    batch_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+
+    sample = make_claims(20_000)
+    index = DuplicateIndex()
+    flags = index.add(sample).rule_duplicate
+    np.testing.assert_array_equal(flags, exhaustive_duplicates(sample, index))
+    print(f"{len(sample):,} claims: flags identical to the exhaustive join\n")
+
+    n_rows = 125_000
+    while n_rows <= max_rows:
+        df = make_claims(n_rows)
+        planted = df["claim_id"].str.startswith("DUP_").to_numpy()
+
+        start = time.perf_counter()
+        one_shot = DuplicateIndex()
+        result = one_shot.add(df)
+        t_one_shot = time.perf_counter() - start
+
+        start = time.perf_counter()
+        incremental = DuplicateIndex()
+        parts = [incremental.add(df.iloc[i:i + batch_rows]) for i in range(0, len(df), batch_rows)]
+        t_incremental = time.perf_counter() - start
+        flags = np.concatenate([p.rule_duplicate for p in parts])
+        np.testing.assert_array_equal(flags, result.rule_duplicate)
+        np.testing.assert_array_equal(incremental._clusters, one_shot._clusters)
+
+        new_claims = make_claims(1_000)
+        start = time.perf_counter()
+        incremental.match(new_claims)
+        t_match = time.perf_counter() - start
+
+        found = result.rule_duplicate
+        print(f"{len(df):>9,} claims  one-shot {t_one_shot:6.2f}s ({len(df) / t_one_shot / 1e6:4.2f}M/s)  "
+              f"incremental x{len(parts)} {t_incremental:6.2f}s  match 1k {t_match * 1000:6.1f} ms  "
+              f"index {one_shot.nbytes / 1e6:6.1f} MB")
+        print(f"{'':>17}precision {(found & planted).sum() / max(found.sum(), 1):.4f}  "
+              f"recall {(found & planted).sum() / max(planted.sum(), 1):.4f}  "
+              f"clusters {len(np.unique(result.cluster_id[result.cluster_id >= 0])):,}")
+        n_rows *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark incremental feature store refreshes against a full rebuild, and check
+the stored features against the pandas feature engine after several appends.
+
+Usage: python bench_feature_store.py [base_rows] [batch_rows] [n_batches]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.database.db_setup import (
+    _build_hospital_master,
+    _generate_claim_chunk,
+    append_claims,
+    stream_claims_to_db,
+)
+from fraud_detection_agent.preprocessing.feature_store import update_feature_store
+from fraud_detection_agent.preprocessing.preprocess import _add_derived_features
+
+STORED_FEATURES = [
+    "claim_frequency_per_month",
+    "district_proc_avg_cost",
+    "procedure_cost_deviation",
+    "patient_claim_count_hosp_month",
+    "patient_repeat_ratio",
+]
+
+
+def timed_update(db_path: Path, rebuild: bool = False) -> tuple:
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        folded = update_feature_store(conn, rebuild=rebuild)
+        return folded, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def check_against_pandas(db_path: Path) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        claims = pd.read_sql_query("SELECT * FROM claims", conn)
+        stored = pd.read_sql_query(
+            "SELECT * FROM fs_claim_features ORDER BY claim_key", conn
+        )
+        hospital_avg = pd.read_sql_query(
+            """
+            SELECT h.amount_sum / h.claim_count AS avg_claim_per_hospital
+            FROM claim_facts AS f JOIN fs_hospital AS h ON h.hospital_key = f.hospital_key
+            ORDER BY f.claim_key
+            """,
+            conn,
+        )
+    finally:
+        conn.close()
+    expected = _add_derived_features(claims)
+    for col in STORED_FEATURES:
+        np.testing.assert_allclose(stored[col].to_numpy(), expected[col].to_numpy(dtype=float), rtol=1e-9)
+    np.testing.assert_allclose(
+        hospital_avg["avg_claim_per_hospital"].to_numpy(), expected["avg_claim_per_hospital"].to_numpy(), rtol=1e-9
+    )
+    return len(claims)
+
+
+def main() -> None:
+    base_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    batch_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    n_batches = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "claims.db"
+        stream_claims_to_db(base_rows, db_path=db_path)
+
+        folded, elapsed = timed_update(db_path)
+        print(f"initial build   {folded:>9,} claims: {elapsed:7.3f}s")
+
+        master = _build_hospital_master(np.random.default_rng(42))
+        seeds = np.random.SeedSequence(7).spawn(n_batches)
+        next_index = base_rows + 1
+        for seed in seeds:
+            batch = _generate_claim_chunk((next_index, batch_rows, seed, master, None))
+            next_index += batch_rows
+            append_claims(batch, db_path=db_path)
+            folded, elapsed = timed_update(db_path)
+            print(f"incremental     {folded:>9,} claims: {elapsed:7.3f}s")
+
+        folded, elapsed = timed_update(db_path, rebuild=True)
+        print(f"full rebuild    {folded:>9,} claims: {elapsed:7.3f}s")
+
+        n = check_against_pandas(db_path)
+        print(f"\nStore matches pandas features on {n:,} claims (rtol 1e-9).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Precomputed filter indexes (scoring/filter_index.py) against the boolean-mask
+filtering the endpoints used before: index build time and memory, then
+per-request latency of a filtered slice, a suspicious top-k
+(``/get-claim-anomalies``) and a state / district top-k by risk
+(``/get-claims-search``) on synthetic claims at several sizes, checking both
+paths return the same rows (ties in risk broken by row order).
+
+Usage: python bench_filter_index.py [claim_counts] [n_requests]
+
+``claim_counts`` is comma separated (default 30000,300000,3000000).
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.scoring.filter_index import FilterIndex
+
+HOSPITAL_TYPES = ["Government", "Private", "Teaching", "Trust"]
+LIMIT = 100
+
+
+def make_claims(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    n_states = 20
+    state = rng.integers(0, n_states, n)
+    district = state * 10 + rng.integers(0, 10, n)
+    return pd.DataFrame(
+        {
+            "hospital_type": np.array(HOSPITAL_TYPES)[rng.integers(0, 4, n)],
+            "state": np.char.add("State_", state.astype(str)),
+            "district": np.char.add("District_", district.astype(str)),
+            "risk_score": np.round(rng.random(n), 3),
+            "anomaly_label": (rng.random(n) < 0.05).astype(int),
+            "any_rule_flag": rng.random(n) < 0.1,
+        }
+    )
+
+
+def mask_filter(df: pd.DataFrame, hospital_type, state, district) -> pd.DataFrame:
+    if hospital_type:
+        df = df[df["hospital_type"] == hospital_type]
+    if state != "All":
+        df = df[df["state"] == state]
+    if district != "All":
+        df = df[df["district"] == district]
+    return df
+
+
+def mask_anomalies(df, hospital_type, state, district, kind="quicksort"):
+    df = mask_filter(df, hospital_type, state, district)
+    df = df[(df["anomaly_label"] == 1) | df["any_rule_flag"]]
+    return df.sort_values(by="risk_score", ascending=False, kind=kind).head(LIMIT)
+
+
+def index_anomalies(df, index, hospital_type, state, district):
+    return df.take(index.top_suspicious(LIMIT, hospital_type=hospital_type, state=state, district=district))
+
+
+def mask_search(df, hospital_type, state, district, kind="quicksort"):
+    df = mask_filter(df, None, state, district)
+    return df.sort_values(by="risk_score", ascending=False, kind=kind).head(LIMIT)
+
+
+def index_search(df, index, hospital_type, state, district):
+    return df.take(index.top(LIMIT, index.positions(state=state, district=district)))
+
+
+def index_slice(df, index, hospital_type, state, district):
+    return index.select(df, hospital_type=hospital_type, state=state, district=district)
+
+
+def p50_ms(fn, requests) -> float:
+    latencies = []
+    for request in requests:
+        start = time.perf_counter()
+        fn(*request)
+        latencies.append(time.perf_counter() - start)
+    return float(np.percentile(latencies, 50)) * 1000
+
+
+def main() -> None:
+    sizes = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [30_000, 300_000, 3_000_000]
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = np.random.default_rng(5)
+
+    for n in sizes:
+        df = make_claims(n, rng)
+        start = time.perf_counter()
+        suspicious = (df["anomaly_label"] == 1).to_numpy() | df["any_rule_flag"].to_numpy()
+        index = FilterIndex(df, suspicious=suspicious)
+        t_build = time.perf_counter() - start
+
+        # Dashboard-like mix: national, a type, a state, a district, combinations
+        requests = []
+        for _ in range(n_requests):
+            district = f"District_{rng.integers(0, 200)}"
+            state = f"State_{int(district.split('_')[1]) // 10}"
+            requests.append(
+                [
+                    (None, "All", "All"),
+                    (str(rng.choice(HOSPITAL_TYPES)), "All", "All"),
+                    (None, state, "All"),
+                    (None, state, district),
+                    (str(rng.choice(HOSPITAL_TYPES)), state, district),
+                ][rng.integers(0, 5)]
+            )
+
+        # The index breaks risk ties by row order; sort_values' default
+        # quicksort leaves them arbitrary, so compare with a stable sort
+        for request in requests[:20]:
+            pd.testing.assert_frame_equal(
+                index_anomalies(df, index, *request), mask_anomalies(df, *request, kind="stable")
+            )
+            pd.testing.assert_frame_equal(index_search(df, index, *request), mask_search(df, *request, kind="stable"))
+            pd.testing.assert_frame_equal(index_slice(df, index, *request), mask_filter(df, *request))
+
+        print(f"{n:,} claims: index build {t_build * 1000:.0f} ms, {index.nbytes / 1e6:.1f} MB "
+              f"(frame {df.memory_usage(deep=True).sum() / 1e6:.0f} MB); results identical to masks")
+        for name, mask_fn, index_fn in (
+            ("filtered slice", mask_filter, index_slice),
+            ("suspicious top-k", mask_anomalies, index_anomalies),
+            ("search top-k", mask_search, index_search),
+        ):
+            t_mask = p50_ms(lambda *r: mask_fn(df, *r), requests)
+            t_index = p50_ms(lambda *r: index_fn(df, index, *r), requests)
+            print(f"  {name:<17} masks p50 {t_mask:8.2f} ms   index p50 {t_index:7.2f} ms   "
+                  f"x{t_mask / max(t_index, 1e-9):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark the batched mock claims generator against the row-by-row reference.
+
+Usage: python bench_mock_claims.py [max_rows]
+"""
+import sys
+import time
+
+import numpy as np
+
+from fraud_detection_agent.database.db_setup import (
+    _build_hospital_master,
+    _build_procedure_table,
+    _draw_claims_batched,
+    _draw_claims_loop,
+    generate_mock_claims,
+)
+
+
+def rows_per_second(n_rows: int, batched: bool) -> float:
+    start = time.perf_counter()
+    generate_mock_claims(n_rows=n_rows, batched=batched)
+    return n_rows / (time.perf_counter() - start)
+
+
+def compare_distributions(n_rows: int = 5000, random_state: int = 42) -> None:
+    """
+    Compare per-column distributions (before fraud injection) for the same seed.
+    """
+    frames = {}
+    for name, draw in (("loop", _draw_claims_loop), ("batched", _draw_claims_batched)):
+        rng = np.random.default_rng(random_state)
+        master = _build_hospital_master(rng)
+        frames[name] = draw(n_rows, rng, master, _build_procedure_table())
+
+    loop_df, batched_df = frames["loop"], frames["batched"]
+    print(f"\nDistribution check ({n_rows} rows, seed {random_state}, pre-injection)")
+    for col in ("claim_amount", "length_of_stay"):
+        print(
+            f"  {col:16} mean loop={loop_df[col].mean():10.2f} batched={batched_df[col].mean():10.2f} | "
+            f"std loop={loop_df[col].std():10.2f} batched={batched_df[col].std():10.2f}"
+        )
+    for col in ("hospital_type", "state"):
+        shares = (
+            loop_df[col].value_counts(normalize=True).rename("loop").to_frame()
+            .join(batched_df[col].value_counts(normalize=True).rename("batched"))
+        )
+        max_gap = float((shares["loop"] - shares["batched"]).abs().max())
+        print(f"  {col:16} max share difference = {max_gap:.4f}")
+
+
+def main() -> None:
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    print("Mock claims generator throughput (rows/second)")
+    print("-" * 60)
+    loop_rows = 3000
+    loop_rate = rows_per_second(loop_rows, batched=False)
+    print(f"loop     n={loop_rows:>9,}: {loop_rate:>14,.0f} rows/s")
+
+    sizes = [n for n in (30_000, 300_000) if n < max_rows] + [max_rows]
+    for n in sizes:
+        rate = rows_per_second(n, batched=True)
+        print(f"batched  n={n:>9,}: {rate:>14,.0f} rows/s  ({rate / loop_rate:,.0f}x loop)")
+
+    compare_distributions()
+
+
+if __name__ == "__main__":
+    main()
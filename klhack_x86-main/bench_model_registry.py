@@ -0,0 +1,47 @@
+"""
+Time a cold AnomalyDetector fit against loading the same model from the
+registry, and check the loaded scores match the fitted ones.
+
+Usage: python bench_model_registry.py
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from fraud_detection_agent.models.registry import ModelRegistry, dataset_fingerprint, fit_or_load
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector
+from fraud_detection_agent.preprocessing.preprocess import build_features_from_db
+
+
+def main() -> None:
+    data = build_features_from_db()
+    X = data.features
+
+    start = time.perf_counter()
+    fingerprint = dataset_fingerprint(X, AnomalyDetector())
+    print(f"fingerprint of {len(X):,} x {X.shape[1]} features: {time.perf_counter() - start:.3f}s ({fingerprint[:12]})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(tmp, max_versions=2)
+        timings = {}
+        outputs = {}
+        for attempt in ("cold", "warm"):
+            start = time.perf_counter()
+            _, results, meta = fit_or_load(X, data.scaler_claim_amount, registry=registry)
+            timings[attempt] = time.perf_counter() - start
+            outputs[attempt] = results
+            print(f"{attempt}: {meta['source']:8} {timings[attempt]:7.3f}s")
+        print(f"restart speedup {timings['cold'] / timings['warm']:.0f}x")
+        np.testing.assert_array_equal(outputs["cold"].combined_score, outputs["warm"].combined_score)
+
+        # Retention: changed data creates new versions, only max_versions survive
+        for k in range(3):
+            fit_or_load(X.assign(length_of_stay=X["length_of_stay"] + k + 1), registry=registry)
+        versions = registry.list_versions()
+        print(f"versions kept after 4 distinct fits: {len(versions)} (max_versions=2)")
+        print(f"newest metadata: fit {versions[0]['fit_seconds']:.2f}s, metrics {versions[0]['metrics']}")
+
+
+if __name__ == "__main__":
+    main()
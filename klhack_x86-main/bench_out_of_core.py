@@ -0,0 +1,98 @@
+"""
+Benchmark the out-of-core pipeline (chunked scoring into claim_results) and
+compare it with the in-memory pipeline.
+
+Usage: python bench_out_of_core.py [n_rows] [chunk_size] [sample_size]
+
+The database is generated in a child process so the reported peak RSS is the
+scoring run's own. It includes SQLite's memory-mapped database pages (capped
+at 256 MB by the pool's mmap_size), which are file-backed and reclaimable.
+"""
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.scoring.out_of_core import RESULTS_VIEW, run_out_of_core_pipeline
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_db(n_rows: int, db_path: Path) -> None:
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from fraud_detection_agent.database.db_setup import stream_claims_to_db; "
+            "stream_claims_to_db(int(sys.argv[1]), db_path=sys.argv[2])",
+            str(n_rows),
+            str(db_path),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def compare_with_memory_pipeline(db_path: Path) -> None:
+    """
+    Run the in-memory scoring on the same claims and compare flags and risk ranking.
+    """
+    from fraud_detection_agent.models.anomaly_model import AnomalyDetector
+    from fraud_detection_agent.preprocessing.preprocess import _add_derived_features, _normalize_claim_amount
+    from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+    from fraud_detection_agent.scoring.risk_scoring import apply_rule_based_flags, compute_risk_scores
+
+    conn = sqlite3.connect(db_path)
+    claims = pd.read_sql_query("SELECT * FROM claims", conn)
+    results = pd.read_sql_query(f"SELECT * FROM {RESULTS_VIEW}", conn)
+    conn.close()
+
+    df, _ = _normalize_claim_amount(claims.assign(claim_amount=claims["claim_amount"].astype(float)))
+    df = _add_derived_features(df)
+    scores = AnomalyDetector().fit_predict(df[TARGET_FEATURE_COLUMNS].fillna(0.0)).combined_score
+    df["anomaly_label"] = (scores > 0.7).astype(int)
+    df = apply_rule_based_flags(compute_risk_scores(df, scores))
+
+    merged = df.merge(results, on="claim_id", suffixes=("", "_ooc"))
+    for rule in ("rule_upcoding", "rule_ghost_billing", "rule_claim_surge"):
+        agree = (merged[rule].astype(bool) == merged[f"{rule}_ooc"].astype(bool)).mean()
+        print(f"  {rule:20} agreement {agree:.4%}")
+    rho = merged["risk_score"].rank().corr(merged["risk_score_ooc"].rank())
+    top_mem = set(merged.nlargest(len(merged) // 10, "risk_score")["claim_id"])
+    top_ooc = set(merged.nlargest(len(merged) // 10, "risk_score_ooc")["claim_id"])
+    print(f"  risk_score Spearman {rho:.4f}, top-10% overlap {len(top_mem & top_ooc) / len(top_mem):.2%}")
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    sample_size = int(sys.argv[3]) if len(sys.argv) > 3 else 50_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "claims.db"
+        build_db(n_rows, db_path)
+
+        start = time.perf_counter()
+        run = run_out_of_core_pipeline(chunk_size=chunk_size, sample_size=sample_size, db_path=db_path)
+        elapsed = time.perf_counter() - start
+        print(f"out-of-core: {run['n_claims']:,} claims in {elapsed:.1f}s "
+              f"({run['n_claims'] / elapsed:,.0f} claims/s), peak RSS {peak_rss_mb():,.0f} MB")
+        for stage, seconds in run["timings"].items():
+            print(f"  {stage:14} {seconds:7.2f}s")
+
+        if n_rows <= 100_000:
+            print("\nAgreement with the in-memory pipeline:")
+            compare_with_memory_pipeline(db_path)
+
+
+if __name__ == "__main__":
+    np.set_printoptions(precision=4)
+    main()
@@ -0,0 +1,78 @@
+"""
+Compute-once pipeline cache: cost of the national build, of a focused view
+(hospital type) on a miss and on a hit, LRU bounding, and invalidation on a
+claims data version change and on an explicit invalidate, against the app's
+own database (inline builds, no background retrainer, no snapshots written).
+
+Usage: python bench_result_cache.py [n_requests]
+"""
+import os
+import sys
+import time
+
+os.environ["BACKGROUND_RETRAIN"] = "0"
+
+import numpy as np
+
+from fraud_detection_agent import main
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def view(focus):
+    return main.run_full_pipeline(focus_hospital_type=focus, persist_snapshot=False)
+
+
+def main_bench() -> None:
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    t_build, national = timed(view, None)
+    types = sorted(str(t) for t in national["claims_all"]["hospital_type"].dropna().unique())
+    focuses = [None] + types
+    print(f"national build ({len(national['claims_all']):,} claims): {t_build:.2f}s")
+
+    for focus in types:
+        t_view, output = timed(view, focus)
+        print(f"  first view hospital_type={focus:<12} {t_view * 1000:7.1f} ms  ({len(output['claims']):,} claims)")
+    print(f"  per-focus full reruns would cost ~{t_build * len(types):.1f}s for these {len(types)} views")
+
+    rng = np.random.default_rng(0)
+    latencies = [timed(view, focuses[i])[0] for i in rng.integers(0, len(focuses), n_requests)]
+    print(f"{n_requests} mixed focus requests (hits): p50 {np.percentile(latencies, 50) * 1e6:.0f} us, "
+          f"max {max(latencies) * 1e6:.0f} us")
+    print(f"  {main._view_cache.stats()}")
+
+    # Bounded: with room for two views, cycling through all of them evicts
+    main._view_cache.max_entries = 2
+    main._view_cache.invalidate()
+    for focus in focuses * 2:
+        view(focus)
+    print(f"capacity 2, cycling {len(focuses)} focuses twice: {main._view_cache.stats()}")
+    main._view_cache.max_entries = main.PIPELINE_CACHE_SIZE
+
+    # A claims data version change is picked up at the next check
+    real_version = main._claims_data_version
+    main.PIPELINE_CACHE_CHECK_SECONDS = 0.0
+    main._claims_data_version = lambda: real_version() + ":changed"
+    before = national["claims_all"]
+    t_rebuild, rebuilt = timed(view, None)
+    assert rebuilt["claims_all"] is not before
+    t_hit, again = timed(view, None)
+    assert again is rebuilt
+    print(f"data version changed: next request rebuilt in {t_rebuild:.2f}s, then hit (checking the "
+          f"version every request) in {t_hit * 1e6:.0f} us; "
+          f"{main._view_cache.stats()}")
+    main._claims_data_version = real_version
+
+    main.invalidate_pipeline_cache()
+    print(f"after invalidate: {main._view_cache.stats()['entries']} views cached")
+    t_rebuild, _ = timed(view, None)
+    print(f"  next request rebuilt in {t_rebuild:.2f}s")
+
+
+if __name__ == "__main__":
+    main_bench()
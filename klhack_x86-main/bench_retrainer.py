@@ -0,0 +1,70 @@
+"""
+Request latency while the pipeline is rebuilt in the background
+(``RetrainingService``) versus the inline refresh it replaces, against the
+app's own database. Models go to a throwaway registry so every build is a
+real refit.
+
+Usage: python bench_retrainer.py [n_requests]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REGISTRY_DIR = tempfile.mkdtemp(prefix="bench_registry_")
+os.environ["MODEL_REGISTRY_DIR"] = REGISTRY_DIR
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from fraud_detection_agent import main
+
+
+def summary_latency(client: TestClient) -> float:
+    start = time.perf_counter()
+    response = client.get("/get-summary")
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def clear_registry() -> None:
+    shutil.rmtree(REGISTRY_DIR, ignore_errors=True)
+
+
+def main_bench() -> None:
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    # Inline: the request that misses the cache pays for the whole build
+    clear_registry()
+    start = time.perf_counter()
+    main.run_full_pipeline(persist_snapshot=False, force_refresh=True)
+    print(f"inline refresh on the request path: {time.perf_counter() - start:6.2f}s")
+
+    main.BACKGROUND_RETRAIN = True
+    clear_registry()
+    with TestClient(main.app) as client:
+        start = time.perf_counter()
+        summary_latency(client)
+        print(f"first request (waits for build 1):  {time.perf_counter() - start:6.2f}s")
+
+        clear_registry()
+        client.post("/rebuild-pipeline").raise_for_status()
+        latencies, versions = [], []
+        while len(latencies) < n_requests or main._retrainer.status()["building"]:
+            latencies.append(summary_latency(client))
+            versions.append(client.get("/get-pipeline-status").json()["version"])
+        status = client.get("/get-pipeline-status").json()
+    clear_registry()
+
+    lat_ms = np.array(latencies) * 1000
+    swap = next((i for i, v in enumerate(versions) if v != versions[0]), None)
+    print(f"{len(lat_ms)} /get-summary requests during a background rebuild:")
+    print(f"  p50 {np.percentile(lat_ms, 50):7.1f} ms  p99 {np.percentile(lat_ms, 99):7.1f} ms  "
+          f"max {lat_ms.max():7.1f} ms")
+    print(f"  served version {versions[0]} until request {swap}, then {versions[-1]}")
+    print(f"  build {status['version']}: {status['build_seconds']:.2f}s ({status['reason']})")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,142 @@
+"""
+Benchmark the columnar risk scoring kernel (compute_risk_scores /
+aggregate_hospital_risk) against the per-row implementation it replaced,
+which is kept below as the reference, and check the outputs are identical.
+
+Usage: python bench_risk_kernel.py [n_rows] [repeats]
+
+Rows are generated claims with synthetic feature and anomaly columns,
+spread over the generated hospitals.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.database.db_setup import _build_hospital_master
+from fraud_detection_agent.scoring.risk_scoring import (
+    RISK_CATEGORIES,
+    RiskConfig,
+    aggregate_hospital_risk,
+    compute_risk_scores,
+)
+
+
+def reference_scale_series(series: pd.Series) -> pd.Series:
+    scaler = MinMaxScaler()
+    reshaped = series.fillna(0.0).to_numpy(dtype=float).reshape(-1, 1)
+    if reshaped.shape[0] <= 1:
+        return pd.Series(np.zeros_like(reshaped.squeeze()), index=series.index)
+    return pd.Series(scaler.fit_transform(reshaped).squeeze(), index=series.index)
+
+
+def reference_compute_risk_scores(df: pd.DataFrame, anomaly_scores: np.ndarray) -> pd.DataFrame:
+    config = RiskConfig()
+    df = df.copy()
+    df["anomaly_score"] = anomaly_scores
+    df["anomaly_score_scaled"] = reference_scale_series(df["anomaly_score"])
+    df["procedure_cost_deviation_scaled"] = reference_scale_series(df["procedure_cost_deviation"])
+    df["claim_frequency_scaled"] = reference_scale_series(df["claim_frequency_per_month"])
+    df["risk_score_raw"] = (
+        config.w_anomaly * df["anomaly_score_scaled"]
+        + config.w_proc_dev * df["procedure_cost_deviation_scaled"]
+        + config.w_claim_freq * df["claim_frequency_scaled"]
+    )
+    df["risk_score"] = (df["risk_score_raw"].clip(0, 1) ** 0.7 * 100).clip(0, 100)
+    scores = df["risk_score"].fillna(0.0)
+    q_low, q_med = scores.quantile(0.5), scores.quantile(0.85)
+
+    def categorize(score: float) -> str:
+        if score <= q_low:
+            return "Low"
+        if score <= q_med:
+            return "Medium"
+        return "High"
+
+    df["risk_category"] = pd.Categorical(scores.apply(categorize), categories=RISK_CATEGORIES)
+    return df
+
+
+def reference_aggregate_hospital_risk(df: pd.DataFrame) -> pd.DataFrame:
+    agg = (
+        df.groupby(["hospital_id", "hospital_name", "state", "district", "hospital_type"], observed=True)
+        .agg(
+            total_claims=("claim_id", "count"),
+            avg_risk_score=("risk_score", "mean"),
+            high_risk_claims=("risk_category", lambda s: (s == "High").sum()),
+            suspicious_claims=("anomaly_label", lambda s: (s == 1).sum()),
+            any_rule_flags=("any_rule_flag", "sum"),
+        )
+        .reset_index()
+    )
+    agg["audit_priority_score"] = (
+        agg["avg_risk_score"] + (agg["any_rule_flags"] / agg["total_claims"]) * 100
+    ).clip(0, 100)
+    scores = agg["audit_priority_score"].fillna(0.0)
+    q_low, q_med = scores.quantile(0.5), scores.quantile(0.8)
+
+    def categorize_hospital(score: float) -> str:
+        if score <= q_low:
+            return "Low"
+        if score <= q_med:
+            return "Medium"
+        return "High"
+
+    agg["risk_category_overall"] = pd.Categorical(scores.apply(categorize_hospital), categories=RISK_CATEGORIES)
+    return agg
+
+
+def make_claims(n_rows: int, categorical: bool) -> tuple:
+    rng = np.random.default_rng(7)
+    master = _build_hospital_master(np.random.default_rng(42)).reset_index()
+    hospitals = master.iloc[rng.integers(0, len(master), n_rows)].reset_index(drop=True)
+    df = hospitals[["hospital_id", "hospital_name", "state", "district", "hospital_type"]].copy()
+    if categorical:
+        df = df.astype("category")
+    df["claim_id"] = [f"C{i:08d}" for i in range(n_rows)]
+    df["procedure_cost_deviation"] = rng.lognormal(0, 0.5, n_rows) - 1
+    df["claim_frequency_per_month"] = rng.poisson(30, n_rows).astype(float)
+    anomaly = rng.beta(2, 12, n_rows)
+    df["anomaly_label"] = (anomaly > 0.4).astype(np.int8)
+    df["any_rule_flag"] = rng.random(n_rows) < 0.05
+    return df, anomaly
+
+
+def best_of(repeats: int, fn, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    for categorical in (True, False):
+        df, anomaly = make_claims(n_rows, categorical)
+        t_ref, ref = best_of(repeats, reference_compute_risk_scores, df, anomaly)
+        t_new, new = best_of(repeats, compute_risk_scores, df, anomaly)
+        pd.testing.assert_frame_equal(new, ref, check_exact=True)
+
+        t_ref_agg, ref_agg = best_of(repeats, reference_aggregate_hospital_risk, ref)
+        t_new_agg, new_agg = best_of(repeats, aggregate_hospital_risk, new)
+        # The reference's lambda aggregates come back downcast to the input's
+        # int8 when the counts fit; the kernel always returns int64 counts.
+        pd.testing.assert_frame_equal(new_agg, ref_agg, check_exact=True, check_dtype=False)
+        pd.testing.assert_frame_equal(
+            new_agg.drop(columns="suspicious_claims"), ref_agg.drop(columns="suspicious_claims"), check_exact=True
+        )
+
+        labels = "categorical" if categorical else "string"
+        print(f"{n_rows:,} claims, {labels} hospital labels, {len(new_agg)} hospitals (outputs identical)")
+        print(f"  compute_risk_scores:     {t_ref:6.3f}s -> {t_new:6.3f}s  ({t_ref / t_new:4.1f}x)")
+        print(f"  aggregate_hospital_risk: {t_ref_agg:6.3f}s -> {t_new_agg:6.3f}s  ({t_ref_agg / t_new_agg:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark scoring new claims with the frozen model (``score_claim_records``)
+against refitting on the whole population, and check that batch features
+match what the feature store computes once the batch is actually appended.
+
+Usage: python bench_score_claims.py [base_rows] [sample_size]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.database.db_setup import (
+    _build_hospital_master,
+    _generate_claim_chunk,
+    append_claims,
+    stream_claims_to_db,
+)
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector
+from fraud_detection_agent.models.registry import ModelRegistry
+from fraud_detection_agent.preprocessing.feature_store import batch_features, update_feature_store
+from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+from fraud_detection_agent.scoring.batch_scoring import score_claim_records
+from fraud_detection_agent.scoring.out_of_core import run_out_of_core_pipeline
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+
+
+def new_claims(n_rows: int, first_index: int, seed: int) -> pd.DataFrame:
+    master = _build_hospital_master(np.random.default_rng(42))
+    return _generate_claim_chunk((first_index, n_rows, np.random.SeedSequence(seed), master, None))
+
+
+def check_features_as_appended(db_path: Path, batch: pd.DataFrame, scaler) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        predicted, _ = batch_features(conn, batch, scaler)
+    finally:
+        conn.close()
+    append_claims(batch, db_path=db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        update_feature_store(conn)
+        stored = pd.read_sql_query(
+            """
+            SELECT f.claim_id, c.*, h.amount_sum / h.claim_count AS avg_claim_per_hospital
+            FROM claim_facts AS f
+            JOIN fs_claim_features AS c ON c.claim_key = f.claim_key
+            JOIN fs_hospital AS h ON h.hospital_key = f.hospital_key
+            WHERE f.claim_key > (SELECT max(claim_key) FROM claim_facts) - ?
+            ORDER BY f.claim_key
+            """,
+            conn,
+            params=(len(batch),),
+        )
+    finally:
+        conn.close()
+    assert stored["claim_id"].tolist() == predicted["claim_id"].tolist()
+    for col in ["avg_claim_per_hospital", "claim_frequency_per_month", "district_proc_avg_cost",
+                "procedure_cost_deviation", "patient_claim_count_hosp_month", "patient_repeat_ratio"]:
+        np.testing.assert_allclose(predicted[col].to_numpy(dtype=float), stored[col].to_numpy(dtype=float), rtol=1e-9)
+
+
+def main() -> None:
+    base_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    sample_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "claims.db"
+        stream_claims_to_db(base_rows, db_path=db_path)
+        run = run_out_of_core_pipeline(
+            sample_size=sample_size, db_path=db_path, registry=ModelRegistry(Path(tmp) / "registry")
+        )
+        scorer = run["scorer"]
+        print(f"{run['n_claims']:,} stored claims, model fitted on {run['sample_size']:,} "
+              f"in {run['timings']['fit']:.2f}s")
+
+        conn = sqlite3.connect(db_path)
+        try:
+            for i, n in enumerate(BATCH_SIZES):
+                batch = new_claims(n, base_rows + 1, seed=100 + i)
+                start = time.perf_counter()
+                scored = score_claim_records(scorer, batch, conn=conn)
+                elapsed = time.perf_counter() - start
+                print(f"score {n:>6,} claims: {elapsed * 1000:9.1f} ms  ({elapsed / n * 1e6:8.1f} us/claim)  "
+                      f"high risk {int((scored['risk_category'] == 'High').sum()):>5,}")
+        finally:
+            conn.close()
+
+        X = np.random.default_rng(0).random((sample_size, len(TARGET_FEATURE_COLUMNS)))
+        start = time.perf_counter()
+        AnomalyDetector().fit_predict(X)
+        print(f"refit on {sample_size:,} rows (per request without the split): "
+              f"{time.perf_counter() - start:.2f}s")
+
+        check_features_as_appended(db_path, new_claims(500, base_rows + 1, seed=7), scorer.scaler_claim_amount)
+        print("\nBatch features match the feature store after appending the batch (rtol 1e-9).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the global AnomalyDetector with per-segment models (SegmentedDetector)
+fitted in worker processes: fit time by worker count, and how the anomaly
+label rate is spread across segments.
+
+Usage: python bench_segmented.py [n_rows] [segment_key]
+
+Parallel speedup is bounded by the number of cores (and by the largest
+segment); on a single core the pool only adds process start-up cost.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.database.db_setup import stream_claims_to_db
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector
+from fraud_detection_agent.models.segmented import SegmentedDetector
+from fraud_detection_agent.preprocessing.feature_store import update_feature_store
+from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+
+_FEATURE_QUERY = """
+    SELECT f.claim_amount, f.length_of_stay, hs.amount_sum / hs.claim_count AS avg_claim_per_hospital,
+           c.claim_frequency_per_month, c.procedure_cost_deviation, c.patient_repeat_ratio,
+           h.hospital_type, d.state
+    FROM claim_facts AS f
+    JOIN fs_claim_features AS c ON c.claim_key = f.claim_key
+    JOIN fs_hospital AS hs ON hs.hospital_key = f.hospital_key
+    JOIN hospitals AS h ON h.hospital_key = f.hospital_key
+    JOIN districts AS d ON d.district_key = f.district_key
+    ORDER BY f.claim_key
+"""
+
+
+def load_features(n_rows: int) -> pd.DataFrame:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "claims.db"
+        stream_claims_to_db(n_rows, db_path=db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            update_feature_store(conn)
+            df = pd.read_sql_query(_FEATURE_QUERY, conn)
+        finally:
+            conn.close()
+    amount = df["claim_amount"]
+    df["claim_amount_norm"] = (amount - amount.min()) / (amount.max() - amount.min())
+    return df
+
+
+def label_rates(df: pd.DataFrame, key: str, labels: np.ndarray) -> pd.Series:
+    return pd.Series(labels, index=df.index).groupby(df[key]).mean()
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    segment_key = sys.argv[2] if len(sys.argv) > 2 else "hospital_type"
+
+    df = load_features(n_rows)
+    X = df[TARGET_FEATURE_COLUMNS].to_numpy(dtype=float)
+    print(f"{len(df):,} claims, {os.cpu_count()} CPU(s), segments by {segment_key}:")
+    print(df[segment_key].value_counts().to_string(), "\n")
+
+    start = time.perf_counter()
+    global_results = AnomalyDetector().fit(X)
+    print(f"global model                 fit {time.perf_counter() - start:7.2f}s")
+
+    for n_workers in sorted({1, os.cpu_count() or 1}):
+        detector = SegmentedDetector(segment_key, n_workers=n_workers)
+        start = time.perf_counter()
+        seg_results = detector.fit(X, df[segment_key])
+        print(f"segmented, {n_workers:>2} worker(s)       fit {time.perf_counter() - start:7.2f}s "
+              f"({len(detector.detectors)} models)")
+
+    start = time.perf_counter()
+    rescored = detector.score(X[:10_000], df[segment_key].iloc[:10_000])
+    print(f"segmented score 10k claims       {time.perf_counter() - start:7.2f}s")
+    assert np.allclose(rescored.scores_iforest, seg_results.scores_iforest[:10_000])
+
+    global_label = (global_results.combined_score > 0.7).astype(float)
+    seg_label = (seg_results.combined_score > 0.7).astype(float)
+    rates = pd.DataFrame({
+        "global anomaly rate": label_rates(df, segment_key, global_label),
+        "segmented anomaly rate": label_rates(df, segment_key, seg_label),
+        "global mean score": label_rates(df, segment_key, global_results.combined_score),
+        "segmented mean score": label_rates(df, segment_key, seg_results.combined_score),
+    })
+    print("\n" + rates.to_string(float_format=lambda v: f"{v:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark building the claims database: one-shot to_sql vs chunked streaming ingest.
+
+Usage: python bench_stream_ingest.py [n_rows] [n_workers] [both|streaming|oneshot]
+"""
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fraud_detection_agent.database.db_setup import generate_mock_claims, stream_claims_to_db
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def one_shot(n_rows: int, db_path: Path) -> float:
+    start = time.perf_counter()
+    df = generate_mock_claims(n_rows=n_rows)
+    conn = sqlite3.connect(db_path)
+    df.to_sql("claims", conn, if_exists="replace", index=False)
+    conn.close()
+    return time.perf_counter() - start
+
+
+def streaming(n_rows: int, db_path: Path, n_workers: int) -> float:
+    start = time.perf_counter()
+    stream_claims_to_db(n_rows, n_workers=n_workers, db_path=db_path)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    mode = sys.argv[3] if len(sys.argv) > 3 else "both"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Peak RSS is per process and never shrinks, so run streaming first;
+        # run each mode separately (third arg) for a clean memory comparison.
+        if mode in ("both", "streaming"):
+            elapsed = streaming(n_rows, Path(tmp) / "stream.db", n_workers)
+            print(f"streaming ({n_workers} workers) n={n_rows:,}: {elapsed:7.2f}s "
+                  f"{n_rows / elapsed:>12,.0f} rows/s  peak RSS {peak_rss_mb():,.0f} MB")
+        if mode in ("both", "oneshot"):
+            elapsed = one_shot(n_rows, Path(tmp) / "oneshot.db")
+            print(f"one-shot to_sql        n={n_rows:,}: {elapsed:7.2f}s "
+                  f"{n_rows / elapsed:>12,.0f} rows/s  peak RSS {peak_rss_mb():,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
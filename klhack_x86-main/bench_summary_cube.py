@@ -0,0 +1,123 @@
+"""
+/get-summary from the precomputed aggregate cube (scoring/summary_cube.py)
+against the per-request masks and groupbys over the claims it replaces: every
+hospital_type x state x district combination of the app's database (with
+"All" rollups) must give the same payload, then cube build time, cells and
+per-request latency with the claims replicated up to ``max_factor`` times.
+
+Usage: python bench_summary_cube.py [max_factor] [n_requests]
+"""
+import math
+import os
+import sys
+import time
+
+os.environ["BACKGROUND_RETRAIN"] = "0"
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent import main
+from fraud_detection_agent.scoring.summary_cube import RULE_MEASURES, SummaryCube
+
+
+def mask_summary(claims_df, hosp_df, hospital_type, state, district) -> dict:
+    """
+    The claim-level /get-summary computation, as before the cube.
+    """
+    for column, value in (("hospital_type", hospital_type), ("state", state), ("district", district)):
+        if value not in (None, "All"):
+            claims_df = claims_df[claims_df[column] == value]
+            hosp_df = hosp_df[hosp_df[column] == value]
+    suspicious = (claims_df["anomaly_label"] == 1) | claims_df["any_rule_flag"]
+    monthly = (claims_df.assign(is_suspicious=suspicious).groupby("month", observed=True)["is_suspicious"].sum().reset_index().to_dict(orient="records"))
+    return {
+        "stats": {
+            "total_claims": len(claims_df),
+            "suspicious_claims": int(suspicious.sum()),
+            "total_hospitals": len(hosp_df),
+            "total_fraud_amount": float(claims_df[suspicious]["claim_amount"].sum()),
+        },
+        "monthly_trends": monthly,
+        "risk_distribution": [
+            {"category": c, "count": int((hosp_df["risk_category_overall"] == c).sum())} for c in ("Low", "Medium", "High")
+        ],
+        "hosp_type_risk": hosp_df.groupby("hospital_type", observed=True)["avg_risk_score"].mean().reset_index().to_dict(orient="records"),
+        "anomaly_type_counts": [
+            {"type": label, "count": int(claims_df[column].sum())} for label, column in RULE_MEASURES.items()
+        ],
+    }
+
+
+def assert_same(cube: dict, reference: dict) -> None:
+    """
+    Equal payloads; floats may differ in the last bits (different summation order).
+    """
+    if isinstance(reference, dict):
+        assert cube.keys() == reference.keys(), (cube.keys(), reference.keys())
+        for key in reference:
+            assert_same(cube[key], reference[key])
+    elif isinstance(reference, list):
+        assert len(cube) == len(reference), (cube, reference)
+        for a, b in zip(cube, reference):
+            assert_same(a, b)
+    elif isinstance(reference, float):
+        assert math.isclose(cube, reference, rel_tol=1e-9), (cube, reference)
+    else:
+        assert str(cube) == str(reference), (cube, reference)
+
+
+def filter_combinations(hospitals: pd.DataFrame) -> list:
+    """
+    Every (hospital_type, state, district) filter of the dashboard, with
+    None / "All" rollups.
+    """
+    locations = hospitals[["state", "district"]].drop_duplicates().astype(str).itertuples(index=False)
+    requests = []
+    for state, district in locations:
+        requests += [(state, "All"), (state, district)]
+    requests = sorted(set(requests)) + [("All", "All")]
+    types = [None] + sorted(hospitals["hospital_type"].astype(str).unique())
+    return [(t, s, d) for t in types for s, d in requests]
+
+
+def p50_ms(fn, requests) -> float:
+    latencies = []
+    for request in requests:
+        start = time.perf_counter()
+        fn(*request)
+        latencies.append(time.perf_counter() - start)
+    return float(np.percentile(latencies, 50)) * 1000
+
+
+def main_bench() -> None:
+    max_factor = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    output = main.run_full_pipeline(persist_snapshot=False)
+    claims, hospitals = output["claims_all"], output["hospital_risk_all"]
+    cube = output["summary_cube"]
+
+    requests = filter_combinations(hospitals)
+    for request in requests:
+        assert_same(cube.summary(*request), mask_summary(claims, hospitals, *request))
+    print(f"{len(requests)} filter combinations over {len(claims):,} claims: cube payloads match the claim-level ones")
+
+    rng = np.random.default_rng(11)
+    sample = [requests[i] for i in rng.integers(0, len(requests), n_requests)]
+    factor = 1
+    while factor <= max_factor:
+        scaled = pd.concat([claims] * factor, ignore_index=True) if factor > 1 else claims
+        suspicious = (scaled["anomaly_label"] == 1).to_numpy() | scaled["any_rule_flag"].to_numpy(dtype=bool)
+        start = time.perf_counter()
+        scaled_cube = SummaryCube(scaled, hospitals, suspicious)
+        t_build = time.perf_counter() - start
+        t_mask = p50_ms(lambda *r: mask_summary(scaled, hospitals, *r), sample)
+        t_cube = p50_ms(scaled_cube.summary, sample)
+        print(f"{len(scaled):>10,} claims: cube build {t_build * 1000:6.0f} ms ({scaled_cube.n_cells:,} cells)   "
+              f"summary p50 claim-level {t_mask:8.2f} ms   cube {t_cube:6.2f} ms   x{t_mask / t_cube:.0f}")
+        factor *= 10 if factor == 1 else 3
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,61 @@
+"""
+What-if re-weighting: re-running risk scoring and hospital aggregation per
+weight set versus ``reweight_risk`` on the cached components (what
+POST /what-if-risk runs on an LRU cache miss), checking the tables match.
+
+Usage: python bench_what_if.py [n_rows] [n_configs]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_risk_kernel import make_claims
+from fraud_detection_agent.scoring.risk_scoring import (
+    RiskConfig,
+    aggregate_hospital_risk,
+    build_risk_components,
+    compute_risk_scores,
+    reweight_risk,
+)
+
+
+def configs(n: int) -> list:
+    rng = np.random.default_rng(3)
+    out = [RiskConfig()]
+    for weights in rng.dirichlet([1.0, 1.0, 1.0], n - 1):
+        out.append(RiskConfig(*map(float, weights)))
+    return out
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_configs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    df, anomaly = make_claims(n_rows, categorical=True)
+    scored = compute_risk_scores(df, anomaly)
+    start = time.perf_counter()
+    components = build_risk_components(scored)
+    t_build = time.perf_counter() - start
+
+    rescoring, reweighting = [], []
+    for config in configs(n_configs):
+        start = time.perf_counter()
+        expected = aggregate_hospital_risk(compute_risk_scores(df, anomaly, config=config), config=config)
+        rescoring.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        table = reweight_risk(components, config)
+        reweighting.append(time.perf_counter() - start)
+        pd.testing.assert_frame_equal(
+            table.drop(columns=["low_risk_claims", "medium_risk_claims"]), expected, check_exact=True
+        )
+
+    print(f"{n_rows:,} claims, {len(components.hospitals)} hospitals, {n_configs} weight sets (tables identical)")
+    print(f"  components cached once:        {t_build * 1000:8.1f} ms  ({components.nbytes / 1e6:.0f} MB)")
+    print(f"  rescore + aggregate per set:   {np.median(rescoring) * 1000:8.1f} ms (median)")
+    print(f"  reweight_risk per set:         {np.median(reweighting) * 1000:8.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,14 @@ from typing import Optional
 
 import pandas as pd
 
-from fraud_detection_agent.database.db_setup import DB_PATH, ensure_directories
+from fraud_detection_agent.database.db_setup import get_db_connection
 
 
 SNAPSHOT_TABLE = "risk_snapshots"
 
 
 def _get_conn() -> sqlite3.Connection:
-    ensure_directories()
-    return sqlite3.connect(DB_PATH)
+    return get_db_connection()
 
 
 def ensure_snapshot_table() -> None:
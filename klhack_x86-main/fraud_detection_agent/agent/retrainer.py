@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class PipelineBuild:
+    """
+    One published pipeline result. Builds are immutable once published;
+    a rebuild produces a new ``PipelineBuild`` with the next ``version``.
+    """
+
+    version: int
+    data_version: str
+    value: Any
+    built_at: str
+    build_seconds: float
+    reason: str
+
+
+@dataclass
+class _BuildStats:
+    n_builds: int = 0
+    n_failures: int = 0
+    last_error: Optional[str] = None
+    last_started_at: Optional[str] = None
+    building: bool = False
+    history: list = field(default_factory=list)
+
+
+class RetrainingService:
+    """
+    Rebuilds the pipeline (features, model, scores) off the request path and
+    hot-swaps the result.
+
+    ``build(data_version)`` runs off the request path when the data version
+    reported by ``data_version()`` changes, when ``interval_seconds`` have
+    passed since the last build, or on ``request_rebuild()``. The finished
+    build replaces ``current()`` with a single reference assignment, so a
+    request holding the previous build keeps using it undisturbed and the
+    next request sees the new one; nothing is mutated in place. Only the
+    very first build can make a caller wait (there is nothing to serve yet).
+    A failed build is logged and the previous build stays published.
+
+    A thread schedules the builds. With ``worker="process"`` each build runs
+    in a separate worker process and its result is pickled back, so model
+    fitting does not hold the serving process's GIL; ``build`` must then be
+    a picklable module-level function. ``worker="thread"`` builds on the
+    scheduling thread itself.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[str], Any],
+        data_version: Callable[[], str],
+        interval_seconds: float = 3600.0,
+        poll_seconds: float = 30.0,
+        on_swap: Optional[Callable[[PipelineBuild], None]] = None,
+        history_size: int = 20,
+        worker: str = "thread",
+    ) -> None:
+        if worker not in ("thread", "process"):
+            raise ValueError(f"Unknown retraining worker {worker!r}; use 'thread' or 'process'")
+        self._build = build
+        self.worker = worker
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._data_version = data_version
+        self.interval_seconds = interval_seconds
+        self.poll_seconds = poll_seconds
+        self._on_swap = on_swap
+        self._history_size = history_size
+        self._current: Optional[PipelineBuild] = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._rebuild_requested = False
+        self._last_finished = time.monotonic()
+        self._failed_data_version: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stats = _BuildStats()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "RetrainingService":
+        """
+        Start the worker; the first build begins immediately.
+        """
+        if not self.is_running:
+            self._stop.clear()
+            if self.worker == "process" and self._executor is None:
+                self._executor = self._new_executor()
+            self._thread = threading.Thread(target=self._run, name="pipeline-retrainer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker after any build in progress finishes.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def _new_executor() -> ProcessPoolExecutor:
+        # spawn, not fork: the serving process has threads (and open SQLite
+        # connections) that a forked child must not inherit
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    def request_rebuild(self) -> None:
+        """
+        Schedule a rebuild on the worker without waiting for it.
+        """
+        self._rebuild_requested = True
+        self._wake.set()
+
+    def current(self, timeout: Optional[float] = None) -> PipelineBuild:
+        """
+        The published build. Blocks only until the first build is available.
+        """
+        build = self._current
+        if build is not None:
+            return build
+        if not self._ready.wait(timeout):
+            raise TimeoutError("No pipeline build has been published yet")
+        if self._current is None:
+            raise RuntimeError(f"Initial pipeline build failed: {self._stats.last_error}")
+        return self._current
+
+    def status(self) -> Dict[str, Any]:
+        build = self._current
+        stats = self._stats
+        return {
+            "running": self.is_running,
+            "worker": self.worker,
+            "building": stats.building,
+            "version": build.version if build else None,
+            "data_version": build.data_version if build else None,
+            "built_at": build.built_at if build else None,
+            "build_seconds": build.build_seconds if build else None,
+            "reason": build.reason if build else None,
+            "n_builds": stats.n_builds,
+            "n_failures": stats.n_failures,
+            "last_error": stats.last_error,
+            "last_started_at": stats.last_started_at,
+            "interval_seconds": self.interval_seconds,
+            "history": list(stats.history),
+        }
+
+    def _due(self) -> Optional[tuple]:
+        """
+        Return ``(reason, data_version)`` when a rebuild is due, else None.
+        """
+        data_version = self._data_version()
+        build = self._current
+        if build is None:
+            return "initial", data_version
+        if self._rebuild_requested:
+            return "requested", data_version
+        # A data version whose build failed is retried on schedule or request, not every poll
+        if data_version != build.data_version and data_version != self._failed_data_version:
+            return "data_changed", data_version
+        if self.interval_seconds and time.monotonic() - self._last_finished >= self.interval_seconds:
+            return "scheduled", data_version
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                due = self._due()
+            except Exception:
+                traceback.print_exc()
+                due = None
+            if due is not None:
+                self._build_and_swap(*due)
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _build_and_swap(self, reason: str, data_version: str) -> None:
+        stats = self._stats
+        self._rebuild_requested = False
+        stats.building = True
+        stats.last_started_at = datetime.now().isoformat(timespec="seconds")
+        start = time.perf_counter()
+        try:
+            if self._executor is not None:
+                value = self._executor.submit(self._build, data_version).result()
+            else:
+                value = self._build(data_version)
+        except Exception as exc:
+            if isinstance(exc, BrokenProcessPool):
+                # The worker died (e.g. out of memory); the next build gets a new one
+                self._executor = self._new_executor()
+            stats.n_failures += 1
+            stats.last_error = f"{type(exc).__name__}: {exc}"
+            self._failed_data_version = data_version
+            print(f"Pipeline rebuild failed ({reason}); keeping version "
+                  f"{self._current.version if self._current else None}")
+            traceback.print_exc()
+            if self._current is None:
+                # Wake callers waiting on the first build; they get the error
+                self._ready.set()
+            return
+        finally:
+            stats.building = False
+            self._last_finished = time.monotonic()
+
+        previous = self._current
+        build = PipelineBuild(
+            version=(previous.version + 1) if previous else 1,
+            data_version=data_version,
+            value=value,
+            built_at=datetime.now().isoformat(timespec="seconds"),
+            build_seconds=time.perf_counter() - start,
+            reason=reason,
+        )
+        # The swap: one reference assignment, atomic under the GIL
+        self._current = build
+        self._ready.set()
+        stats.n_builds += 1
+        stats.last_error = None
+        self._failed_data_version = None
+        stats.history.append(
+            {"version": build.version, "built_at": build.built_at,
+             "build_seconds": round(build.build_seconds, 3), "reason": reason}
+        )
+        del stats.history[:-self._history_size]
+        print(f"Pipeline build {build.version} published ({reason}, {build.build_seconds:.1f}s)")
+        if self._on_swap is not None:
+            try:
+                self._on_swap(build)
+            except Exception:
+                traceback.print_exc()
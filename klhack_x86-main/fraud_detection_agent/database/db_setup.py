@@ -1,5 +1,11 @@
+from __future__ import annotations
+
 import os
+import shutil
 import sqlite3
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Tuple
@@ -7,92 +13,179 @@ from typing import Tuple
 import numpy as np
 import pandas as pd
 
+from fraud_detection_agent.database.schema import (
+    claims_storage_table,
+    drop_claims_storage,
+    has_legacy_claims_table,
+    migrate_to_normalized,
+)
+
 BASE_DIR = Path(__file__).resolve().parents[1]
-DATA_DIR = BASE_DIR / "data"
-DB_DIR = BASE_DIR / "database"
+# CLAIMS_DATA_DIR / CLAIMS_DB_DIR relocate the CSV export and the database
+# (with its snapshot), e.g. to run against a scratch copy
+DATA_DIR = Path(os.getenv("CLAIMS_DATA_DIR", BASE_DIR / "data"))
+DB_DIR = Path(os.getenv("CLAIMS_DB_DIR", BASE_DIR / "database"))
 DB_PATH = DB_DIR / "claims.db"
 CSV_PATH = DATA_DIR / "mock_claims.csv"
 
 
-def generate_mock_claims(n_rows: int = 3000, random_state: int = 42) -> pd.DataFrame:
+# Representative Indian states and districts (not exhaustive but realistic)
+STATE_DISTRICTS = {
+    "Delhi": ["New Delhi", "South Delhi", "West Delhi"],
+    "Maharashtra": ["Mumbai", "Pune", "Nagpur"],
+    "Karnataka": ["Bengaluru Urban", "Mysuru", "Mangaluru"],
+    "Tamil Nadu": ["Chennai", "Coimbatore", "Madurai"],
+    "Uttar Pradesh": ["Lucknow", "Varanasi", "Kanpur Nagar"],
+    "Gujarat": ["Ahmedabad", "Surat", "Vadodara"],
+    "Rajasthan": ["Jaipur", "Jodhpur", "Udaipur"],
+    "Telangana": ["Hyderabad", "Warangal", "Karimnagar"],
+}
+HOSPITAL_TYPES = ["Government", "Private", "Teaching", "Trust"]
+HOSPITAL_TYPE_PROBS = [0.35, 0.4, 0.15, 0.1]
+HOSPITAL_BASE_NAMES = [
+    "Aarogya",
+    "Swasthya",
+    "Sanjivani",
+    "Ashirwad",
+    "Navjeevan",
+    "Sanjeevan",
+    "Ayushmaan",
+    "Jan Arogya",
+]
+HOSPITAL_NAME_SUFFIXES = [
+    "Hospital",
+    "Multi Speciality Hospital",
+    "Super Speciality Hospital",
+    "Medical College",
+    "Institute of Medical Sciences",
+]
+
+N_HOSPITALS = 80
+N_PATIENTS = 6000
+N_PROCEDURES = 80
+# Claims generated for a new or empty database, whichever caller creates it
+N_CLAIMS = 30000
+
+COMPLEXITY_LEVELS = ["Low", "Medium", "High"]
+COMPLEXITY_BASE_COST = {"Low": 4000, "Medium": 8000, "High": 15000}
+# (mean, std) of length of stay in days per complexity bucket
+COMPLEXITY_LOS = {"Low": (2, 1), "Medium": (4, 2), "High": (7, 3)}
+HOSPITAL_TYPE_COST_MULTIPLIER = {
+    "Government": 1.0,
+    "Private": 1.3,
+    "Teaching": 1.1,
+    "Trust": 1.15,
+}
+
+CLAIMS_START_DATE = datetime(2023, 1, 1)
+ADMISSION_WINDOW_DAYS = 540  # ~1.5 years
+
+CLAIM_COLUMNS = [
+    "claim_id",
+    "hospital_id",
+    "hospital_name",
+    "patient_id",
+    "procedure_code",
+    "claim_amount",
+    "admission_date",
+    "discharge_date",
+    "length_of_stay",
+    "district",
+    "state",
+    "hospital_type",
+]
+
+
+def _build_hospital_master(rng: np.random.Generator) -> pd.DataFrame:
     """
-    Generate a generalized mock healthcare claims dataset with injected fraud patterns.
+    Build the hospital master (fixed state/district/type and human-readable names).
 
-    The generator simulates an Indian Ayushman Bharat setting with:
-    - Indian states and districts
-    - Government, private, teaching, and specialty hospitals
-    - A mix of low-, medium-, and high-complexity procedures
-    - Varying base costs by procedure complexity and hospital type
+    Consumes draws from ``rng`` in the same order for every generator, so the
+    loop and batched generators share an identical hospital master per seed.
     """
-    rng = np.random.default_rng(random_state)
-
-    # More hospitals / patients / procedures for better variety
-    hospital_ids = [f"HOSP_{i:03d}" for i in range(1, 81)]  # 80 hospitals
-    patient_ids = [f"PAT_{i:06d}" for i in range(1, 6001)]  # 6000 patients
-    procedure_codes = [f"PROC_{i:03d}" for i in range(1, 81)]  # 80 procedures
-
-    # Representative Indian states and districts (not exhaustive but realistic)
-    state_districts = {
-        "Delhi": ["New Delhi", "South Delhi", "West Delhi"],
-        "Maharashtra": ["Mumbai", "Pune", "Nagpur"],
-        "Karnataka": ["Bengaluru Urban", "Mysuru", "Mangaluru"],
-        "Tamil Nadu": ["Chennai", "Coimbatore", "Madurai"],
-        "Uttar Pradesh": ["Lucknow", "Varanasi", "Kanpur Nagar"],
-        "Gujarat": ["Ahmedabad", "Surat", "Vadodara"],
-        "Rajasthan": ["Jaipur", "Jodhpur", "Udaipur"],
-        "Telangana": ["Hyderabad", "Warangal", "Karimnagar"],
-    }
-    states = list(state_districts.keys())
-
-    hospital_types = ["Government", "Private", "Teaching", "Trust"]
-
-    # Construct a simple hospital master with fixed state/district/type and human-readable names
-    base_names = [
-        "Aarogya",
-        "Swasthya",
-        "Sanjivani",
-        "Ashirwad",
-        "Navjeevan",
-        "Sanjeevan",
-        "Ayushmaan",
-        "Jan Arogya",
-    ]
-    suffixes = [
-        "Hospital",
-        "Multi Speciality Hospital",
-        "Super Speciality Hospital",
-        "Medical College",
-        "Institute of Medical Sciences",
-    ]
-
+    states = list(STATE_DISTRICTS.keys())
     hospital_rows = []
-    for hid in hospital_ids:
+    for i in range(1, N_HOSPITALS + 1):
         state = rng.choice(states)
-        district = rng.choice(state_districts[state])
-        htype = rng.choice(hospital_types, p=[0.35, 0.4, 0.15, 0.1])
+        district = rng.choice(STATE_DISTRICTS[state])
+        htype = rng.choice(HOSPITAL_TYPES, p=HOSPITAL_TYPE_PROBS)
         city_label = district.split()[0]
-        name = f"{city_label} {rng.choice(base_names)} {rng.choice(suffixes)}"
+        name = f"{city_label} {rng.choice(HOSPITAL_BASE_NAMES)} {rng.choice(HOSPITAL_NAME_SUFFIXES)}"
         hospital_rows.append(
             {
-                "hospital_id": hid,
+                "hospital_id": f"HOSP_{i:03d}",
                 "hospital_name": name,
                 "state": state,
                 "district": district,
                 "hospital_type": htype,
             }
         )
-    hospital_master = pd.DataFrame(hospital_rows).set_index("hospital_id")
+    return pd.DataFrame(hospital_rows).set_index("hospital_id")
 
-    # Map each procedure to a complexity bucket and base cost
-    proc_df = pd.DataFrame({"procedure_code": procedure_codes})
+
+def _build_procedure_table() -> pd.DataFrame:
+    """
+    Map each procedure to a complexity bucket.
+    """
+    proc_df = pd.DataFrame({"procedure_code": [f"PROC_{i:03d}" for i in range(1, N_PROCEDURES + 1)]})
     proc_df["complexity"] = pd.cut(
         proc_df.index,
         bins=[-1, 25, 55, 80],
-        labels=["Low", "Medium", "High"],
+        labels=COMPLEXITY_LEVELS,
     )
-    complexity_base_cost = {"Low": 4000, "Medium": 8000, "High": 15000}
+    return proc_df
 
-    start_date = datetime(2023, 1, 1)
+
+def _procedure_complexity() -> dict:
+    proc_df = _build_procedure_table()
+    return dict(zip(proc_df["procedure_code"], proc_df["complexity"].astype(str)))
+
+
+def generate_mock_claims(
+    n_rows: int = 3000,
+    random_state: int = 42,
+    batched: bool = True,
+) -> pd.DataFrame:
+    """
+    Generate a generalized mock healthcare claims dataset with injected fraud patterns.
+
+    The generator simulates an Indian Ayushman Bharat setting with:
+    - Indian states and districts
+    - Government, private, teaching, and specialty hospitals
+    - A mix of low-, medium-, and high-complexity procedures
+    - Varying base costs by procedure complexity and hospital type
+
+    ``batched=True`` (default) draws every column as a NumPy array in one pass,
+    which scales to millions of rows. ``batched=False`` keeps the original
+    row-by-row generator; both are statistically equivalent for a given seed
+    (same hospital master, same per-column distributions, same fraud injection).
+    """
+    rng = np.random.default_rng(random_state)
+    hospital_master = _build_hospital_master(rng)
+    proc_df = _build_procedure_table()
+
+    if batched:
+        df = _draw_claims_batched(n_rows, rng, hospital_master, proc_df)
+    else:
+        df = _draw_claims_loop(n_rows, rng, hospital_master, proc_df)
+
+    # Inject fraud patterns
+    df = _inject_fraud_patterns(df, rng)
+    return df
+
+
+def _draw_claims_loop(
+    n_rows: int,
+    rng: np.random.Generator,
+    hospital_master: pd.DataFrame,
+    proc_df: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Reference row-by-row claim generator (slow; kept for benchmarking).
+    """
+    hospital_ids = list(hospital_master.index)
+    patient_ids = [f"PAT_{i:06d}" for i in range(1, N_PATIENTS + 1)]
+    procedure_codes = list(proc_df["procedure_code"])
 
     rows = []
     for claim_idx in range(1, n_rows + 1):
@@ -107,27 +200,19 @@ def generate_mock_claims(n_rows: int = 3000, random_state: int = 42) -> pd.DataF
         hospital_name = hmeta["hospital_name"]
 
         proc_info = proc_df.loc[proc_df["procedure_code"] == procedure_code].iloc[0]
-        base_cost = float(complexity_base_cost[str(proc_info["complexity"])])
+        complexity = str(proc_info["complexity"])
+        base_cost = float(COMPLEXITY_BASE_COST[complexity])
 
         # Adjust base cost by hospital type
-        if hospital_type == "Private":
-            base_cost *= 1.3
-        elif hospital_type == "Teaching":
-            base_cost *= 1.1
-        elif hospital_type == "Trust":
-            base_cost *= 1.15
+        base_cost *= HOSPITAL_TYPE_COST_MULTIPLIER[hospital_type]
 
         # Admission date within a 1.5-year window
-        admission_offset = int(rng.integers(0, 540))
-        admission_date = start_date + timedelta(days=admission_offset)
+        admission_offset = int(rng.integers(0, ADMISSION_WINDOW_DAYS))
+        admission_date = CLAIMS_START_DATE + timedelta(days=admission_offset)
 
         # Length of stay correlates loosely with complexity
-        if proc_info["complexity"] == "Low":
-            los = int(max(1, rng.normal(2, 1)))
-        elif proc_info["complexity"] == "Medium":
-            los = int(max(1, rng.normal(4, 2)))
-        else:
-            los = int(max(1, rng.normal(7, 3)))
+        los_mean, los_std = COMPLEXITY_LOS[complexity]
+        los = int(max(1, rng.normal(los_mean, los_std)))
         discharge_date = admission_date + timedelta(days=los)
 
         # Claim amount around base_cost, scaled by length of stay
@@ -153,36 +238,110 @@ def generate_mock_claims(n_rows: int = 3000, random_state: int = 42) -> pd.DataF
             }
         )
 
-    df = pd.DataFrame(rows)
+    return pd.DataFrame(rows, columns=CLAIM_COLUMNS)
 
-    # Inject fraud patterns
-    df = _inject_fraud_patterns(df, rng)
-    return df
 
+def _draw_claims_batched(
+    n_rows: int,
+    rng: np.random.Generator,
+    hospital_master: pd.DataFrame,
+    proc_df: pd.DataFrame,
+    start_index: int = 1,
+) -> pd.DataFrame:
+    """
+    Vectorized claim generator: every column is drawn as an array and
+    hospital/procedure metadata is joined by integer position.
+    """
+    hosp_idx = rng.integers(0, len(hospital_master), size=n_rows)
+    patient_idx = rng.integers(1, N_PATIENTS + 1, size=n_rows)
+    proc_idx = rng.integers(0, len(proc_df), size=n_rows)
+    admission_offset = rng.integers(0, ADMISSION_WINDOW_DAYS, size=n_rows)
+
+    # Per-hospital and per-procedure lookup arrays, gathered by index
+    hosp_types = hospital_master["hospital_type"].to_numpy()
+    hosp_cost_mult = np.array([HOSPITAL_TYPE_COST_MULTIPLIER[t] for t in hosp_types])
+    complexity_codes = proc_df["complexity"].cat.codes.to_numpy()
+    level_base_cost = np.array([COMPLEXITY_BASE_COST[c] for c in COMPLEXITY_LEVELS], dtype=float)
+    level_los_mean = np.array([COMPLEXITY_LOS[c][0] for c in COMPLEXITY_LEVELS], dtype=float)
+    level_los_std = np.array([COMPLEXITY_LOS[c][1] for c in COMPLEXITY_LEVELS], dtype=float)
+
+    row_level = complexity_codes[proc_idx]
+    base_cost = level_base_cost[row_level] * hosp_cost_mult[hosp_idx]
+
+    # Length of stay correlates loosely with complexity (truncated like int(max(1, x)))
+    los = np.maximum(1.0, rng.normal(level_los_mean[row_level], level_los_std[row_level])).astype(np.int64)
+
+    # Claim amount around base_cost, scaled by length of stay
+    claim_amount = np.maximum(
+        1000.0,
+        rng.normal(base_cost * (0.6 + 0.1 * los), base_cost * 0.25),
+    ).round(2)
+
+    # Dates: index into a precomputed table of ISO strings instead of per-row timedelta
+    max_offset = ADMISSION_WINDOW_DAYS + int(los.max(initial=0)) + 1
+    date_strings = np.datetime_as_string(
+        np.datetime64(CLAIMS_START_DATE.date()) + np.arange(max_offset),
+        unit="D",
+    ).astype(object)
+
+    claim_numbers = np.arange(start_index, start_index + n_rows)
+    claim_ids = pd.Series(claim_numbers).map("CLM_{:07d}".format).to_numpy()
+    patient_labels = np.array([f"PAT_{i:06d}" for i in range(N_PATIENTS + 1)], dtype=object)
+    proc_labels = proc_df["procedure_code"].to_numpy(dtype=object)
+    hosp_ids = hospital_master.index.to_numpy(dtype=object)
+
+    return pd.DataFrame(
+        {
+            "claim_id": claim_ids,
+            "hospital_id": hosp_ids[hosp_idx],
+            "hospital_name": hospital_master["hospital_name"].to_numpy(dtype=object)[hosp_idx],
+            "patient_id": patient_labels[patient_idx],
+            "procedure_code": proc_labels[proc_idx],
+            "claim_amount": claim_amount,
+            "admission_date": date_strings[admission_offset],
+            "discharge_date": date_strings[admission_offset + los],
+            "length_of_stay": los,
+            "district": hospital_master["district"].to_numpy(dtype=object)[hosp_idx],
+            "state": hospital_master["state"].to_numpy(dtype=object)[hosp_idx],
+            "hospital_type": hosp_types.astype(object)[hosp_idx],
+        },
+        columns=CLAIM_COLUMNS,
+    )
 
-def _inject_fraud_patterns(df: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+
+def _inject_fraud_patterns(
+    df: pd.DataFrame,
+    rng: np.random.Generator,
+    high_cost_procs: np.ndarray | None = None,
+    sample_state: int | np.random.Generator | None = None,
+) -> pd.DataFrame:
     """
     Inject specific fraud patterns:
     - 300% billing spike for a subset of claims
     - Duplicate claims
     - Excessive high-cost procedures
+
+    ``high_cost_procs`` fixes the inflated procedure codes (chunked generation
+    picks them once for the whole dataset). ``sample_state`` overrides the
+    fixed sampling seeds so that each chunk selects different rows.
     """
     df = df.copy()
 
     # 300%+ billing spike on ~8% of claims
-    spike_idx = df.sample(frac=0.08, random_state=1).index
+    spike_idx = df.sample(frac=0.08, random_state=1 if sample_state is None else sample_state).index
     df.loc[spike_idx, "claim_amount"] *= rng.uniform(3.0, 4.0)
 
     # Duplicate/near-duplicate claims (~5%)
-    dup_sample = df.sample(frac=0.05, random_state=2)
+    dup_sample = df.sample(frac=0.05, random_state=2 if sample_state is None else sample_state)
     dup_rows = dup_sample.copy()
     dup_rows["claim_id"] = [f"DUP_{cid}" for cid in dup_rows["claim_id"]]
     df = pd.concat([df, dup_rows], ignore_index=True)
 
     # Excessive high-cost procedures: pick more procedure codes and strongly inflate them
-    unique_procs = df["procedure_code"].unique()
-    size = min(10, len(unique_procs))
-    high_cost_procs = rng.choice(unique_procs, size=size, replace=False)
+    if high_cost_procs is None:
+        unique_procs = df["procedure_code"].unique()
+        size = min(10, len(unique_procs))
+        high_cost_procs = rng.choice(unique_procs, size=size, replace=False)
     high_cost_mask = df["procedure_code"].isin(high_cost_procs)
     df.loc[high_cost_mask, "claim_amount"] *= rng.uniform(2.0, 3.0)
 
@@ -190,6 +349,244 @@ def _inject_fraud_patterns(df: pd.DataFrame, rng: np.random.Generator) -> pd.Dat
     return df
 
 
+def _generate_claim_chunk(
+    spec: Tuple[int, int, np.random.SeedSequence, pd.DataFrame, np.ndarray],
+) -> pd.DataFrame:
+    """
+    Generate one chunk of claims from its own RNG substream.
+
+    Top-level so it can run inside a process pool; the result depends only on
+    ``spec`` (start index, size, seed sequence, hospital master, high-cost
+    procedures), never on which worker ran it or in what order.
+    """
+    start_index, n_rows, seed_seq, hospital_master, high_cost_procs = spec
+    rng = np.random.default_rng(seed_seq)
+    df = _draw_claims_batched(n_rows, rng, hospital_master, _build_procedure_table(), start_index=start_index)
+    return _inject_fraud_patterns(df, rng, high_cost_procs=high_cost_procs, sample_state=rng)
+
+
+CLAIMS_TABLE_DDL = """
+    CREATE TABLE claims (
+        claim_id TEXT,
+        hospital_id TEXT,
+        hospital_name TEXT,
+        patient_id TEXT,
+        procedure_code TEXT,
+        claim_amount REAL,
+        admission_date TEXT,
+        discharge_date TEXT,
+        length_of_stay INTEGER,
+        district TEXT,
+        state TEXT,
+        hospital_type TEXT
+    )
+"""
+
+_INSERT_CLAIMS_SQL = (
+    f"INSERT INTO claims ({', '.join(CLAIM_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in CLAIM_COLUMNS)})"
+)
+
+
+def _insert_claim_rows(conn: sqlite3.Connection, chunk: pd.DataFrame) -> None:
+    """
+    Append a chunk to ``claims`` in a single transaction.
+    """
+    with conn:
+        # zip over column lists is several times faster than itertuples
+        conn.executemany(_INSERT_CLAIMS_SQL, zip(*(chunk[c].tolist() for c in CLAIM_COLUMNS)))
+
+
+def _write_claim_shard(spec: tuple, shard_path: str, write_csv: bool) -> int:
+    """
+    Pool worker: generate one chunk and write it to its own shard database.
+
+    Binding Python values in ``executemany`` is the dominant ingest cost, so
+    workers do it in parallel; the parent only runs ``INSERT ... SELECT``
+    from each shard, which stays inside SQLite.
+    """
+    chunk = _generate_claim_chunk(spec)
+    conn = sqlite3.connect(shard_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(CLAIMS_TABLE_DDL)
+        _insert_claim_rows(conn, chunk)
+    finally:
+        conn.close()
+    if write_csv:
+        chunk.to_csv(shard_path + ".csv", index=False, header=False)
+    return len(chunk)
+
+
+def stream_claims_to_db(
+    n_rows: int,
+    chunk_size: int = 100_000,
+    n_workers: int = 0,
+    random_state: int = 42,
+    db_path: Path | str | None = None,
+    csv_path: Path | str | None = None,
+) -> int:
+    """
+    Build the claims table chunk by chunk with bounded memory.
+
+    Every chunk is drawn from a deterministic substream spawned from
+    ``random_state`` (so output is identical for any ``n_workers``) and
+    appended inside its own transaction with ``executemany``. With
+    ``n_workers > 0`` chunks are generated and written to temporary shard
+    databases in a process pool, then merged in chunk order; at most
+    ``2 * n_workers`` chunks are in flight at once. Either way peak memory
+    depends on ``chunk_size``, not ``n_rows``. Pass ``csv_path`` to also write
+    a CSV backup.
+
+    Returns the number of rows written (including injected duplicates).
+    """
+    ensure_directories()
+    db_path = Path(db_path) if db_path is not None else DB_PATH
+
+    master_rng = np.random.default_rng(random_state)
+    hospital_master = _build_hospital_master(master_rng)
+    procedure_codes = _build_procedure_table()["procedure_code"].to_numpy()
+    high_cost_procs = master_rng.choice(procedure_codes, size=min(10, len(procedure_codes)), replace=False)
+
+    n_chunks = max(1, -(-n_rows // chunk_size))
+    seed_seqs = np.random.SeedSequence(random_state).spawn(n_chunks)
+    specs = (
+        (
+            1 + i * chunk_size,
+            min(chunk_size, n_rows - i * chunk_size),
+            seed_seqs[i],
+            hospital_master,
+            high_cost_procs,
+        )
+        for i in range(n_chunks)
+    )
+
+    if csv_path is not None:
+        pd.DataFrame(columns=CLAIM_COLUMNS).to_csv(csv_path, index=False)
+
+    conn = sqlite3.connect(db_path)
+    written = 0
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        drop_claims_storage(conn)
+        conn.execute(CLAIMS_TABLE_DDL)
+        conn.commit()
+
+        if n_workers > 0:
+            with tempfile.TemporaryDirectory(dir=db_path.parent) as shard_dir, ProcessPoolExecutor(
+                max_workers=n_workers
+            ) as pool:
+                pending: deque = deque()
+
+                def merge_next() -> None:
+                    nonlocal written
+                    shard_path, future = pending.popleft()
+                    written += future.result()
+                    conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+                    with conn:
+                        conn.execute("INSERT INTO claims SELECT * FROM shard.claims")
+                    conn.execute("DETACH DATABASE shard")
+                    os.remove(shard_path)
+                    if csv_path is not None:
+                        with open(shard_path + ".csv", "rb") as src, open(csv_path, "ab") as dst:
+                            shutil.copyfileobj(src, dst)
+                        os.remove(shard_path + ".csv")
+
+                for i, spec in enumerate(specs):
+                    shard_path = os.path.join(shard_dir, f"chunk_{i:06d}.db")
+                    pending.append((shard_path, pool.submit(_write_claim_shard, spec, shard_path, csv_path is not None)))
+                    if len(pending) >= 2 * n_workers:
+                        merge_next()
+                while pending:
+                    merge_next()
+        else:
+            for spec in specs:
+                chunk = _generate_claim_chunk(spec)
+                _insert_claim_rows(conn, chunk)
+                if csv_path is not None:
+                    chunk.to_csv(csv_path, index=False, mode="a", header=False)
+                written += len(chunk)
+        # Chunks land in a flat staging table; move them into the normalized schema
+        migrate_to_normalized(conn, procedure_complexity=_procedure_complexity())
+        bump_claims_version(conn)
+    finally:
+        conn.close()
+
+    return written
+
+
+CLAIMS_META_TABLE = "claims_meta"
+
+
+def bump_claims_version(conn: sqlite3.Connection) -> int:
+    """
+    Increment the persistent claims data version. Call after any write to ``claims``.
+    """
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {CLAIMS_META_TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    )
+    with conn:
+        conn.execute(
+            f"""
+            INSERT INTO {CLAIMS_META_TABLE} (key, value) VALUES ('data_version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """
+        )
+    return int(
+        conn.execute(f"SELECT value FROM {CLAIMS_META_TABLE} WHERE key = 'data_version'").fetchone()[0]
+    )
+
+
+def get_claims_version(conn: sqlite3.Connection) -> str:
+    """
+    Return a token that changes whenever the claims table changes.
+
+    Combines the counter maintained by ``bump_claims_version`` with the row
+    count and max rowid, so writers that bypass the counter are still detected.
+    """
+    try:
+        version = conn.execute(
+            f"SELECT value FROM {CLAIMS_META_TABLE} WHERE key = 'data_version'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        version = None
+    table = claims_storage_table(conn)
+    count, max_rowid = conn.execute(f"SELECT count(*), max(rowid) FROM {table}").fetchone()
+    return f"{version[0] if version else 0}:{count}:{max_rowid or 0}"
+
+
+def append_claims(df: pd.DataFrame, db_path: Path | str | None = None) -> int:
+    """
+    Append newly arrived claims (``CLAIM_COLUMNS`` layout) to the claims store.
+
+    Rows go through a staging table into the normalized schema and the data
+    version is bumped. Returns the number of claims appended.
+    """
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        if has_legacy_claims_table(conn):
+            migrate_to_normalized(conn, procedure_complexity=_procedure_complexity())
+        conn.execute("DROP TABLE IF EXISTS claims_staging")
+        conn.execute(CLAIMS_TABLE_DDL.replace("CREATE TABLE claims", "CREATE TABLE claims_staging"))
+        with conn:
+            conn.executemany(
+                _INSERT_CLAIMS_SQL.replace("INSERT INTO claims", "INSERT INTO claims_staging"),
+                zip(*(df[c].tolist() for c in CLAIM_COLUMNS)),
+            )
+        inserted = migrate_to_normalized(
+            conn,
+            source_table="claims_staging",
+            procedure_complexity=_procedure_complexity(),
+            analyze=False,
+        )
+        bump_claims_version(conn)
+    finally:
+        conn.close()
+    return inserted
+
+
 def ensure_directories() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     DB_DIR.mkdir(parents=True, exist_ok=True)
@@ -198,9 +595,18 @@ def ensure_directories() -> None:
 def init_csv_and_db(
     n_rows: int = 3000,
     reuse_existing: bool = True,
-) -> Tuple[pd.DataFrame, str]:
+    streaming: bool = False,
+    chunk_size: int = 100_000,
+    n_workers: int = 0,
+    load_data: bool = True,
+) -> Tuple[pd.DataFrame | None, str]:
     """
     Ensure SQLite DB exists and has data. Returns the loaded DataFrame and DB path.
+
+    With ``streaming=True`` a fresh dataset is written through
+    ``stream_claims_to_db`` and the claims are never materialized (the returned
+    DataFrame is ``None``); the CSV backup is written chunk by chunk. Otherwise existing data is read back from the
+    columnar snapshot; pass ``load_data=False`` to skip that read.
     """
     ensure_directories()
     
@@ -211,18 +617,28 @@ def init_csv_and_db(
         try:
             conn = sqlite3.connect(DB_PATH)
             count = conn.execute("SELECT count(*) FROM claims").fetchone()[0]
+            if count > 0 and reuse_existing and has_legacy_claims_table(conn):
+                migrate_to_normalized(conn, procedure_complexity=_procedure_complexity())
+                bump_claims_version(conn)
             conn.close()
             if count > 0:
                 has_data = True
         except Exception:
             has_data = False
 
-    if not has_data or not reuse_existing:
+    if (not has_data or not reuse_existing) and streaming:
+        print(f"Streaming new dataset ({n_rows} rows, chunks of {chunk_size})...")
+        stream_claims_to_db(n_rows, chunk_size=chunk_size, n_workers=n_workers, csv_path=CSV_PATH)
+        df = None
+    elif not has_data or not reuse_existing:
         print(f"Generating new dataset ({n_rows} rows)...")
         df = generate_mock_claims(n_rows=n_rows)
         # Store in SQLite
         conn = sqlite3.connect(DB_PATH)
-        df.to_sql("claims", conn, if_exists="replace", index=False)
+        drop_claims_storage(conn)
+        df.to_sql("claims", conn, index=False)
+        migrate_to_normalized(conn, procedure_complexity=_procedure_complexity())
+        bump_claims_version(conn)
         conn.close()
         # Also save CSV for backup/manual inspection if needed, but don't depend on it
         try:
@@ -230,9 +646,19 @@ def init_csv_and_db(
         except Exception:
             pass
     else:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("SELECT * FROM claims", conn)
+        df = None
+
+    # Refresh the columnar snapshot (no-op when already current) and serve
+    # reads from it rather than decoding the table row by row through SQL.
+    from fraud_detection_agent.database.snapshot import load_claims_snapshot, write_claims_snapshot
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        write_claims_snapshot(conn, df=df)
+    finally:
         conn.close()
+    if df is None and load_data and not streaming:
+        df = load_claims_snapshot()
 
     return df, str(DB_PATH)
 
@@ -259,28 +685,39 @@ def init_auth_db() -> None:
     conn.close()
 
 
-def get_db_connection() -> sqlite3.Connection:
+def _prepare_database() -> None:
     """
-    Return a new SQLite connection. Caller is responsible for closing it.
+    One-time schema and readiness check run before the pool hands out connections.
+
+    A claims table in the original flat layout is migrated to the normalized
+    schema here.
     """
     ensure_directories()
     init_auth_db()
     # If DB doesn't exist or is empty, initialize it
-    db_exists = DB_PATH.exists()
-    if not db_exists:
-        init_csv_and_db()
-    else:
+    try:
         conn = sqlite3.connect(DB_PATH)
         try:
+            if has_legacy_claims_table(conn):
+                migrate_to_normalized(conn, procedure_complexity=_procedure_complexity())
+                bump_claims_version(conn)
             count = conn.execute("SELECT count(*) FROM claims").fetchone()[0]
-            if count == 0:
-                conn.close()
-                init_csv_and_db()
-            else:
-                conn.close()
-        except Exception:
+        finally:
             conn.close()
-            init_csv_and_db()
-            
-    return sqlite3.connect(DB_PATH)
+    except sqlite3.Error:
+        count = 0
+    if count == 0:
+        init_csv_and_db(n_rows=N_CLAIMS, load_data=False)
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Return a pooled SQLite connection. Caller is responsible for closing it,
+    which returns it to the pool.
+
+    Schema/readiness checks run once per process; connections are configured
+    with WAL, synchronous=NORMAL, mmap and a larger page cache.
+    """
+    from fraud_detection_agent.database.pool import get_pool
 
+    return get_pool(DB_PATH, _prepare_database).acquire()
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-65536",  # 64 MB (negative = KiB)
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+@dataclass
+class PoolMetrics:
+    hits: int = 0  # checkout served by an idle pooled connection
+    misses: int = 0  # checkout had to open a new connection
+    waits: int = 0  # checkout blocked because the pool was exhausted
+    wait_seconds: float = 0.0
+    timeouts: int = 0
+    in_use: int = 0
+    idle: int = 0
+    opened: int = 0
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    SQLite connection whose ``close()`` hands it back to its pool.
+
+    Keeps the ``get_db_connection()`` contract (callers close what they get)
+    while letting the underlying handle be reused. Closing twice returns it
+    once; ``_generation`` is the pool generation it was opened in.
+    """
+
+    _pool: Optional["ConnectionPool"] = None
+    _generation = 0
+    _released = False
+
+    def close(self) -> None:
+        pool = self._pool
+        if pool is None:
+            super().close()
+        else:
+            pool._release(self)
+
+    def discard(self) -> None:
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pre-configured SQLite connections.
+
+    Connections are opened lazily up to ``max_size`` and configured once with
+    ``CONNECTION_PRAGMAS``. When every connection is checked out, callers wait
+    up to ``timeout`` seconds for one to be released. ``close_all`` starts a
+    new generation: connections checked out before it are closed, not pooled,
+    when they are released.
+    """
+
+    def __init__(self, db_path: Path | str, max_size: int = 8, timeout: float = 30.0) -> None:
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: List[PooledConnection] = []
+        self._opened = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._metrics = PoolMetrics()
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False,
+            timeout=self.timeout,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn._pool = self
+        with self._cond:
+            conn._generation = self._generation
+        return conn
+
+    def _checkout(self) -> PooledConnection:
+        conn = self._idle.pop()
+        conn._released = False
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        with self._cond:
+            if self._idle:
+                self._metrics.hits += 1
+                self._metrics.in_use += 1
+                return self._checkout()
+            if self._opened < self.max_size:
+                self._opened += 1
+                self._metrics.misses += 1
+                self._metrics.in_use += 1
+                new_slot = True
+            else:
+                new_slot = False
+                self._metrics.waits += 1
+                start = time.perf_counter()
+                deadline = start + self.timeout
+                while not self._idle:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self._idle:
+                            break
+                        self._metrics.timeouts += 1
+                        self._metrics.wait_seconds += time.perf_counter() - start
+                        raise TimeoutError(f"No SQLite connection available after {self.timeout}s")
+                self._metrics.wait_seconds += time.perf_counter() - start
+                self._metrics.in_use += 1
+                return self._checkout()
+
+        # Open outside the lock; roll the slot back if that fails
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._metrics.in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: PooledConnection) -> None:
+        with self._cond:
+            if conn._released:
+                return
+            conn._released = True
+            stale = conn._generation != self._generation
+        try:
+            if not stale and conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            stale = True
+        if stale:
+            conn.discard()
+            with self._cond:
+                self._opened -= 1
+                self._metrics.in_use -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._metrics.in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self) -> None:
+        """
+        Close idle connections; checked-out ones are closed when released.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._generation += 1
+        for conn in idle:
+            conn.discard()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._cond:
+            self._metrics.idle = len(self._idle)
+            self._metrics.opened = self._opened
+            return asdict(self._metrics)
+
+
+_pool: Optional[ConnectionPool] = None
+_ready = False
+_init_lock = threading.Lock()
+
+
+def get_pool(db_path: Path | str, prepare: Callable[[], None]) -> ConnectionPool:
+    """
+    Return the process-wide pool, running ``prepare`` (schema + readiness
+    checks) exactly once per process before the first connection is handed out.
+    """
+    global _pool, _ready
+    if _ready and _pool is not None:
+        return _pool
+    with _init_lock:
+        if not _ready:
+            prepare()
+            _ready = True
+        if _pool is None or _pool.db_path != str(db_path):
+            _pool = ConnectionPool(db_path)
+    return _pool
+
+
+def reset_pool() -> None:
+    """
+    Drop the pool and force readiness checks to rerun (e.g. after the DB file
+    was deleted or rebuilt).
+    """
+    global _pool, _ready
+    with _init_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = None
+        _ready = False
+
+
+def get_pool_metrics() -> Dict[str, float]:
+    if _pool is None:
+        return asdict(PoolMetrics())
+    return _pool.metrics()
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+# Normalized claims storage: small dimension tables plus an integer-keyed
+# fact table. ``claims`` is kept as a view with the original column layout so
+# every existing reader (pandas, snapshot, reports) works unchanged.
+NORMALIZED_SCHEMA_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS districts (
+        district_key INTEGER PRIMARY KEY,
+        district TEXT NOT NULL,
+        state TEXT NOT NULL,
+        UNIQUE (state, district)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hospitals (
+        hospital_key INTEGER PRIMARY KEY,
+        hospital_id TEXT NOT NULL UNIQUE,
+        hospital_name TEXT,
+        hospital_type TEXT,
+        district_key INTEGER NOT NULL REFERENCES districts (district_key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS procedures (
+        procedure_key INTEGER PRIMARY KEY,
+        procedure_code TEXT NOT NULL UNIQUE,
+        complexity TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS claim_facts (
+        claim_key INTEGER PRIMARY KEY,
+        claim_id TEXT NOT NULL,
+        hospital_key INTEGER NOT NULL REFERENCES hospitals (hospital_key),
+        district_key INTEGER NOT NULL REFERENCES districts (district_key),
+        procedure_key INTEGER NOT NULL REFERENCES procedures (procedure_key),
+        -- Nullable: a missing or unparsable source value is kept as NULL
+        patient_id TEXT,
+        claim_amount REAL,
+        admission_day INTEGER,  -- days since 1970-01-01
+        discharge_day INTEGER,
+        admission_month INTEGER,  -- YYYYMM
+        length_of_stay INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_facts_hospital_month ON claim_facts (hospital_key, admission_month)",
+    "CREATE INDEX IF NOT EXISTS idx_facts_district_procedure ON claim_facts (district_key, procedure_key)",
+    "CREATE INDEX IF NOT EXISTS idx_facts_patient ON claim_facts (patient_id)",
+    "CREATE INDEX IF NOT EXISTS idx_hospitals_type ON hospitals (hospital_type)",
+    "CREATE INDEX IF NOT EXISTS idx_districts_district ON districts (district)",
+]
+
+CLAIMS_VIEW_DDL = """
+    CREATE VIEW IF NOT EXISTS claims AS
+    SELECT
+        f.claim_id AS claim_id,
+        h.hospital_id AS hospital_id,
+        h.hospital_name AS hospital_name,
+        f.patient_id AS patient_id,
+        p.procedure_code AS procedure_code,
+        f.claim_amount AS claim_amount,
+        date(f.admission_day * 86400, 'unixepoch') AS admission_date,
+        date(f.discharge_day * 86400, 'unixepoch') AS discharge_date,
+        f.length_of_stay AS length_of_stay,
+        d.district AS district,
+        d.state AS state,
+        h.hospital_type AS hospital_type
+    FROM claim_facts AS f
+    JOIN hospitals AS h ON h.hospital_key = f.hospital_key
+    JOIN districts AS d ON d.district_key = f.district_key
+    JOIN procedures AS p ON p.procedure_key = f.procedure_key
+    ORDER BY f.claim_key
+"""
+
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+def _object_type(conn: sqlite3.Connection, name: str) -> Optional[str]:
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def is_normalized(conn: sqlite3.Connection) -> bool:
+    """
+    True when claims live in ``claim_facts`` and ``claims`` is the compatibility view.
+    """
+    return _object_type(conn, "claims") == "view"
+
+
+def has_legacy_claims_table(conn: sqlite3.Connection) -> bool:
+    return _object_type(conn, "claims") == "table"
+
+
+def claims_storage_table(conn: sqlite3.Connection) -> str:
+    """
+    Physical table holding claim rows (has a rowid), for version/size checks.
+    """
+    return "claim_facts" if is_normalized(conn) else "claims"
+
+
+def drop_claims_storage(conn: sqlite3.Connection) -> None:
+    """
+    Remove every claims object (legacy table or normalized view, facts and
+    dimensions) before a full rebuild. Tables derived from the facts use the
+    ``fs_`` prefix (see preprocessing/feature_store.py) and are dropped too.
+    """
+    kind = _object_type(conn, "claims")
+    if kind == "view":
+        conn.execute("DROP VIEW claims")
+    elif kind == "table":
+        conn.execute("DROP TABLE claims")
+    derived = [
+        row[0]
+        for row in conn.execute(
+            r"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'fs\_%' ESCAPE '\'"
+        ).fetchall()
+    ]
+    for table in derived + ["claim_facts", "hospitals", "procedures", "districts"]:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+
+
+def migrate_to_normalized(
+    conn: sqlite3.Connection,
+    source_table: str = "claims",
+    procedure_complexity: Optional[Dict[str, str]] = None,
+    analyze: bool = True,
+) -> int:
+    """
+    Move rows from a flat claims table (the original ``df.to_sql`` layout)
+    into the dimension + fact schema, then drop it and expose ``claims`` as a view.
+
+    Runs entirely as ``INSERT ... SELECT`` inside SQLite, in one transaction.
+    A missing hospital, procedure or district maps to an 'Unknown' dimension
+    row, so every source row becomes a fact; the source is only dropped once
+    the fact count matches its row count (RuntimeError and rollback otherwise).
+    Rows are appended to any existing facts, so this also serves as the load
+    step for freshly generated data and for appended batches (pass
+    ``analyze=False`` there to skip refreshing planner statistics). Returns
+    the number of facts inserted.
+    """
+    if _object_type(conn, source_table) != "table":
+        return 0
+
+    with conn:
+        conn.execute("BEGIN")
+        if source_table == "claims" and _object_type(conn, "claims") == "table":
+            # Free the name for the view; the flat data is migrated from the renamed table.
+            conn.execute("ALTER TABLE claims RENAME TO claims_legacy")
+            source_table = "claims_legacy"
+        for ddl in NORMALIZED_SCHEMA_DDL:
+            conn.execute(ddl)
+
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO districts (district, state)
+            SELECT DISTINCT coalesce(district, 'Unknown'), coalesce(state, 'Unknown') FROM {source_table}
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO hospitals (hospital_id, hospital_name, hospital_type, district_key)
+            SELECT coalesce(s.hospital_id, 'Unknown'), min(s.hospital_name), min(s.hospital_type), min(d.district_key)
+            FROM {source_table} AS s
+            JOIN districts AS d
+              ON d.district = coalesce(s.district, 'Unknown') AND d.state = coalesce(s.state, 'Unknown')
+            GROUP BY coalesce(s.hospital_id, 'Unknown')
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO procedures (procedure_code)
+            SELECT DISTINCT coalesce(procedure_code, 'Unknown') FROM {source_table}
+            """
+        )
+        if procedure_complexity:
+            conn.executemany(
+                "UPDATE procedures SET complexity = ? WHERE procedure_code = ? AND complexity IS NULL",
+                [(complexity, code) for code, complexity in procedure_complexity.items()],
+            )
+
+        inserted = conn.execute(
+            f"""
+            INSERT INTO claim_facts (
+                claim_id, hospital_key, district_key, procedure_key, patient_id, claim_amount,
+                admission_day, discharge_day, admission_month, length_of_stay
+            )
+            SELECT
+                s.claim_id,
+                h.hospital_key,
+                d.district_key,
+                p.procedure_key,
+                s.patient_id,
+                s.claim_amount,
+                CAST(julianday(s.admission_date) - {_UNIX_EPOCH_JULIAN_DAY} AS INTEGER),
+                CAST(julianday(s.discharge_date) - {_UNIX_EPOCH_JULIAN_DAY} AS INTEGER),
+                CAST(strftime('%Y%m', s.admission_date) AS INTEGER),
+                s.length_of_stay
+            FROM {source_table} AS s
+            JOIN hospitals AS h ON h.hospital_id = coalesce(s.hospital_id, 'Unknown')
+            JOIN districts AS d
+              ON d.district = coalesce(s.district, 'Unknown') AND d.state = coalesce(s.state, 'Unknown')
+            JOIN procedures AS p ON p.procedure_code = coalesce(s.procedure_code, 'Unknown')
+            ORDER BY s.rowid
+            """
+        ).rowcount
+
+        expected = conn.execute(f"SELECT count(*) FROM {source_table}").fetchone()[0]
+        if inserted != expected:
+            raise RuntimeError(
+                f"Migrated {inserted} of {expected} claims from {source_table}; source table kept"
+            )
+        conn.execute(f"DROP TABLE {source_table}")
+        conn.execute(CLAIMS_VIEW_DDL)
+    if analyze:
+        conn.execute("ANALYZE")
+    return inserted
+
+
+def query_claims(
+    conn: sqlite3.Connection,
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    hospital_type: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Filtered read of the claims view. Filters are pushed through the view onto
+    the dimension tables, so SQLite resolves them to hospital/district keys and
+    walks the fact indexes instead of scanning every claim.
+    """
+    clauses, params = [], []
+    for col, value in (("state", state), ("district", district), ("hospital_type", hospital_type)):
+        if value is not None and value != "All":
+            clauses.append(f"{col} = ?")
+            params.append(value)
+    select = "*" if columns is None else ", ".join(columns)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return pd.read_sql_query(f"SELECT {select} FROM claims{where}", conn, params=params)
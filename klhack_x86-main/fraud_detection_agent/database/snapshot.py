@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.database.db_setup import DB_DIR, get_claims_version
+
+
+SNAPSHOT_DIR = DB_DIR / "claims_snapshot"
+MANIFEST_NAME = "manifest.json"
+# Bumped when the on-disk layout changes; older snapshots are rewritten
+# (2: nulls kept as NaN / code -1 / validity mask instead of 0 and "")
+SNAPSHOT_FORMAT = 2
+
+# Unique per row, so a dictionary would be as large as the column itself;
+# stored as fixed-width bytes instead.
+_FIXED_WIDTH_COLUMNS = {"claim_id"}
+
+_READ_CHUNK_ROWS = 200_000
+
+
+def _manifest_path(snapshot_dir: Path) -> Path:
+    return snapshot_dir / MANIFEST_NAME
+
+
+def read_manifest(snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[Dict]:
+    """
+    Return the current snapshot manifest, or None if no snapshot exists (or
+    it was written in an older ``SNAPSHOT_FORMAT``).
+    """
+    try:
+        manifest = json.loads(_manifest_path(snapshot_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == SNAPSHOT_FORMAT else None
+
+
+def snapshot_is_current(conn: sqlite3.Connection, snapshot_dir: Path = SNAPSHOT_DIR) -> bool:
+    manifest = read_manifest(snapshot_dir)
+    return manifest is not None and manifest.get("version") == get_claims_version(conn)
+
+
+def categorical_from_codes(codes: np.ndarray, labels: np.ndarray) -> pd.Categorical:
+    """
+    Build a categorical from integer codes into ``labels`` (-1 = missing),
+    with categories sorted so groupbys order groups like the string column would.
+    """
+    labels = np.asarray(labels, dtype=object)
+    order = np.argsort(labels, kind="stable")
+    remap = np.empty(len(labels) + 1, dtype=np.int32)
+    remap[order] = np.arange(len(labels), dtype=np.int32)
+    remap[-1] = -1
+    return pd.Categorical.from_codes(remap[np.asarray(codes)], categories=labels[order])
+
+
+class _ColumnWriter:
+    """
+    Accumulates one column chunk by chunk into a pre-sized .npy memmap.
+
+    Text columns are dictionary-encoded (int32 codes + label array, -1 for a
+    missing value) except those in ``_FIXED_WIDTH_COLUMNS``, which are stored
+    as fixed-width bytes plus a validity mask when the column ``has_nulls``.
+    A numeric column with nulls is stored as float64 with NaN, as a SQL read
+    would return it.
+    """
+
+    def __init__(
+        self, name: str, first_chunk: pd.Series, n_rows: int, out_dir: Path, width: int, has_nulls: bool = False
+    ) -> None:
+        self.name = name
+        self.out_dir = out_dir
+        self.offset = 0
+        self.valid = None
+        if pd.api.types.is_numeric_dtype(first_chunk.dtype) and not pd.api.types.is_bool_dtype(first_chunk.dtype):
+            self.kind = "numeric"
+            dtype = np.float64 if has_nulls or pd.api.types.is_float_dtype(first_chunk.dtype) else np.int64
+        elif name in _FIXED_WIDTH_COLUMNS:
+            self.kind = "bytes"
+            dtype = np.dtype(f"S{max(1, width)}")
+            if has_nulls:
+                self.valid = np.lib.format.open_memmap(
+                    out_dir / f"{name}.valid.npy", mode="w+", dtype=np.bool_, shape=(n_rows,)
+                )
+        else:
+            self.kind = "dict"
+            dtype = np.int32
+            self.labels: Dict[str, int] = {}
+        self.values = np.lib.format.open_memmap(out_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=(n_rows,))
+
+    def append(self, chunk: pd.Series) -> None:
+        n = len(chunk)
+        target = self.values[self.offset : self.offset + n]
+        if self.kind == "numeric":
+            target[:] = chunk.to_numpy(dtype=self.values.dtype, na_value=np.nan)
+        elif self.kind == "bytes":
+            target[:] = chunk.fillna("").astype(str).str.encode("utf-8").to_numpy(dtype=self.values.dtype)
+            if self.valid is not None:
+                self.valid[self.offset : self.offset + n] = chunk.notna().to_numpy()
+        else:
+            local_codes, local_labels = pd.factorize(chunk, sort=False)
+            # Trailing -1 so a missing value (code -1) stays -1
+            mapping = np.array(
+                [self.labels.setdefault(str(label), len(self.labels)) for label in local_labels] + [-1],
+                dtype=np.int32,
+            )
+            target[:] = mapping[local_codes]
+        self.offset += n
+
+    def finish(self) -> Dict:
+        self.values.flush()
+        del self.values
+        meta = {"kind": self.kind}
+        if self.valid is not None:
+            self.valid.flush()
+            self.valid = None
+            meta["nullable"] = True
+        if self.kind == "dict":
+            labels = np.array(list(self.labels), dtype=str) if self.labels else np.array([], dtype="U1")
+            np.save(self.out_dir / f"{self.name}.labels.npy", labels)
+        return meta
+
+
+def write_claims_snapshot(
+    conn: sqlite3.Connection,
+    df: Optional[pd.DataFrame] = None,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    force: bool = False,
+) -> bool:
+    """
+    Write a columnar snapshot of ``claims`` tagged with the table's data version.
+
+    Uses ``df`` when the caller already holds the full table in memory,
+    otherwise streams the table in chunks so memory stays bounded. Each
+    version goes into its own sub-directory and the manifest is swapped in
+    atomically, so concurrent readers never see a half-written snapshot.
+
+    Returns False if the snapshot was already current (nothing written).
+    """
+    version = get_claims_version(conn)
+    manifest = read_manifest(snapshot_dir)
+    if not force and manifest is not None and manifest.get("version") == version:
+        return False
+
+    n_rows = len(df) if df is not None else conn.execute("SELECT count(*) FROM claims").fetchone()[0]
+    columns = list(df.columns) if df is not None else [
+        row[1] for row in conn.execute("PRAGMA table_info(claims)").fetchall()
+    ]
+    widths = {
+        c: int(conn.execute(f"SELECT max(length(CAST({c} AS BLOB))) FROM claims").fetchone()[0] or 1)
+        for c in columns
+        if c in _FIXED_WIDTH_COLUMNS
+    }
+    # Known up front, since a null may only show up in a later chunk
+    if df is not None:
+        has_nulls = {c: bool(df[c].isna().any()) for c in columns}
+    else:
+        counts = conn.execute(
+            f"SELECT {', '.join(f'coalesce(sum({c} IS NULL), 0)' for c in columns)} FROM claims"
+        ).fetchone()
+        has_nulls = {c: bool(count) for c, count in zip(columns, counts)}
+
+    if df is not None:
+        chunks: Iterable[pd.DataFrame] = [df]
+    else:
+        chunks = pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM claims",
+            conn,
+            chunksize=_READ_CHUNK_ROWS,
+        )
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    data_dir_name = f"v_{version.replace(':', '_')}_{os.getpid()}"
+    data_dir = snapshot_dir / data_dir_name
+    shutil.rmtree(data_dir, ignore_errors=True)
+    data_dir.mkdir()
+
+    writers: Dict[str, _ColumnWriter] = {}
+    for chunk in chunks:
+        for c in columns:
+            if c not in writers:
+                writers[c] = _ColumnWriter(c, chunk[c], n_rows, data_dir, widths.get(c, 0), has_nulls[c])
+            writers[c].append(chunk[c])
+
+    new_manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "n_rows": int(n_rows),
+        "data_dir": data_dir_name,
+        "columns": {c: writers[c].finish() for c in columns} if writers else {},
+    }
+    tmp_manifest = snapshot_dir / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+    tmp_manifest.write_text(json.dumps(new_manifest, indent=2), encoding="utf-8")
+    os.replace(tmp_manifest, _manifest_path(snapshot_dir))
+
+    # Drop superseded versions; readers holding memmaps keep their inodes alive.
+    for old in snapshot_dir.iterdir():
+        if old.is_dir() and old.name != data_dir_name:
+            shutil.rmtree(old, ignore_errors=True)
+    return True
+
+
+def load_claims_snapshot(
+    columns: Optional[List[str]] = None,
+    version: Optional[str] = None,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    categorical: Iterable[str] = (),
+) -> Optional[pd.DataFrame]:
+    """
+    Load claims columns from the snapshot, memory-mapping numeric arrays.
+
+    Only the requested ``columns`` are read. Dictionary-encoded columns named
+    in ``categorical`` come back as pandas categoricals built straight from the
+    stored codes and labels, so no per-row strings are created. Returns None when there is no
+    snapshot, when it does not match ``version``, or when a requested column
+    is missing, so callers can fall back to SQL.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None or (version is not None and manifest.get("version") != version):
+        return None
+    available = manifest["columns"]
+    wanted = list(available) if columns is None else list(columns)
+    if any(c not in available for c in wanted):
+        return None
+
+    data_dir = snapshot_dir / manifest["data_dir"]
+    categorical = set(categorical)
+    data = {}
+    try:
+        for c in wanted:
+            values = np.load(data_dir / f"{c}.npy", mmap_mode="r")
+            kind = available[c]["kind"]
+            if kind == "numeric":
+                data[c] = values
+            elif kind == "bytes":
+                data[c] = np.char.decode(values, "utf-8").astype(object)
+                if available[c].get("nullable"):
+                    data[c][~np.load(data_dir / f"{c}.valid.npy")] = None
+            elif c in categorical:
+                data[c] = categorical_from_codes(values, np.load(data_dir / f"{c}.labels.npy"))
+            else:
+                # Trailing None for code -1 (missing)
+                labels = np.append(np.load(data_dir / f"{c}.labels.npy").astype(object), None)
+                data[c] = labels[values]
+    except OSError:
+        # Snapshot replaced underneath us; caller falls back to SQL
+        return None
+    return pd.DataFrame(data, columns=wanted)
@@ -3,24 +3,44 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import astuple
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from fraud_detection_agent.agent.monitor import persist_hospital_snapshot
+from fraud_detection_agent.agent.result_cache import ResultCache
+from fraud_detection_agent.agent.retrainer import RetrainingService
 from fraud_detection_agent.blockchain.algorand_client import AlgorandClient
-from fraud_detection_agent.database.db_setup import init_csv_and_db
-from fraud_detection_agent.models.anomaly_model import AnomalyDetector
+from fraud_detection_agent.database.db_setup import N_CLAIMS, init_csv_and_db
+from fraud_detection_agent.models.anomaly_model import DETECTOR_MODE, HistogramDetector, make_detector
+from fraud_detection_agent.models.registry import fit_or_load
+from fraud_detection_agent.models.segmented import SEGMENT_KEY, SegmentedDetector
+from fraud_detection_agent.preprocessing.feature_store import refresh_feature_store
 from fraud_detection_agent.preprocessing.preprocess import build_features_from_db
 from fraud_detection_agent.reports.report_generator import generate_fraud_report
+from fraud_detection_agent.scoring.batch_scoring import ClaimScorer, score_claim_records
+from fraud_detection_agent.scoring.duplicates import DuplicateIndex, flag_duplicates
+from fraud_detection_agent.scoring.filter_index import FilterIndex
+from fraud_detection_agent.scoring.summary_cube import SummaryCube
+from fraud_detection_agent.scoring.graph import hospital_graph_features, incidence_from_claims
 from fraud_detection_agent.scoring.risk_scoring import (
+    RiskComponents,
+    RiskConfig,
     aggregate_hospital_risk,
-    apply_rule_based_flags,
+    build_risk_components,
+    build_risk_reference,
     compute_risk_scores,
+    evaluate_rule_flags,
+    reweight_risk,
 )
 
 print("-" * 50)
@@ -28,7 +48,15 @@ print("AYUSHGUARD SERVER BOOTING...")
 print(f"ALGORAND WALLET: {os.getenv('ALGORAND_MNEMONIC')[:10] if os.getenv('ALGORAND_MNEMONIC') else 'NOT SET'}...")
 print("-" * 50)
 
-app = FastAPI(title="Ayushman Bharat Fraud Detection Agent - Stage 1")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if BACKGROUND_RETRAIN:
+        start_retrainer()
+    yield
+    if _retrainer is not None:
+        _retrainer.stop(timeout=5)
+
+app = FastAPI(title="Ayushman Bharat Fraud Detection Agent - Stage 1", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -55,8 +83,61 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class ClaimRecord(BaseModel):
+    claim_id: str
+    hospital_id: str
+    patient_id: str
+    procedure_code: str
+    claim_amount: float
+    admission_date: str
+    length_of_stay: int
+    district: str
+
+class ScoreClaimsRequest(BaseModel):
+    claims: List[ClaimRecord]
+
+class WhatIfRequest(BaseModel):
+    w_anomaly: float = Field(0.5, ge=0)
+    w_proc_dev: float = Field(0.3, ge=0)
+    w_claim_freq: float = Field(0.2, ge=0)
+    claim_band_quantiles: Tuple[float, float] = (0.5, 0.85)
+    hospital_band_quantiles: Tuple[float, float] = (0.5, 0.8)
+    hospital_type: Optional[str] = None
+    limit: int = Field(20, ge=0)
+
 _pipeline_cache = {}
 
+# "memory" holds the scored claims as DataFrames in _pipeline_cache;
+# "out_of_core" streams claims through scoring/out_of_core.py and endpoints
+# query the claim_results / hospital_results tables instead.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "memory")
+_results_lock = threading.Lock()
+
+# "1" rebuilds features and model on a background worker (agent/retrainer.py)
+# and hot-swaps the result, so requests are served from the previous build
+# meanwhile; "0" builds inline on the first request after a cache miss.
+BACKGROUND_RETRAIN = os.getenv("BACKGROUND_RETRAIN", "1") == "1"
+RETRAIN_INTERVAL_SECONDS = float(os.getenv("RETRAIN_INTERVAL_SECONDS", "3600"))
+RETRAIN_POLL_SECONDS = float(os.getenv("RETRAIN_POLL_SECONDS", "30"))
+# "process" runs each rebuild in a worker process so model fits do not hold
+# the GIL the request handlers need; "thread" builds in this process.
+RETRAIN_WORKER = os.getenv("RETRAIN_WORKER", "process")
+_retrainer: RetrainingService | None = None
+
+# Focused views of a pipeline build, per (build version, hospital type focus,
+# persist_snapshot), least recently used evicted first. Without the retrainer
+# an inline build is checked against the claims data version at most every
+# PIPELINE_CACHE_CHECK_SECONDS and rebuilt when the claims changed.
+PIPELINE_CACHE_SIZE = int(os.getenv("PIPELINE_CACHE_SIZE", "16"))
+PIPELINE_CACHE_CHECK_SECONDS = float(os.getenv("PIPELINE_CACHE_CHECK_SECONDS", "30"))
+_view_cache = ResultCache(PIPELINE_CACHE_SIZE)
+
+# What-if re-weighting: hospital tables per (pipeline version, RiskConfig),
+# least recently used evicted first
+WHAT_IF_CACHE_SIZE = int(os.getenv("WHAT_IF_CACHE_SIZE", "128"))
+_what_if_cache = ResultCache(WHAT_IF_CACHE_SIZE)
+_risk_components: Dict[Any, RiskComponents] = {}
+
 @app.post("/login")
 def login(request: LoginRequest):
     from fraud_detection_agent.database.db_setup import get_db_connection
@@ -73,37 +154,166 @@ def login(request: LoginRequest):
         from fastapi import HTTPException
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-def run_full_pipeline(
-    focus_hospital_type: str | None = None,
-    persist_snapshot: bool = True,
-    force_refresh: bool = False
-) -> Dict[str, Any]:
-    cache_key = f"{focus_hospital_type}_{persist_snapshot}"
-    if not force_refresh and cache_key in _pipeline_cache:
-        return _pipeline_cache[cache_key]
-
-    df_raw, _ = init_csv_and_db(n_rows=30000, reuse_existing=True)
+def _build_pipeline(data_version: str | None = None, detector_mode: str | None = None) -> Dict[str, Any]:
+    """
+    Load features, fit (or reuse) the anomaly model and score every claim.
+    Returns the unfocused result that ``run_full_pipeline`` views are cut from.
+    """
+    init_csv_and_db(n_rows=N_CLAIMS, reuse_existing=True, load_data=False)
+    # Kept current here, off the request path, for POST /score-claims
+    refresh_feature_store()
     features_data = build_features_from_db()
-    detector = AnomalyDetector()
-    anomaly_results = detector.fit_predict(features_data.features)
-    df_enriched = features_data.enriched.copy()
+    detector = make_detector(detector_mode)
+    if isinstance(detector, HistogramDetector):
+        # Fast mode: refitting is cheaper than fingerprinting and loading a saved model
+        anomaly_results = detector.fit(features_data.features)
+        print("Anomaly model: fast histogram detector")
+    else:
+        # Reuses a saved model when the feature matrix is unchanged since it was fitted.
+        # With SEGMENT_KEY set, one model per segment is fitted in worker processes.
+        if SEGMENT_KEY:
+            detector = SegmentedDetector(SEGMENT_KEY)
+            segments = features_data.enriched[SEGMENT_KEY]
+        else:
+            segments = None
+        detector, anomaly_results, model_meta = fit_or_load(
+            features_data.features,
+            feature_scaler=features_data.scaler_claim_amount,
+            detector=detector,
+            segments=segments,
+        )
+        print(f"Anomaly model: {model_meta['source']} ({model_meta['fingerprint'][:12]})")
+    # Not copied: features_data is not used after this point, and the frame's
+    # label columns are categoricals decoded only when a response is built.
+    df_enriched = features_data.enriched
     if "state" not in df_enriched.columns:
         df_enriched["state"] = "Unknown"
     
     df_enriched["anomaly_score_model"] = anomaly_results.combined_score
-    df_enriched["anomaly_label"] = (anomaly_results.combined_score > 0.7).astype(int)
+    df_enriched["anomaly_label"] = (anomaly_results.combined_score > 0.7).astype(np.int8)
     df_scored = compute_risk_scores(df_enriched, anomaly_results.combined_score)
-    df_flagged = apply_rule_based_flags(df_scored)
-    hospital_risk_df = aggregate_hospital_risk(df_flagged)
-
-    if focus_hospital_type:
-        claims_focus = df_flagged[df_flagged["hospital_type"] == focus_hospital_type].copy()
-        hosp_focus = hospital_risk_df[
-            hospital_risk_df["hospital_type"] == focus_hospital_type
-        ].copy()
-    else:
-        claims_focus = df_flagged
-        hosp_focus = hospital_risk_df
+    df_flagged, rule_report = evaluate_rule_flags(df_scored)
+    # The index of every stored claim is kept for matching scored batches
+    duplicate_index = DuplicateIndex()
+    df_flagged = flag_duplicates(df_flagged, index=duplicate_index)
+    # Co-patient links between hospitals (sparse patient x hospital graph)
+    graph_features = hospital_graph_features(incidence_from_claims(df_flagged))
+    hospital_risk_df = aggregate_hospital_risk(df_flagged, graph_features=graph_features)
+
+    suspicious = (df_flagged["anomaly_label"] == 1).to_numpy() | df_flagged["any_rule_flag"].to_numpy(dtype=bool)
+
+    return {
+        "claims_all": df_flagged,
+        "hospital_risk_all": hospital_risk_df,
+        # Row positions per state / district / hospital_type and risk order,
+        # so endpoints slice in O(result) (see FilterIndex)
+        "claims_index": FilterIndex(df_flagged, suspicious=suspicious),
+        "hospital_index": FilterIndex(hospital_risk_df),
+        # Additive aggregates answering /get-summary without the claim rows
+        "summary_cube": SummaryCube(df_flagged, hospital_risk_df, suspicious),
+        # Rule timings of this build, for /get-rule-stats
+        "rule_report": rule_report,
+        "scorer": ClaimScorer(
+            detector=detector,
+            scaler_claim_amount=features_data.scaler_claim_amount,
+            risk_reference=build_risk_reference(df_scored),
+            duplicate_index=duplicate_index,
+        ),
+    }
+
+def _current_build(force_refresh: bool = False, detector_mode: str | None = None) -> tuple:
+    """
+    ``(build version, unfocused pipeline result)``. With the retrainer
+    running this is its published build (requests never wait for a refit,
+    except for the very first build); otherwise, or for a detector mode other
+    than DETECTOR_MODE, it is built inline and rebuilt when the claims data
+    version has changed (checked at most every PIPELINE_CACHE_CHECK_SECONDS).
+    """
+    mode = detector_mode or DETECTOR_MODE
+    if _retrainer is not None and _retrainer.is_running and mode == DETECTOR_MODE:
+        if force_refresh:
+            _retrainer.request_rebuild()
+        build = _retrainer.current()
+        return build.version, build.value
+    key = f"inline_{mode}"
+    entry = _pipeline_cache.get(key)
+    if entry is not None and not force_refresh and time.monotonic() - entry["checked_at"] < PIPELINE_CACHE_CHECK_SECONDS:
+        return entry["version"], entry["base"]
+    with _results_lock:
+        entry = _pipeline_cache.get(key)
+        if entry is None:
+            # Seed an empty database at the pipeline's size before its version
+            # becomes the cache key (the build would otherwise reuse whatever
+            # the probe's connection seeded)
+            init_csv_and_db(n_rows=N_CLAIMS, reuse_existing=True, load_data=False)
+        data_version = _claims_data_version()
+        if force_refresh or entry is None or entry["data_version"] != data_version:
+            version = f"inline-{mode}-{datetime.now().isoformat()}"
+            entry = {"version": version, "base": _build_pipeline(detector_mode=mode), "data_version": data_version}
+            _pipeline_cache[key] = entry
+            _drop_stale_views()
+        entry["checked_at"] = time.monotonic()
+        return entry["version"], entry["base"]
+
+def _live_versions() -> set:
+    live = {v["version"] for k, v in list(_pipeline_cache.items()) if isinstance(k, str) and k.startswith("inline_")}
+    served = _retrainer.status()["version"] if _retrainer is not None else None
+    if served is not None:
+        live.add(served)
+    return live
+
+def _drop_stale_views(*_) -> None:
+    """
+    Drop cached views and what-if tables of builds no longer served;
+    requests already holding one keep it.
+    """
+    live = _live_versions()
+    _view_cache.invalidate(lambda key: key[0] not in live)
+    # Out-of-core what-if entries are keyed by claims version and aged out by the LRU
+    _what_if_cache.invalidate(lambda key: not isinstance(key[0], tuple) and key[0] not in live)
+
+def invalidate_pipeline_cache() -> None:
+    """
+    Forget every cached build and view, e.g. right after the claims changed
+    rather than at the next data version check; the next request rebuilds
+    (or, with the retrainer running, a rebuild is scheduled and the current
+    build is served until it is published).
+    """
+    with _results_lock:
+        for key in [k for k in list(_pipeline_cache) if isinstance(k, str) and k.startswith("inline_")]:
+            _pipeline_cache.pop(key, None)
+        _pipeline_cache.pop("out_of_core", None)
+    _view_cache.invalidate()
+    _what_if_cache.invalidate()
+    _risk_components.clear()
+    if _retrainer is not None and _retrainer.is_running:
+        _retrainer.request_rebuild()
+
+def run_full_pipeline(
+    focus_hospital_type: str | None = None,
+    persist_snapshot: bool = True,
+    force_refresh: bool = False,
+    detector_mode: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Scored claims and hospital risk, optionally focused on one hospital type.
+    ``detector_mode`` ("ensemble" or "fast", see DETECTOR_MODES) overrides
+    DETECTOR_MODE for this run.
+
+    The national pipeline runs once per build (data version); a focus is a
+    filtered view of it, cached in ``_view_cache``. The returned frames are
+    shared between requests and must not be modified.
+    """
+    version, base = _current_build(force_refresh=force_refresh, detector_mode=detector_mode)
+    cache_key = (version, focus_hospital_type, persist_snapshot)
+    output = _view_cache.get(cache_key)
+    if output is not None:
+        return output
+
+    df_flagged = base["claims_all"]
+    hospital_risk_df = base["hospital_risk_all"]
+    claims_focus = base["claims_index"].select(df_flagged, hospital_type=focus_hospital_type)
+    hosp_focus = base["hospital_index"].select(hospital_risk_df, hospital_type=focus_hospital_type)
 
     if persist_snapshot:
         try:
@@ -116,15 +326,241 @@ def run_full_pipeline(
         "hospital_risk": hosp_focus,
         "claims_all": df_flagged,
         "hospital_risk_all": hospital_risk_df,
+        "claims_index": base["claims_index"],
+        "hospital_index": base["hospital_index"],
+        "summary_cube": base["summary_cube"],
+        "scorer": base["scorer"],
     }
-    
-    _pipeline_cache[cache_key] = output
+    _view_cache.put(cache_key, output)
     return output
 
+def _build_out_of_core(data_version: str | None = None, force_refresh: bool = False,
+                       persist_snapshot: bool = True) -> Dict[str, Any]:
+    """
+    Rebuild the out-of-core result tables unless they already match the
+    claims data, and return the scorer recorded with them. The claim results
+    table is replaced in one transaction, so readers keep seeing the
+    previous results until the rebuild commits.
+    """
+    from fraud_detection_agent.database.db_setup import get_db_connection
+    from fraud_detection_agent.scoring.out_of_core import (
+        load_results_scorer,
+        results_are_current,
+        run_out_of_core_pipeline,
+    )
+
+    init_csv_and_db(n_rows=N_CLAIMS, reuse_existing=True, load_data=False)
+    # Kept current here, off the request path, for POST /score-claims
+    refresh_feature_store()
+    conn = get_db_connection()
+    try:
+        current = results_are_current(conn)
+        scorer = load_results_scorer(conn) if current and not force_refresh else None
+    finally:
+        conn.close()
+    if scorer is None:
+        # Results are stale, or predate the recorded scorer / its model was pruned
+        run = run_out_of_core_pipeline()
+        scorer = run["scorer"]
+        if persist_snapshot:
+            try:
+                persist_hospital_snapshot(run["hospital_risk"])
+            except Exception:
+                pass
+    return {"scorer": scorer}
+
+def ensure_out_of_core_results(force_refresh: bool = False, persist_snapshot: bool = True) -> None:
+    """
+    Build the out-of-core result tables once per process (or when forced),
+    unless they already match the current claims data. With the retrainer
+    running, its worker keeps them current instead.
+    """
+    if _retrainer is not None and _retrainer.is_running:
+        if force_refresh:
+            _retrainer.request_rebuild()
+        _retrainer.current()
+        return
+    if not force_refresh and _pipeline_cache.get("out_of_core"):
+        return
+    with _results_lock:
+        if not force_refresh and _pipeline_cache.get("out_of_core"):
+            return
+        built = _build_out_of_core(force_refresh=force_refresh, persist_snapshot=persist_snapshot)
+        _pipeline_cache["out_of_core_scorer"] = built["scorer"]
+        _pipeline_cache["out_of_core"] = True
+
+
+def get_claim_scorer() -> ClaimScorer:
+    """
+    The frozen model + risk reference of the current pipeline, for scoring
+    claims that are not in the database.
+    """
+    if PIPELINE_MODE != "out_of_core":
+        return run_full_pipeline()["scorer"]
+    if _retrainer is not None and _retrainer.is_running:
+        return _retrainer.current().value["scorer"]
+    ensure_out_of_core_results()
+    return _pipeline_cache["out_of_core_scorer"]
+
+
+def _claims_data_version() -> str:
+    from fraud_detection_agent.database.db_setup import get_claims_version, get_db_connection
+
+    conn = get_db_connection()
+    try:
+        return get_claims_version(conn)
+    finally:
+        conn.close()
+
+
+def start_retrainer() -> RetrainingService:
+    """
+    Start (once) the background worker that rebuilds the pipeline for
+    PIPELINE_MODE when the claims data changes or every
+    RETRAIN_INTERVAL_SECONDS, and hot-swaps the result.
+    """
+    global _retrainer
+    if _retrainer is None:
+        build = _build_out_of_core if PIPELINE_MODE == "out_of_core" else _build_pipeline
+        _retrainer = RetrainingService(
+            build,
+            _claims_data_version,
+            interval_seconds=RETRAIN_INTERVAL_SECONDS,
+            poll_seconds=RETRAIN_POLL_SECONDS,
+            on_swap=_drop_stale_views,
+            worker=RETRAIN_WORKER,
+        )
+    return _retrainer.start()
+
+
+def _results_query(query, **kwargs):
+    """
+    Run one of the out_of_core query helpers on a pooled connection.
+    """
+    from fraud_detection_agent.database.db_setup import get_db_connection
+
+    ensure_out_of_core_results()
+    conn = get_db_connection()
+    try:
+        return query(conn, **kwargs)
+    finally:
+        conn.close()
+
+
+def _current_risk_components() -> tuple:
+    """
+    ``(version, RiskComponents)`` of the pipeline being served, built on
+    first use per version; only the latest version is kept.
+    """
+    if PIPELINE_MODE == "out_of_core":
+        from fraud_detection_agent.database.db_setup import get_claims_version, get_db_connection
+        from fraud_detection_agent.scoring.out_of_core import load_risk_components
+
+        scorer = get_claim_scorer()
+        conn = get_db_connection()
+        try:
+            version = ("out_of_core", get_claims_version(conn))
+            components = _risk_components.get(version)
+            if components is None:
+                components = load_risk_components(conn, scorer.risk_reference)
+        finally:
+            conn.close()
+    else:
+        version, base = _current_build()
+        components = _risk_components.get(version)
+        if components is None:
+            components = build_risk_components(base["claims_all"])
+    if version not in _risk_components:
+        _risk_components.clear()
+        _risk_components[version] = components
+    return version, components
+
+
+def what_if_hospital_risk(config: RiskConfig) -> tuple:
+    """
+    Hospital risk table re-weighted with ``config`` from the cached risk
+    components (see ``reweight_risk``), memoized per pipeline version and
+    config. Returns ``(table, cache hit)``.
+    """
+    version, components = _current_risk_components()
+    key = (version, astuple(config))
+    table = _what_if_cache.get(key)
+    if table is not None:
+        return table, True
+    table = reweight_risk(components, config)
+    _what_if_cache.put(key, table)
+    return table, False
+
+
+@app.post("/what-if-risk")
+def what_if_risk(request: WhatIfRequest):
+    """
+    Recompute claim and hospital risk under other weights / band quantiles
+    without re-running the models.
+    """
+    for low, high in (request.claim_band_quantiles, request.hospital_band_quantiles):
+        if not 0.0 <= low <= high <= 1.0:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=422, detail="Band quantiles must satisfy 0 <= low <= high <= 1")
+    config = RiskConfig(
+        w_anomaly=request.w_anomaly,
+        w_proc_dev=request.w_proc_dev,
+        w_claim_freq=request.w_claim_freq,
+        claim_band_quantiles=tuple(request.claim_band_quantiles),
+        hospital_band_quantiles=tuple(request.hospital_band_quantiles),
+    )
+    start = time.perf_counter()
+    table, cached = what_if_hospital_risk(config)
+    baseline, _ = what_if_hospital_risk(RiskConfig())
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    table = table.assign(baseline_category=baseline["risk_category_overall"])
+    if request.hospital_type:
+        table = table[table["hospital_type"] == request.hospital_type]
+    changed = table["risk_category_overall"] != table["baseline_category"]
+    top = table.sort_values("audit_priority_score", ascending=False).head(request.limit)
+    for col in ("risk_category_overall", "baseline_category"):
+        top[col] = top[col].astype(str)
+    return {
+        "config": {
+            "w_anomaly": config.w_anomaly,
+            "w_proc_dev": config.w_proc_dev,
+            "w_claim_freq": config.w_claim_freq,
+            "claim_band_quantiles": list(config.claim_band_quantiles),
+            "hospital_band_quantiles": list(config.hospital_band_quantiles),
+        },
+        "cached": cached,
+        "compute_ms": elapsed_ms,
+        "claim_risk_distribution": [
+            {"category": "Low", "count": int(table["low_risk_claims"].sum())},
+            {"category": "Medium", "count": int(table["medium_risk_claims"].sum())},
+            {"category": "High", "count": int(table["high_risk_claims"].sum())},
+        ],
+        "risk_distribution": [
+            {"category": c, "count": int((table["risk_category_overall"] == c).sum())}
+            for c in ("Low", "Medium", "High")
+        ],
+        "hospitals_changed_category": int(changed.sum()),
+        "hospitals": top.to_dict(orient="records"),
+    }
+
+@app.post("/score-claims")
+def score_claims(request: ScoreClaimsRequest):
+    if not request.claims:
+        return []
+    records = pd.DataFrame([claim.model_dump() for claim in request.claims])
+    scored = score_claim_records(get_claim_scorer(), records)
+    scored["risk_category"] = scored["risk_category"].astype(str)
+    return scored.to_dict(orient="records")
+
 @app.get("/get-high-risk-hospitals", response_model=List[HospitalRisk])
 def get_high_risk_hospitals(limit: int = 10, hospital_type: str = None):
-    pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
-    hospital_df = pipeline_output["hospital_risk"]
+    if PIPELINE_MODE == "out_of_core":
+        from fraud_detection_agent.scoring.out_of_core import query_hospital_results
+        hospital_df = _results_query(query_hospital_results, hospital_type=hospital_type)
+    else:
+        pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
+        hospital_df = pipeline_output["hospital_risk"]
     top = hospital_df.sort_values(by="avg_risk_score", ascending=False).head(limit)
     return [
         HospitalRisk(
@@ -144,34 +580,57 @@ def get_high_risk_hospitals(limit: int = 10, hospital_type: str = None):
     ]
 
 @app.get("/get-claim-anomalies")
-def get_claim_anomalies(limit: int = 50, hospital_type: str = None, state: str = "All", district: str = "All"):
+def get_claim_anomalies(limit: int = Query(50, ge=0), hospital_type: str = None, state: str = "All", district: str = "All"):
+    if PIPELINE_MODE == "out_of_core":
+        from fraud_detection_agent.scoring.out_of_core import query_claim_results
+        return _results_query(
+            query_claim_results, hospital_type=hospital_type, state=state, district=district,
+            suspicious_only=True, limit=limit,
+        ).to_dict(orient="records")
     pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
-    claims_df = pipeline_output["claims"]
-    if state != "All":
-        claims_df = claims_df[claims_df["state"] == state]
-    if district != "All":
-        claims_df = claims_df[claims_df["district"] == district]
-    suspicious = claims_df[
-        (claims_df["anomaly_label"] == 1) | (claims_df["any_rule_flag"])
-    ].copy()
-    suspicious = suspicious.sort_values(by="risk_score", ascending=False).head(limit)
-    return suspicious.to_dict(orient="records")
+    rows = pipeline_output["claims_index"].top_suspicious(
+        limit, hospital_type=hospital_type, state=state, district=district
+    )
+    return pipeline_output["claims_all"].take(rows).to_dict(orient="records")
 
 @app.get("/generate-report")
 def generate_report(hospital_type: str = None, state: str = "All", district: str = "All"):
     print(f"--- GENERATE REPORT CALLED ({state}, {district}) ---")
-    pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
-    claims_df = pipeline_output["claims"]
-    hospitals_df = pipeline_output["hospital_risk"]
-    
-    if state != "All":
-        claims_df = claims_df[claims_df["state"] == state]
-        hospitals_df = hospitals_df[hospitals_df["state"] == state]
-    if district != "All":
-        claims_df = claims_df[claims_df["district"] == district]
-        hospitals_df = hospitals_df[hospitals_df["district"] == district]
-
-    report_text, report_path = generate_fraud_report(hospitals_df, claims_df)
+    if PIPELINE_MODE == "out_of_core":
+        from fraud_detection_agent.scoring.out_of_core import query_hospital_results, summarize_claim_results
+        hospitals_df = _results_query(query_hospital_results, hospital_type=hospital_type, state=state, district=district)
+        claim_stats = _results_query(summarize_claim_results, hospital_type=hospital_type, state=state, district=district)
+        # The report text lists ML anomalies and rule flags separately
+        report_text, report_path = generate_fraud_report(
+            hospitals_df,
+            None,
+            claim_counts={
+                "total_claims": claim_stats["total_claims"],
+                "suspicious_claims": claim_stats["rule_counts"]["ML Anomalies"],
+                "rule_flagged_claims": claim_stats["rule_flagged_claims"],
+            },
+        )
+        # On-chain, suspicious means anomaly or rule flag, as in memory
+        claim_counts = {
+            "total_claims": claim_stats["total_claims"],
+            "suspicious_claims": claim_stats["suspicious_claims"],
+        }
+    else:
+        pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
+        claims_index = pipeline_output["claims_index"]
+        rows = claims_index.positions(hospital_type=hospital_type, state=state, district=district)
+        claims_df = claims_index.select(
+            pipeline_output["claims_all"], hospital_type=hospital_type, state=state, district=district
+        )
+        hospitals_df = pipeline_output["hospital_index"].select(
+            pipeline_output["hospital_risk_all"], hospital_type=hospital_type, state=state, district=district
+        )
+
+        report_text, report_path = generate_fraud_report(hospitals_df, claims_df)
+        claim_counts = {
+            "total_claims": len(rows),
+            "suspicious_claims": int(claims_index.suspicious[rows].sum()),
+        }
     
     print("ACTION: Generating Quantum Seal...")
     try:
@@ -186,8 +645,8 @@ def generate_report(hospital_type: str = None, state: str = "All", district: str
     
     metadata = {
         "timestamp": datetime.now().isoformat(),
-        "total_claims": len(claims_df),
-        "suspicious_count": int(((claims_df["anomaly_label"] == 1) | (claims_df["any_rule_flag"])).sum()),
+        "total_claims": claim_counts["total_claims"],
+        "suspicious_count": claim_counts["suspicious_claims"],
     }
     if quantum_seal:
         metadata["quantum_seal_token"] = quantum_seal.get("quantum_entropy_token", "")
@@ -208,35 +667,27 @@ def generate_report(hospital_type: str = None, state: str = "All", district: str
 
 @app.get("/get-summary")
 def get_summary(hospital_type: str = None, state: str = "All", district: str = "All"):
-    pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
-    claims_df = pipeline_output["claims"]
-    hosp_df = pipeline_output["hospital_risk"]
-    if state != "All":
-        claims_df = claims_df[claims_df["state"] == state]
-        hosp_df = hosp_df[hosp_df["state"] == state]
-    if district != "All":
-        claims_df = claims_df[claims_df["district"] == district]
-        hosp_df = hosp_df[hosp_df["district"] == district]
-    total_claims = len(claims_df)
+    if PIPELINE_MODE != "out_of_core":
+        # Summed from the per-build aggregate cube, not the claims
+        pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
+        return pipeline_output["summary_cube"].summary(hospital_type=hospital_type, state=state, district=district)
+
+    from fraud_detection_agent.scoring.out_of_core import query_hospital_results, summarize_claim_results
+    hosp_df = _results_query(query_hospital_results, hospital_type=hospital_type, state=state, district=district)
+    claim_stats = _results_query(summarize_claim_results, hospital_type=hospital_type, state=state, district=district)
+    total_claims = claim_stats["total_claims"]
+    suspicious_claims = claim_stats["suspicious_claims"]
+    total_fraud_amount = claim_stats["total_fraud_amount"]
+    monthly = claim_stats["monthly"]
+    anomaly_types = claim_stats["rule_counts"]
+
     low = int((hosp_df["risk_category_overall"] == "Low").sum())
     med = int((hosp_df["risk_category_overall"] == "Medium").sum())
     high = int((hosp_df["risk_category_overall"] == "High").sum())
-    
-    suspicious_claims_mask = (claims_df["anomaly_label"] == 1) | (claims_df["any_rule_flag"])
-    suspicious_claims = int(suspicious_claims_mask.sum())
-    total_fraud_amount = float(claims_df[suspicious_claims_mask]["claim_amount"].sum())
     total_hospitals = len(hosp_df)
-    monthly = (claims_df.assign(is_suspicious=(claims_df["anomaly_label"] == 1) | (claims_df["any_rule_flag"])).groupby("month")["is_suspicious"].sum().reset_index().to_dict(orient="records"))
     
     # Advanced stats for more charts
-    hosp_type_risk = (hosp_df.groupby("hospital_type")["avg_risk_score"].mean().reset_index().to_dict(orient="records"))
-    
-    anomaly_types = {
-        "Up-coding": int(claims_df["rule_upcoding"].sum()),
-        "Ghost Billing": int(claims_df["rule_ghost_billing"].sum()),
-        "Claim Surge": int(claims_df["rule_claim_surge"].sum()),
-        "ML Anomalies": int(claims_df["anomaly_label"].sum())
-    }
+    hosp_type_risk = (hosp_df.groupby("hospital_type", observed=True)["avg_risk_score"].mean().reset_index().to_dict(orient="records"))
     
     return {
         "stats": {
@@ -253,14 +704,78 @@ def get_summary(hospital_type: str = None, state: str = "All", district: str = "
 
 @app.get("/get-all-hospitals")
 def get_all_hospitals(hospital_type: str = None, state: str = "All", district: str = "All"):
+    if PIPELINE_MODE == "out_of_core":
+        from fraud_detection_agent.scoring.out_of_core import query_hospital_results
+        return _results_query(
+            query_hospital_results, hospital_type=hospital_type, state=state, district=district
+        ).to_dict(orient="records")
     pipeline_output = run_full_pipeline(focus_hospital_type=hospital_type)
-    hosp_df = pipeline_output["hospital_risk"]
-    if state != "All":
-        hosp_df = hosp_df[hosp_df["state"] == state]
-    if district != "All":
-        hosp_df = hosp_df[hosp_df["district"] == district]
+    hosp_df = pipeline_output["hospital_index"].select(
+        pipeline_output["hospital_risk_all"], hospital_type=hospital_type, state=state, district=district
+    )
     return hosp_df.to_dict(orient="records")
 
+@app.get("/get-db-metrics")
+def get_db_metrics():
+    from fraud_detection_agent.database.pool import get_pool_metrics
+    return get_pool_metrics()
+
+@app.get("/get-pipeline-status")
+def get_pipeline_status():
+    """
+    Version, build time and build duration of the pipeline being served.
+    """
+    caches = {"result_cache": _view_cache.stats(), "what_if_cache": _what_if_cache.stats()}
+    if _retrainer is None:
+        return {"mode": PIPELINE_MODE, "background_retrain": False, "running": False, **caches}
+    return {"mode": PIPELINE_MODE, "background_retrain": True, **_retrainer.status(), **caches}
+
+@app.post("/invalidate-pipeline-cache")
+def invalidate_pipeline_cache_endpoint():
+    """
+    Drop every cached build, view and what-if table (see ``invalidate_pipeline_cache``).
+    """
+    invalidate_pipeline_cache()
+    return {"status": "invalidated", "result_cache": _view_cache.stats()}
+
+@app.post("/rebuild-pipeline")
+def rebuild_pipeline():
+    """
+    Schedule a background rebuild; returns immediately.
+    """
+    if _retrainer is None or not _retrainer.is_running:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=409, detail="Background retraining is not running")
+    _retrainer.request_rebuild()
+    return {"status": "scheduled", "serving_version": _retrainer.status()["version"]}
+
+@app.get("/get-rule-stats")
+def get_rule_stats():
+    """
+    Configured fraud rules and the per-rule / per-operand timings of their
+    evaluation in the served build. Scoring batches does not change them.
+    The out-of-core pipeline evaluates its rules in SQL, so it has no timings.
+    """
+    from dataclasses import asdict
+    from fraud_detection_agent.scoring.rules import get_rule_engine
+    engine = get_rule_engine()
+    report = None if PIPELINE_MODE == "out_of_core" else _current_build()[1]["rule_report"]
+    return {
+        "rules": [
+            {
+                "name": rule.name,
+                "description": rule.description,
+                "value": rule.value.label,
+                "op": rule.op,
+                "threshold": rule.threshold,
+                "baseline": rule.baseline.label if rule.baseline else None,
+                "factor": rule.factor,
+            }
+            for rule in engine.rules
+        ],
+        "last_evaluation": asdict(report) if report is not None else None,
+    }
+
 @app.get("/get-monitoring-trends")
 def get_monitoring_trends(hospital_type: str = None):
     from fraud_detection_agent.agent.monitor import load_snapshots
@@ -272,25 +787,28 @@ def get_monitoring_trends(hospital_type: str = None):
     return trend.to_dict(orient="records")
 
 @app.get("/get-claims-search")
-def get_claims_search(query: str = "", limit: int = 100, state: str = "All", district: str = "All"):
+def get_claims_search(query: str = "", limit: int = Query(100, ge=0), state: str = "All", district: str = "All"):
+    if PIPELINE_MODE == "out_of_core":
+        from fraud_detection_agent.scoring.out_of_core import query_claim_results
+        return _results_query(
+            query_claim_results, state=state, district=district, search=query, limit=limit
+        ).to_dict(orient="records")
     pipeline_output = run_full_pipeline()
-    claims_df = pipeline_output["claims_all"]
-    
-    if state != "All":
-        claims_df = claims_df[claims_df["state"] == state]
-    if district != "All":
-        claims_df = claims_df[claims_df["district"] == district]
-        
+    claims_all = pipeline_output["claims_all"]
+    claims_index = pipeline_output["claims_index"]
+    rows = claims_index.positions(state=state, district=district)
+
     if query:
         query = query.lower()
         # Search in claim_id or patient_id
-        claims_df = claims_df[
-            claims_df["claim_id"].str.lower().str.contains(query, na=False) | 
+        claims_df = claims_all.take(rows)
+        matches = (
+            claims_df["claim_id"].str.lower().str.contains(query, na=False) |
             claims_df["patient_id"].str.lower().str.contains(query, na=False)
-        ]
-        
-    result = claims_df.sort_values(by="risk_score", ascending=False).head(limit)
-    return result.to_dict(orient="records")
+        )
+        rows = rows[matches.to_numpy(dtype=bool)]
+
+    return claims_all.take(claims_index.top(limit, rows)).to_dict(orient="records")
 
 if __name__ == "__main__":
     import uvicorn
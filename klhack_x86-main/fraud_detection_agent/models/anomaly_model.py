@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 
 import numpy as np
@@ -8,6 +9,18 @@ from sklearn.ensemble import IsolationForest
 from sklearn.neighbors import LocalOutlierFactor
 from sklearn.preprocessing import MinMaxScaler
 
+from fraud_detection_agent.models.approx_lof import SubsampledLOF
+
+
+# LOF reference sample size; 0 (default) runs exact LOF over all rows. Set
+# e.g. LOF_MAX_SAMPLES=20000 for large claim volumes (see approx_lof.py).
+LOF_MAX_SAMPLES = int(os.getenv("LOF_MAX_SAMPLES", "0"))
+LOF_N_ESTIMATORS = int(os.getenv("LOF_N_ESTIMATORS", "1"))
+
+# "ensemble" (default) is IsolationForest + LOF; "fast" is HistogramDetector
+DETECTOR_MODES = ("ensemble", "fast")
+DETECTOR_MODE = os.getenv("DETECTOR_MODE", "ensemble")
+
 
 @dataclass
 class AnomalyResults:
@@ -21,12 +34,25 @@ class AnomalyResults:
 class AnomalyDetector:
     """
     Wrapper around Isolation Forest and Local Outlier Factor for unsupervised anomaly detection.
+
+    LOF runs in novelty mode, so after ``fit`` (or ``fit_predict``) new
+    batches can be scored with ``score`` against the training data, using the
+    score scaling frozen at fit time.
+
+    With ``lof_max_samples`` set, LOF is computed against reference samples of
+    that size (``SubsampledLOF``, averaged over ``lof_n_estimators``) instead
+    of exact kNN over every row. ``lof_n_jobs`` controls LOF's parallelism
+    separately from the forest's ``n_jobs``.
     """
 
     def __init__(
         self,
         contamination: float = 0.1,
         random_state: int | None = 42,
+        lof_max_samples: int | None = LOF_MAX_SAMPLES or None,
+        lof_n_estimators: int = LOF_N_ESTIMATORS,
+        lof_n_jobs: int | None = -1,
+        n_jobs: int | None = -1,
     ) -> None:
         self.contamination = contamination
         self.random_state = random_state
@@ -34,48 +60,200 @@ class AnomalyDetector:
             n_estimators=200,
             contamination=contamination,
             random_state=random_state,
-            n_jobs=-1,
+            n_jobs=n_jobs,
         )
-        self.lof = LocalOutlierFactor(
-            n_neighbors=20,
-            contamination=contamination,
-            novelty=False,
-            n_jobs=-1,
-        )
-        self.scaler_scores = MinMaxScaler()
+        self.lof: LocalOutlierFactor | SubsampledLOF
+        if lof_max_samples:
+            self.lof = SubsampledLOF(
+                n_neighbors=20,
+                contamination=contamination,
+                max_samples=lof_max_samples,
+                n_estimators=lof_n_estimators,
+                n_jobs=lof_n_jobs,
+                random_state=random_state,
+            )
+        else:
+            # novelty=True computes the same training-set outlier factors as
+            # novelty=False and additionally allows scoring unseen claims.
+            self.lof = LocalOutlierFactor(
+                n_neighbors=20,
+                contamination=contamination,
+                novelty=True,
+                n_jobs=lof_n_jobs,
+            )
+        # Fitted on the training scores and then frozen; clip keeps scores of
+        # unseen claims beyond the training range inside [0, 1].
+        self.scaler_scores = MinMaxScaler(clip=True)
+        self.is_fitted = False
 
-    def fit_predict(self, X: pd.DataFrame) -> AnomalyResults:
+    def fit(self, X: pd.DataFrame | np.ndarray) -> AnomalyResults:
         """
-        Fit both models and produce anomaly scores and labels.
-
-        Returns higher scores for more anomalous points (0-1 scaled).
+        Fit both models and freeze the score scaling. Returns the training-set
+        results (identical to ``fit_predict``).
         """
-        X_np = X.to_numpy(dtype=float)
+        X_np = np.asarray(X, dtype=float)
 
         # Isolation Forest: decision_function gives higher values for normal points.
         self.iforest.fit(X_np)
-        if_scores_raw = -self.iforest.decision_function(X_np)  # invert so higher = more anomalous
-        if_labels = (self.iforest.predict(X_np) == -1).astype(int)
+        if_decision = self.iforest.decision_function(X_np)
+        if_scores_raw = -if_decision  # invert so higher = more anomalous
+        if_labels = (if_decision < 0).astype(int)  # predict() == -1, without a second pass
 
         # Local Outlier Factor: negative_outlier_factor_, more negative = more anomalous.
-        lof_labels = self.lof.fit_predict(X_np)
+        self.lof.fit(X_np)
         lof_scores_raw = -self.lof.negative_outlier_factor_
-        lof_labels_bin = (lof_labels == -1).astype(int)
-
-        # Scale each score type to [0, 1]
-        stacked = np.vstack([if_scores_raw, lof_scores_raw]).T
-        stacked_scaled = self.scaler_scores.fit_transform(stacked)
-        if_scores_scaled = stacked_scaled[:, 0]
-        lof_scores_scaled = stacked_scaled[:, 1]
-
-        # Combined score as simple average
-        combined_score = (if_scores_scaled + lof_scores_scaled) / 2.0
-
-        return AnomalyResults(
-            scores_iforest=if_scores_scaled,
-            labels_iforest=if_labels,
-            scores_lof=lof_scores_scaled,
-            labels_lof=lof_labels_bin,
-            combined_score=combined_score,
-        )
+        lof_labels_bin = (self.lof.negative_outlier_factor_ < self.lof.offset_).astype(int)
+
+        self.scaler_scores.fit(np.vstack([if_scores_raw, lof_scores_raw]).T)
+        self.is_fitted = True
+        return self._combine(if_scores_raw, if_labels, lof_scores_raw, lof_labels_bin)
+
+    def fit_predict(self, X: pd.DataFrame) -> AnomalyResults:
+        """
+        Fit both models and produce anomaly scores and labels.
+
+        Returns higher scores for more anomalous points (0-1 scaled).
+        """
+        return self.fit(X)
+
+    def score(self, X: pd.DataFrame | np.ndarray) -> AnomalyResults:
+        """
+        Score unseen claims with the fitted models and frozen scaling; cost
+        grows with the batch size only.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("AnomalyDetector must be fitted before score()")
+        X_np = np.asarray(X, dtype=float)
+        if_decision = self.iforest.decision_function(X_np)
+        if_scores_raw = -if_decision
+        if_labels = (if_decision < 0).astype(int)
+        lof_scores = self.lof.score_samples(X_np)
+        lof_scores_raw = -lof_scores
+        lof_labels_bin = (lof_scores < self.lof.offset_).astype(int)  # predict() == -1
+        return self._combine(if_scores_raw, if_labels, lof_scores_raw, lof_labels_bin)
+
+    def _combine(
+        self,
+        if_scores_raw: np.ndarray,
+        if_labels: np.ndarray,
+        lof_scores_raw: np.ndarray,
+        lof_labels_bin: np.ndarray,
+    ) -> AnomalyResults:
+        return _combine_scaled(self.scaler_scores, if_scores_raw, if_labels, lof_scores_raw, lof_labels_bin)
+
+
+def _combine_scaled(
+    scaler: MinMaxScaler,
+    first_raw: np.ndarray,
+    first_labels: np.ndarray,
+    second_raw: np.ndarray,
+    second_labels: np.ndarray,
+) -> AnomalyResults:
+    # Scale each score type to [0, 1]
+    stacked = np.vstack([first_raw, second_raw]).T
+    stacked_scaled = scaler.transform(stacked)
+    first_scaled = stacked_scaled[:, 0]
+    second_scaled = stacked_scaled[:, 1]
+
+    # Combined score as simple average
+    combined_score = (first_scaled + second_scaled) / 2.0
+
+    return AnomalyResults(
+        scores_iforest=first_scaled,
+        labels_iforest=first_labels,
+        scores_lof=second_scaled,
+        labels_lof=second_labels,
+        combined_score=combined_score,
+    )
+
+
+class HistogramDetector:
+    """
+    Fast O(n) alternative to AnomalyDetector: a histogram-based outlier score
+    (HBOS) averaged with a robust z-score, both vectorized in NumPy.
+
+    HBOS sums, over features, the negative log of the (max-normalized)
+    density of the equal-width bin a claim falls in; the robust z-score is
+    the mean over features of ``|x - median| / (1.4826 * MAD)``. Results
+    keep the ``AnomalyResults`` shape: the HBOS component is reported in the
+    ``*_iforest`` fields and the z-score component in the ``*_lof`` fields.
+    Labels flag the ``contamination`` share of training rows with the highest
+    score of each component; score scaling is frozen at fit time as in
+    AnomalyDetector, so ``score`` works on unseen claims.
+    """
+
+    def __init__(self, contamination: float = 0.1, n_bins: int = 20) -> None:
+        self.contamination = contamination
+        self.n_bins = n_bins
+        self.scaler_scores = MinMaxScaler(clip=True)
+        self.is_fitted = False
+
+    def fit(self, X: pd.DataFrame | np.ndarray) -> AnomalyResults:
+        X_np = np.asarray(X, dtype=float)
+        n_rows, n_features = X_np.shape
+
+        self.low_ = X_np.min(axis=0)
+        high = X_np.max(axis=0)
+        self.width_ = np.where(high > self.low_, (high - self.low_) / self.n_bins, 1.0)
+        bins = self._bin_index(X_np)
+        counts = np.bincount(bins.ravel(), minlength=n_features * self.n_bins).reshape(n_features, self.n_bins)
+        # Empty bins (and values outside the training range) count as half a claim
+        density = np.maximum(counts, 0.5) / counts.max(axis=1, keepdims=True)
+        self.log_density_ = np.log(density).ravel()
+        self.outside_log_density_ = np.log(0.5 / counts.max(axis=1))
+
+        self.median_ = np.median(X_np, axis=0)
+        mad = 1.4826 * np.median(np.abs(X_np - self.median_), axis=0)
+        std = X_np.std(axis=0)
+        self.spread_ = np.where(mad > 0, mad, np.where(std > 0, std, 1.0))
+
+        hbos_raw, z_raw = self._raw_scores(X_np, bins)
+        quantile = 1.0 - self.contamination
+        self.thresholds_ = (float(np.quantile(hbos_raw, quantile)), float(np.quantile(z_raw, quantile)))
+        self.scaler_scores.fit(np.vstack([hbos_raw, z_raw]).T)
+        self.is_fitted = True
+        return self._results(hbos_raw, z_raw)
+
+    def fit_predict(self, X: pd.DataFrame | np.ndarray) -> AnomalyResults:
+        return self.fit(X)
+
+    def score(self, X: pd.DataFrame | np.ndarray) -> AnomalyResults:
+        if not self.is_fitted:
+            raise RuntimeError("HistogramDetector must be fitted before score()")
+        X_np = np.asarray(X, dtype=float)
+        return self._results(*self._raw_scores(X_np, self._bin_index(X_np)))
+
+    def _bin_index(self, X_np: np.ndarray) -> np.ndarray:
+        """
+        Flat index into the (feature, bin) table for every value.
+        """
+        bins = np.floor((X_np - self.low_) / self.width_)
+        bins = np.clip(np.nan_to_num(bins), 0, self.n_bins - 1).astype(np.int64)
+        return bins + np.arange(X_np.shape[1]) * self.n_bins
+
+    def _raw_scores(self, X_np: np.ndarray, bins: np.ndarray) -> tuple:
+        log_density = self.log_density_[bins]
+        outside = (X_np < self.low_) | (X_np > self.low_ + self.width_ * self.n_bins)
+        log_density = np.where(outside, self.outside_log_density_, log_density)
+        hbos_raw = -log_density.sum(axis=1)
+        z_raw = (np.abs(X_np - self.median_) / self.spread_).mean(axis=1)
+        return hbos_raw, z_raw
+
+    def _results(self, hbos_raw: np.ndarray, z_raw: np.ndarray) -> AnomalyResults:
+        hbos_labels = (hbos_raw > self.thresholds_[0]).astype(int)
+        z_labels = (z_raw > self.thresholds_[1]).astype(int)
+        return _combine_scaled(self.scaler_scores, hbos_raw, hbos_labels, z_raw, z_labels)
+
+
+def make_detector(mode: str | None = None) -> AnomalyDetector | HistogramDetector:
+    """
+    Detector for a pipeline run: ``mode`` is one of ``DETECTOR_MODES``
+    (default ``DETECTOR_MODE``).
+    """
+    mode = mode or DETECTOR_MODE
+    if mode == "fast":
+        return HistogramDetector()
+    if mode == "ensemble":
+        return AnomalyDetector()
+    raise ValueError(f"Unknown detector mode {mode!r}; expected one of {DETECTOR_MODES}")
 
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+from sklearn.neighbors import LocalOutlierFactor
+
+
+class SubsampledLOF:
+    """
+    Local Outlier Factor computed against fixed reference samples instead of
+    the full feature matrix.
+
+    Each of ``n_estimators`` LOF models is fitted (novelty mode, tree index)
+    on ``max_samples`` rows drawn without replacement; every claim is scored
+    by querying its ``n_neighbors`` nearest reference rows, and the scores of
+    the ensemble are averaged. Fitting costs O(max_samples log max_samples)
+    per model and scoring O(n log max_samples), instead of exact LOF's all-pairs
+    kNN over n rows. With ``max_samples >= n`` this is exact LOF.
+
+    Exposes the subset of the ``LocalOutlierFactor`` API AnomalyDetector
+    uses: ``fit``, ``score_samples``, ``predict``, ``negative_outlier_factor_``
+    and ``offset_``.
+    """
+
+    novelty = True
+
+    def __init__(
+        self,
+        n_neighbors: int = 20,
+        contamination: float = 0.1,
+        max_samples: int = 20_000,
+        n_estimators: int = 1,
+        algorithm: str = "kd_tree",
+        leaf_size: int = 40,
+        n_jobs: int | None = None,
+        random_state: int | None = None,
+    ) -> None:
+        self.n_neighbors = n_neighbors
+        self.contamination = contamination
+        self.max_samples = max_samples
+        self.n_estimators = n_estimators
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.estimators_: List[LocalOutlierFactor] = []
+
+    def _new_estimator(self, n_rows: int) -> LocalOutlierFactor:
+        return LocalOutlierFactor(
+            n_neighbors=min(self.n_neighbors, n_rows - 1),
+            contamination=self.contamination,
+            novelty=True,
+            algorithm=self.algorithm,
+            leaf_size=self.leaf_size,
+            n_jobs=self.n_jobs,
+        )
+
+    def fit(self, X: np.ndarray) -> "SubsampledLOF":
+        X = np.asarray(X, dtype=float)
+        n = len(X)
+        rng = np.random.default_rng(self.random_state)
+        if n <= self.max_samples:
+            subsets = [np.arange(n)]
+        else:
+            subsets = [
+                np.sort(rng.choice(n, self.max_samples, replace=False)) for _ in range(self.n_estimators)
+            ]
+
+        self.estimators_ = []
+        total = np.zeros(n)
+        for subset in subsets:
+            lof = self._new_estimator(len(subset)).fit(X[subset])
+            # Reference rows keep their training factor (which excludes the
+            # row itself); only the remaining rows are queried.
+            scores = np.empty(n)
+            scores[subset] = lof.negative_outlier_factor_
+            rest = np.ones(n, dtype=bool)
+            rest[subset] = False
+            if rest.any():
+                scores[rest] = lof.score_samples(X[rest])
+            total += scores
+            self.estimators_.append(lof)
+
+        self.negative_outlier_factor_ = total / len(subsets)
+        # Same threshold LocalOutlierFactor derives from ``contamination``
+        self.offset_ = float(np.percentile(self.negative_outlier_factor_, 100.0 * self.contamination))
+        return self
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        return np.mean([lof.score_samples(X) for lof in self.estimators_], axis=0)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return np.where(self.score_samples(X) < self.offset_, -1, 1)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector, AnomalyResults, HistogramDetector
+from fraud_detection_agent.models.approx_lof import SubsampledLOF
+from fraud_detection_agent.models.segmented import SegmentedDetector
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", BASE_DIR / "models" / "registry"))
+
+# Keep this many most recent fitted models; older versions are pruned on save.
+DEFAULT_MAX_VERSIONS = 5
+
+META_NAME = "meta.json"
+MODEL_NAME = "model.joblib"
+
+_HASH_BLOCK_ROWS = 1_000_000
+
+
+@dataclass
+class RegistryEntry:
+    detector: AnomalyDetector | HistogramDetector | SegmentedDetector
+    results: AnomalyResults
+    feature_scaler: Optional[MinMaxScaler]
+    meta: Dict[str, Any]
+
+
+def _detector_params(detector: AnomalyDetector | HistogramDetector | SegmentedDetector) -> Dict[str, Any]:
+    if isinstance(detector, SegmentedDetector):
+        return {
+            "segment_key": detector.segment_key,
+            "min_segment_rows": detector.min_segment_rows,
+            "contamination": detector.contamination,
+            "random_state": detector.random_state,
+            "lof_max_samples": detector.lof_max_samples,
+        }
+    if isinstance(detector, HistogramDetector):
+        return {"detector": "histogram", "contamination": detector.contamination, "n_bins": detector.n_bins}
+    params = {
+        "contamination": detector.contamination,
+        "random_state": detector.random_state,
+        "n_estimators": detector.iforest.n_estimators,
+        "n_neighbors": detector.lof.n_neighbors,
+        "lof_novelty": detector.lof.novelty,
+    }
+    if isinstance(detector.lof, SubsampledLOF):
+        # Only for the approximate LOF, so exact-LOF fingerprints are unchanged
+        params["lof_max_samples"] = detector.lof.max_samples
+        params["lof_n_estimators"] = detector.lof.n_estimators
+    return params
+
+
+def dataset_fingerprint(
+    X: pd.DataFrame,
+    detector: AnomalyDetector | HistogramDetector | SegmentedDetector,
+    segments: Optional[pd.Series] = None,
+) -> str:
+    """
+    SHA-256 of the feature matrix (column names, dtypes, values in row order),
+    the segment labels if any and the detector parameters; equal fingerprints
+    give identical fits.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(_detector_params(detector), sort_keys=True).encode())
+    digest.update(json.dumps([[str(c), str(X[c].dtype)] for c in X.columns]).encode())
+    digest.update(str(len(X)).encode())
+    values = np.ascontiguousarray(X.to_numpy(dtype=float))
+    for start in range(0, len(values), _HASH_BLOCK_ROWS):
+        digest.update(memoryview(values[start : start + _HASH_BLOCK_ROWS]).cast("B"))
+    if segments is not None:
+        labels, uniques = pd.factorize(pd.Series(segments).astype(str))
+        digest.update(json.dumps(list(uniques)).encode())
+        digest.update(memoryview(np.ascontiguousarray(labels, dtype=np.int64)).cast("B"))
+    return digest.hexdigest()
+
+
+def _results_metrics(results: AnomalyResults) -> Dict[str, float]:
+    return {
+        "iforest_outlier_rate": float(results.labels_iforest.mean()),
+        "lof_outlier_rate": float(results.labels_lof.mean()),
+        "combined_score_mean": float(results.combined_score.mean()),
+        "combined_score_p99": float(np.quantile(results.combined_score, 0.99)),
+    }
+
+
+class ModelRegistry:
+    """
+    On-disk store of fitted AnomalyDetectors keyed by dataset fingerprint.
+
+    Each version lives in its own directory (``model.joblib`` + ``meta.json``)
+    written under a temporary name and renamed into place, so readers never
+    see a partial entry. The joblib payload is a pickle; only load registries
+    this service wrote itself.
+    """
+
+    def __init__(self, root: Path | str = REGISTRY_DIR, max_versions: int = DEFAULT_MAX_VERSIONS) -> None:
+        self.root = Path(root)
+        self.max_versions = max_versions
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """
+        Metadata of stored versions, newest first.
+        """
+        if not self.root.exists():
+            return []
+        metas = []
+        for entry in self.root.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            try:
+                meta = json.loads((entry / META_NAME).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            meta["path"] = str(entry)
+            metas.append(meta)
+        return sorted(metas, key=lambda m: m["created_at"], reverse=True)
+
+    def load(self, fingerprint: str) -> Optional[RegistryEntry]:
+        """
+        The newest usable version for ``fingerprint``, or None. Versions
+        pickled under another scikit-learn, and artifacts that fail to
+        unpickle for any reason, are skipped so the caller refits.
+        """
+        for meta in self.list_versions():
+            if meta["fingerprint"] != fingerprint or meta.get("sklearn_version") != sklearn.__version__:
+                continue
+            try:
+                payload = joblib.load(Path(meta["path"]) / MODEL_NAME)
+                return RegistryEntry(
+                    detector=payload["detector"],
+                    results=payload["results"],
+                    feature_scaler=payload.get("feature_scaler"),
+                    meta=meta,
+                )
+            except Exception:
+                continue
+        return None
+
+    def save(
+        self,
+        fingerprint: str,
+        detector: AnomalyDetector | HistogramDetector | SegmentedDetector,
+        results: AnomalyResults,
+        feature_scaler: Optional[MinMaxScaler] = None,
+        fit_seconds: float = 0.0,
+        n_rows: int = 0,
+        feature_columns: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        created_at = datetime.now().isoformat(timespec="microseconds")
+        name = f"{created_at.replace(':', '').replace('.', '_')}_{fingerprint[:16]}"
+        meta = {
+            "fingerprint": fingerprint,
+            "created_at": created_at,
+            "fit_seconds": fit_seconds,
+            "n_rows": n_rows,
+            "feature_columns": feature_columns or [],
+            "params": _detector_params(detector),
+            "metrics": _results_metrics(results),
+            "sklearn_version": sklearn.__version__,
+        }
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / f".{name}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        joblib.dump(
+            {"detector": detector, "results": results, "feature_scaler": feature_scaler},
+            tmp_dir / MODEL_NAME,
+        )
+        (tmp_dir / META_NAME).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(tmp_dir, self.root / name)
+        self.prune()
+        meta["path"] = str(self.root / name)
+        return meta
+
+    def prune(self) -> List[str]:
+        """
+        Delete all but the ``max_versions`` newest versions. Returns removed paths.
+        """
+        removed = []
+        for meta in self.list_versions()[self.max_versions :]:
+            shutil.rmtree(meta["path"], ignore_errors=True)
+            removed.append(meta["path"])
+        return removed
+
+
+def fit_or_load(
+    X: pd.DataFrame,
+    feature_scaler: Optional[MinMaxScaler] = None,
+    registry: Optional[ModelRegistry] = None,
+    detector: Optional[AnomalyDetector | HistogramDetector | SegmentedDetector] = None,
+    segments: Optional[pd.Series] = None,
+) -> Tuple[AnomalyDetector | HistogramDetector | SegmentedDetector, AnomalyResults, Dict[str, Any]]:
+    """
+    Return a fitted detector and its results for ``X``, loading them from the
+    registry when a model was already fitted on identical data with the same
+    parameters, otherwise fitting and saving a new version.
+
+    A ``SegmentedDetector`` is fitted with the per-row ``segments`` labels.
+    The returned metadata has ``"source"`` set to ``"registry"`` or ``"fit"``.
+    """
+    registry = registry or ModelRegistry()
+    detector = detector or AnomalyDetector()
+    if isinstance(detector, SegmentedDetector) and segments is None:
+        raise ValueError("SegmentedDetector needs per-row segment labels")
+    fingerprint = dataset_fingerprint(X, detector, segments if isinstance(detector, SegmentedDetector) else None)
+
+    entry = registry.load(fingerprint)
+    if entry is not None:
+        return entry.detector, entry.results, {**entry.meta, "source": "registry"}
+
+    start = time.perf_counter()
+    if isinstance(detector, SegmentedDetector):
+        results = detector.fit_predict(X, segments)
+    else:
+        results = detector.fit_predict(X)
+    fit_seconds = time.perf_counter() - start
+    try:
+        meta = registry.save(
+            fingerprint,
+            detector,
+            results,
+            feature_scaler=feature_scaler,
+            fit_seconds=fit_seconds,
+            n_rows=len(X),
+            feature_columns=[str(c) for c in X.columns],
+        )
+    except OSError:
+        # A read-only or full disk must not break scoring
+        meta = {"fingerprint": fingerprint, "fit_seconds": fit_seconds}
+    return detector, results, {**meta, "source": "fit"}
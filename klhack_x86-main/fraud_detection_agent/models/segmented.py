@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector, AnomalyResults
+
+
+# Column the training rows are partitioned by ("hospital_type", "state", ...);
+# empty (default) fits one global model.
+SEGMENT_KEY = os.getenv("SEGMENT_KEY", "")
+
+# Segments smaller than this are pooled into one shared "other" model
+DEFAULT_MIN_SEGMENT_ROWS = 1_000
+OTHER_SEGMENT = "__other__"
+_MIN_POOLED_ROWS = 20  # LOF's n_neighbors
+
+
+def _fit_segment(
+    shm_name: str,
+    shape: Tuple[int, int],
+    start: int,
+    stop: int,
+    contamination: float,
+    random_state: Optional[int],
+    lof_max_samples: Optional[int],
+) -> Tuple[AnomalyDetector, AnomalyResults]:
+    """
+    Worker: fit one segment's detector on rows ``start:stop`` of the shared
+    feature matrix. Each worker is single-threaded; parallelism comes from the pool.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Copied out of the shared block: the fitted LOF keeps its training rows
+        X = np.array(np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[start:stop])
+    finally:
+        shm.close()
+    detector = AnomalyDetector(
+        contamination=contamination,
+        random_state=random_state,
+        lof_max_samples=lof_max_samples,
+        n_jobs=1,
+        lof_n_jobs=1,
+    )
+    results = detector.fit(X)
+    return detector, results
+
+
+def _concat_results(parts: List[AnomalyResults], order: np.ndarray) -> AnomalyResults:
+    """
+    Concatenate per-segment results (in segment order) and restore row order.
+    """
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    fields = {}
+    for field in ("scores_iforest", "labels_iforest", "scores_lof", "labels_lof", "combined_score"):
+        values = [getattr(p, field) for p in parts]
+        fields[field] = np.concatenate(values)[inverse] if values else np.empty(0)
+    return AnomalyResults(**fields)
+
+
+class SegmentedDetector:
+    """
+    One IsolationForest + LOF per segment (e.g. hospital type or state).
+
+    Each segment is scored against its own cost baseline rather than the
+    whole population. Segments are fitted in a ``ProcessPoolExecutor``: the
+    feature matrix is sorted by segment once and placed in shared memory, and
+    each worker reads its contiguous block instead of receiving a pickled
+    copy. Each segment's scores are calibrated by its own frozen MinMax
+    scaling (``AnomalyDetector``), so the merged ``combined_score`` is on the
+    usual 0-1 scale per segment.
+    """
+
+    def __init__(
+        self,
+        segment_key: str,
+        contamination: float = 0.1,
+        random_state: int | None = 42,
+        lof_max_samples: int | None = None,
+        min_segment_rows: int = DEFAULT_MIN_SEGMENT_ROWS,
+        n_workers: int | None = None,
+    ) -> None:
+        self.segment_key = segment_key
+        self.contamination = contamination
+        self.random_state = random_state
+        self.lof_max_samples = lof_max_samples
+        self.min_segment_rows = min_segment_rows
+        self.n_workers = n_workers
+        self.detectors: Dict[str, AnomalyDetector] = {}
+        self._largest = OTHER_SEGMENT
+        self.is_fitted = False
+
+    def _assign(self, segments: pd.Series | np.ndarray, sizes: Optional[pd.Series] = None) -> np.ndarray:
+        """
+        Map segment labels to fitted (or, with ``sizes``, to-be-fitted) model names.
+        """
+        labels = pd.Series(np.asarray(segments, dtype=object)).fillna(OTHER_SEGMENT).astype(str)
+        if sizes is not None:
+            known = set(sizes.index[sizes >= self.min_segment_rows])
+        else:
+            known = set(self.detectors)
+        assigned = labels.where(labels.isin(known), OTHER_SEGMENT)
+        if sizes is None and OTHER_SEGMENT not in self.detectors:
+            # No pooled model was needed at fit time; unseen labels use the largest segment
+            assigned = assigned.replace(OTHER_SEGMENT, self._largest)
+        return assigned.to_numpy()
+
+    def fit(self, X: pd.DataFrame | np.ndarray, segments: pd.Series | np.ndarray) -> AnomalyResults:
+        X_np = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+        labels = pd.Series(np.asarray(segments, dtype=object)).fillna(OTHER_SEGMENT).astype(str)
+        assigned = self._assign(labels, sizes=labels.value_counts())
+        # A pooled segment too small for LOF's neighbourhoods joins the largest segment
+        counts = pd.Series(assigned).value_counts()
+        if 0 < counts.get(OTHER_SEGMENT, 0) <= _MIN_POOLED_ROWS and len(counts) > 1:
+            largest = counts.drop(OTHER_SEGMENT).idxmax()
+            assigned = np.where(assigned == OTHER_SEGMENT, largest, assigned)
+
+        order = np.argsort(assigned, kind="stable")
+        names, starts = np.unique(assigned[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+        sorted_X = X_np[order]
+
+        shm = shared_memory.SharedMemory(create=True, size=max(sorted_X.nbytes, 1))
+        try:
+            np.ndarray(sorted_X.shape, dtype=np.float64, buffer=shm.buf)[:] = sorted_X
+            del sorted_X
+            args = [
+                (shm.name, X_np.shape, int(start), int(stop), self.contamination, self.random_state,
+                 self.lof_max_samples)
+                for start, stop in zip(starts, stops)
+            ]
+            # Largest segments first so the pool is not left waiting on one at the end
+            by_size = sorted(range(len(args)), key=lambda i: args[i][3] - args[i][2], reverse=True)
+            with ProcessPoolExecutor(max_workers=self.n_workers or os.cpu_count()) as pool:
+                futures = {i: pool.submit(_fit_segment, *args[i]) for i in by_size}
+                fitted = {i: futures[i].result() for i in range(len(args))}
+        finally:
+            shm.close()
+            shm.unlink()
+
+        self.detectors = {str(names[i]): fitted[i][0] for i in range(len(names))}
+        self._largest = str(names[np.argmax(stops - starts)])
+        self.is_fitted = True
+        return _concat_results([fitted[i][1] for i in range(len(names))], order)
+
+    def fit_predict(self, X: pd.DataFrame | np.ndarray, segments: pd.Series | np.ndarray) -> AnomalyResults:
+        return self.fit(X, segments)
+
+    def score(self, X: pd.DataFrame | np.ndarray, segments: pd.Series | np.ndarray) -> AnomalyResults:
+        """
+        Score rows with their segment's model; labels not seen at fit time go
+        to the pooled model (or the largest segment's).
+        """
+        if not self.is_fitted:
+            raise RuntimeError("SegmentedDetector must be fitted before score()")
+        X_np = np.asarray(X, dtype=np.float64)
+        assigned = self._assign(segments)
+        order = np.argsort(assigned, kind="stable")
+        names, starts = np.unique(assigned[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+        parts = [
+            self.detectors[str(name)].score(X_np[order[start:stop]])
+            for name, start, stop in zip(names, starts, stops)
+        ]
+        return _concat_results(parts, order)
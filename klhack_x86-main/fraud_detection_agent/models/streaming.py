@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+
+
+class HalfSpaceTrees:
+    """
+    Streaming anomaly detector (Tan, Ting & Liu, "Fast Anomaly Detection for
+    Streaming Data", IJCAI 2011).
+
+    ``n_trees`` random complete binary trees of ``depth`` levels split a
+    randomly perturbed work space (inputs are expected in [0, 1]) at half-way
+    points. Each node keeps two mass counters: ``latest`` counts the claims of
+    the current window, ``reference`` the claims of the previous one. A claim
+    is scored from the reference mass of the deepest node on its path whose
+    mass is above ``size_limit`` (mass x 2^depth, summed over trees; lower
+    means more isolated). Every ``window_size`` claims ``latest`` becomes
+    ``reference``. State is fixed-size: memory does not grow with the stream.
+
+    Scores only read ``reference``, which is frozen within a window, so a
+    chunk of claims is scored and counted with array operations and gives
+    the same result as claim-by-claim processing.
+    """
+
+    def __init__(
+        self,
+        n_features: int,
+        n_trees: int = 25,
+        depth: int = 10,
+        window_size: int = 5_000,
+        size_limit: float | None = None,
+        random_state: int | None = 42,
+    ) -> None:
+        rng = np.random.default_rng(random_state)
+        self.n_trees = n_trees
+        self.depth = depth
+        self.window_size = window_size
+        self.size_limit = 0.1 * window_size if size_limit is None else size_limit
+
+        n_internal = 2**depth - 1
+        n_nodes = 2 ** (depth + 1) - 1
+        self.split_dim = rng.integers(0, n_features, size=(n_trees, n_internal))
+        self.split_value = np.empty((n_trees, n_internal))
+        # Work space per tree: s +/- 2 * max(s, 1 - s) around a random s in [0, 1]
+        s = rng.random((n_trees, n_features))
+        half = 2.0 * np.maximum(s, 1.0 - s)
+        low, high = s - half, s + half
+        # Split values follow the recursive halving of each node's range
+        for t in range(n_trees):
+            self._init_splits(t, low[t], high[t])
+        self.reference = np.zeros((n_trees, n_nodes))
+        self.latest = np.zeros((n_trees, n_nodes))
+        self.n_seen = 0
+
+    def _init_splits(self, tree: int, lo: np.ndarray, hi: np.ndarray) -> None:
+        stack = [(0, lo, hi)]
+        n_internal = self.split_value.shape[1]
+        while stack:
+            node, lo, hi = stack.pop()
+            if node >= n_internal:
+                continue
+            q = self.split_dim[tree, node]
+            mid = (lo[q] + hi[q]) / 2.0
+            self.split_value[tree, node] = mid
+            left_hi, right_lo = hi.copy(), lo.copy()
+            left_hi[q], right_lo[q] = mid, mid
+            stack.append((2 * node + 1, lo, left_hi))
+            stack.append((2 * node + 2, right_lo, hi))
+
+    @property
+    def is_warm(self) -> bool:
+        """
+        True once a full window of reference mass exists.
+        """
+        return self.n_seen >= self.window_size
+
+    def _paths(self, X: np.ndarray) -> np.ndarray:
+        """
+        Node index per (tree, claim, level): shape (n_trees, n, depth + 1).
+        """
+        n = len(X)
+        paths = np.zeros((self.n_trees, n, self.depth + 1), dtype=np.int64)
+        trees = np.arange(self.n_trees)[:, None]
+        node = np.zeros((self.n_trees, n), dtype=np.int64)
+        for level in range(self.depth):
+            dim = self.split_dim[trees, node]
+            go_right = X[np.arange(n)[None, :], dim] > self.split_value[trees, node]
+            node = 2 * node + 1 + go_right
+            paths[:, :, level + 1] = node
+        return paths
+
+    def _score_paths(self, paths: np.ndarray) -> np.ndarray:
+        mass = np.take_along_axis(self.reference[:, None, :], paths, axis=2)
+        # Deepest node on the path whose reference mass is still above the limit
+        # (the root always counts)
+        above = mass > self.size_limit
+        above[:, :, 0] = True
+        stop = self.depth - np.argmax(above[:, :, ::-1], axis=2)
+        stop_mass = np.take_along_axis(mass, stop[:, :, None], axis=2)[:, :, 0]
+        return (stop_mass * np.exp2(stop)).sum(axis=0)
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """
+        Raw mass scores (lower = more anomalous) without updating the model.
+        """
+        return self._score_paths(self._paths(np.asarray(X, dtype=float)))
+
+    def score_learn(self, X: np.ndarray) -> np.ndarray:
+        """
+        Score each claim in order, then count it into the current window.
+
+        During the first window there is no reference mass yet; claims are
+        scored against the window's own mass so far, rescaled to a full window.
+        """
+        X = np.asarray(X, dtype=float)
+        scores = np.empty(len(X))
+        trees = np.arange(self.n_trees)[:, None, None]
+        start = 0
+        while start < len(X):
+            # Process up to the next window boundary in one vectorized step
+            room = self.window_size - self.n_seen % self.window_size
+            stop = min(len(X), start + room)
+            paths = self._paths(X[start:stop])
+            if self.is_warm:
+                scores[start:stop] = self._score_paths(paths)
+                np.add.at(self.latest, (trees, paths), 1.0)
+                self.n_seen += stop - start
+            else:
+                np.add.at(self.latest, (trees, paths), 1.0)
+                self.n_seen += stop - start
+                self.reference = self.latest * (self.window_size / self.n_seen)
+                scores[start:stop] = self._score_paths(paths)
+            if self.n_seen % self.window_size == 0:
+                self.reference, self.latest = self.latest, np.zeros_like(self.latest)
+            start = stop
+        return scores
+
+
+class StreamingFeatures:
+    """
+    The model features of ``preprocess._add_derived_features`` computed as of
+    each claim's arrival, from running per-group sums and counts.
+
+    Hospital and district-procedure state grows with the number of those
+    groups only. Hospital-month and patient-month counts are kept for the
+    ``retain_months`` most recent admission months and older months are
+    evicted, so with claims arriving in admission order the state stays
+    bounded however long the stream runs. ``claim_amount_norm`` uses the
+    running min/max.
+    """
+
+    def __init__(self, retain_months: int = 3) -> None:
+        self.retain_months = retain_months
+        self.hospital: Dict[str, list] = defaultdict(lambda: [0.0, 0])
+        self.district_proc: Dict[Tuple[str, str], list] = defaultdict(lambda: [0.0, 0])
+        # month -> hospital -> count, month -> (hospital, patient) -> count
+        self.hospital_month: Dict[str, Dict[str, int]] = {}
+        self.patient_month: Dict[str, Dict[Tuple[str, str], int]] = {}
+        self.amount_min = np.inf
+        self.amount_max = -np.inf
+
+    def _month_state(self, month: str) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+        if month not in self.hospital_month:
+            self.hospital_month[month] = defaultdict(int)
+            self.patient_month[month] = defaultdict(int)
+            for old in sorted(self.hospital_month)[: -self.retain_months]:
+                del self.hospital_month[old], self.patient_month[old]
+        return self.hospital_month.get(month, defaultdict(int)), self.patient_month.get(month, defaultdict(int))
+
+    def n_groups(self) -> int:
+        return (
+            len(self.hospital)
+            + len(self.district_proc)
+            + sum(len(m) for m in self.hospital_month.values())
+            + sum(len(m) for m in self.patient_month.values())
+        )
+
+    def update(self, claims: pd.DataFrame) -> np.ndarray:
+        """
+        Fold ``claims`` (in arrival order) into the running state and return
+        their feature rows in ``TARGET_FEATURE_COLUMNS`` order.
+        """
+        months = pd.to_datetime(claims["admission_date"]).dt.strftime("%Y-%m").to_numpy()
+        out = np.empty((len(claims), len(TARGET_FEATURE_COLUMNS)))
+        columns = zip(
+            claims["hospital_id"].to_numpy(),
+            months,
+            claims["district"].to_numpy(),
+            claims["procedure_code"].to_numpy(),
+            claims["patient_id"].to_numpy(),
+            claims["claim_amount"].to_numpy(dtype=float),
+            claims["length_of_stay"].to_numpy(dtype=float),
+        )
+        current_month, hospital_counts, patient_counts = None, None, None
+        for i, (hospital_id, month, district, procedure, patient, amount, los) in enumerate(columns):
+            if month != current_month:
+                current_month = month
+                hospital_counts, patient_counts = self._month_state(month)
+            hosp = self.hospital[hospital_id]
+            hosp[0] += amount
+            hosp[1] += 1
+            hospital_counts[hospital_id] += 1
+            month_count = hospital_counts[hospital_id]
+            dp = self.district_proc[(district, procedure)]
+            dp[0] += amount
+            dp[1] += 1
+            patient_key = (hospital_id, patient)
+            patient_counts[patient_key] += 1
+
+            self.amount_min = min(self.amount_min, amount)
+            self.amount_max = max(self.amount_max, amount)
+            span = self.amount_max - self.amount_min
+            out[i] = (
+                (amount - self.amount_min) / span if span > 0 else 0.0,
+                los,
+                hosp[0] / hosp[1],
+                month_count,
+                amount - dp[0] / dp[1],
+                patient_counts[patient_key] / max(month_count, 1),
+            )
+        return out
+
+
+class StreamingDetector:
+    """
+    Online counterpart of ``AnomalyDetector`` producing the same
+    ``combined_score`` contract: one score per claim in [0, 1], higher = more
+    anomalous, ready for ``compute_risk_scores``.
+
+    Features are log-compressed (they are heavy-tailed) and mapped to [0, 1]
+    with ranges frozen from the first window. The half-space tree mass is
+    inverted and MinMax-scaled with the previous window's raw score range,
+    clipped to [0, 1], so the calibration follows the stream in constant
+    memory.
+    """
+
+    def __init__(
+        self,
+        n_trees: int = 25,
+        depth: int = 10,
+        window_size: int = 5_000,
+        random_state: int | None = 42,
+    ) -> None:
+        self.trees = HalfSpaceTrees(
+            len(TARGET_FEATURE_COLUMNS),
+            n_trees=n_trees,
+            depth=depth,
+            window_size=window_size,
+            random_state=random_state,
+        )
+        self.window_size = window_size
+        self.feature_low: np.ndarray | None = None
+        self.feature_high: np.ndarray | None = None
+        self.score_bounds: Tuple[float, float] | None = None
+        # Running raw-score min/max of the current window
+        self._window_low = np.inf
+        self._window_high = -np.inf
+
+    @staticmethod
+    def _compress(X: np.ndarray) -> np.ndarray:
+        return np.sign(X) * np.log1p(np.abs(X))
+
+    def _normalize(self, X: np.ndarray) -> np.ndarray:
+        span = np.where(self.feature_high > self.feature_low, self.feature_high - self.feature_low, 1.0)
+        return (self._compress(X) - self.feature_low) / span
+
+    def _calibrate(self, raw: np.ndarray) -> np.ndarray:
+        low, high = self.score_bounds
+        if high <= low:
+            return np.zeros(len(raw))
+        return np.clip((high - raw) / (high - low), 0.0, 1.0)
+
+    def score_learn(self, X: np.ndarray | pd.DataFrame) -> np.ndarray:
+        """
+        Score claims in arrival order and learn from them. Returns the
+        ``combined_score`` per claim.
+
+        Feature ranges are frozen from the first chunk (up to one window);
+        until the first window closes, scores are calibrated on the raw
+        scores seen so far.
+        """
+        X = np.asarray(X, dtype=float)
+        if self.feature_low is None:
+            compressed = self._compress(X[: self.window_size])
+            self.feature_low, self.feature_high = compressed.min(axis=0), compressed.max(axis=0)
+        combined = np.empty(len(X))
+        start = 0
+        while start < len(X):
+            # Split on window boundaries so calibration bounds roll exactly per window
+            room = self.window_size - self.trees.n_seen % self.window_size
+            stop = min(len(X), start + room)
+            raw = self.trees.score_learn(self._normalize(X[start:stop]))
+            self._window_low = min(self._window_low, float(raw.min()))
+            self._window_high = max(self._window_high, float(raw.max()))
+            if self.score_bounds is None or not self.trees.is_warm:
+                self.score_bounds = (self._window_low, self._window_high)
+            combined[start:stop] = self._calibrate(raw)
+            if self.trees.n_seen % self.window_size == 0:
+                self.score_bounds = (self._window_low, self._window_high)
+                self._window_low, self._window_high = np.inf, -np.inf
+            start = stop
+        return combined
+
+    def score(self, X: np.ndarray | pd.DataFrame) -> np.ndarray:
+        """
+        ``combined_score`` for claims without learning from them.
+        """
+        if self.score_bounds is None:
+            raise RuntimeError("StreamingDetector has not seen a full window yet")
+        return self._calibrate(self.trees.score(self._normalize(np.asarray(X, dtype=float))))
+
+    def state_nbytes(self) -> int:
+        """
+        Size of the model state (fixed for the lifetime of the detector).
+        """
+        return (
+            self.trees.reference.nbytes
+            + self.trees.latest.nbytes
+            + self.trees.split_dim.nbytes
+            + self.trees.split_value.nbytes
+        )
@@ -0,0 +1,609 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.database.db_setup import CLAIM_COLUMNS, get_db_connection
+from fraud_detection_agent.database.schema import is_normalized
+from fraud_detection_agent.database.snapshot import categorical_from_codes
+from fraud_detection_agent.preprocessing.preprocess import (
+    CATEGORICAL_COLUMNS,
+    FEATURE_SOURCE_COLUMNS,
+    TARGET_FEATURE_COLUMNS,
+    FeatureData,
+)
+from fraud_detection_agent.preprocessing.sql_features import _DERIVED_COLUMNS, fetch_columns
+
+
+# Persistent feature store next to the claims. Running sums/counts are kept
+# per group key and the per-claim features are materialized, so appending a
+# batch of claims only touches the groups that batch falls into. Every table
+# uses the ``fs_`` prefix so ``drop_claims_storage`` removes the store with
+# the facts it was derived from.
+FEATURE_STORE_DDL = [
+    "CREATE TABLE IF NOT EXISTS fs_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS fs_hospital (
+        hospital_key INTEGER PRIMARY KEY,
+        amount_sum REAL NOT NULL,
+        claim_count INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fs_hospital_month (
+        hospital_key INTEGER NOT NULL,
+        admission_month INTEGER NOT NULL,
+        claim_count INTEGER NOT NULL,
+        PRIMARY KEY (hospital_key, admission_month)
+    ) WITHOUT ROWID
+    """,
+    # Grouped by district name (not district_key) to match the pandas path
+    """
+    CREATE TABLE IF NOT EXISTS fs_district_procedure (
+        district TEXT NOT NULL,
+        procedure_key INTEGER NOT NULL,
+        amount_sum REAL NOT NULL,
+        claim_count INTEGER NOT NULL,
+        PRIMARY KEY (district, procedure_key)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fs_patient_month (
+        hospital_key INTEGER NOT NULL,
+        admission_month INTEGER NOT NULL,
+        patient_id TEXT NOT NULL,
+        claim_count INTEGER NOT NULL,
+        PRIMARY KEY (hospital_key, admission_month, patient_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fs_claim_features (
+        claim_key INTEGER PRIMARY KEY,
+        claim_frequency_per_month INTEGER NOT NULL,
+        district_proc_avg_cost REAL NOT NULL,
+        procedure_cost_deviation REAL NOT NULL,
+        patient_claim_count_hosp_month INTEGER NOT NULL,
+        patient_repeat_ratio REAL NOT NULL
+    )
+    """,
+]
+
+_WATERMARK_KEY = "claim_watermark"
+
+# Raw columns stored on the fact table; everything else is decoded from the
+# dimension tables by integer key on the Python side.
+_FACT_COLUMNS = ["claim_id", "patient_id", "claim_amount", "length_of_stay"]
+_DIMENSION_COLUMNS = {
+    "hospital_id": ("hospitals", "hospital_key"),
+    "hospital_name": ("hospitals", "hospital_key"),
+    "hospital_type": ("hospitals", "hospital_key"),
+    "district": ("districts", "district_key"),
+    "state": ("districts", "district_key"),
+    "procedure_code": ("procedures", "procedure_key"),
+}
+
+_STORE_QUERY = """
+    SELECT
+        f.claim_id,
+        f.patient_id,
+        f.claim_amount,
+        f.length_of_stay,
+        f.hospital_key,
+        f.district_key,
+        f.procedure_key,
+        f.admission_day,
+        f.discharge_day,
+        f.admission_month,
+        h.amount_sum / h.claim_count AS avg_claim_per_hospital,
+        c.claim_frequency_per_month,
+        c.district_proc_avg_cost,
+        c.procedure_cost_deviation,
+        c.patient_claim_count_hosp_month,
+        c.patient_repeat_ratio
+    FROM claim_facts AS f
+    JOIN fs_claim_features AS c ON c.claim_key = f.claim_key
+    JOIN fs_hospital AS h ON h.hospital_key = f.hospital_key
+    ORDER BY f.claim_key
+"""
+
+# Array dtypes of the fact columns read by _STORE_QUERY, in result order
+_FACT_DTYPES = {
+    "claim_id": object,
+    "patient_id": object,
+    "claim_amount": np.float64,
+    "length_of_stay": np.int64,
+    "hospital_key": np.int64,
+    "district_key": np.int64,
+    "procedure_key": np.int64,
+    "admission_day": np.int64,
+    "discharge_day": np.int64,
+    "admission_month": np.int64,
+}
+_STORE_QUERY_DTYPES = {
+    **_FACT_DTYPES,
+    "avg_claim_per_hospital": np.float64,
+    "claim_frequency_per_month": np.int64,
+    "district_proc_avg_cost": np.float64,
+    "procedure_cost_deviation": np.float64,
+    "patient_claim_count_hosp_month": np.int64,
+    "patient_repeat_ratio": np.float64,
+}
+
+
+def _key_codes(keys, lookup: pd.Series) -> tuple:
+    """
+    ``(codes, labels)``: integer keys mapped to codes into the distinct
+    labels of ``lookup`` (indexed by key) via a dense array indexed by key.
+    """
+    label_codes, labels = pd.factorize(lookup)
+    table = np.full(int(lookup.index.max()) + 1 if len(lookup) else 1, -1, dtype=np.int32)
+    table[lookup.index.to_numpy()] = label_codes
+    return table[np.asarray(keys)], labels
+
+
+def _decode(keys, lookup: pd.Series, categorical: bool = False):
+    """
+    Map integer keys to labels via a dense array indexed by key.
+
+    With ``categorical`` the keys are remapped to codes into the distinct
+    labels instead, so no per-row strings are built.
+    """
+    codes, labels = _key_codes(keys, lookup)
+    if categorical:
+        return categorical_from_codes(codes, np.asarray(labels, dtype=object))
+    return np.asarray(labels, dtype=object)[codes]
+
+
+def _decode_labels(values: pd.Series, to_label, categorical: bool = False):
+    """
+    Format labels once per distinct value (days, months) instead of per row.
+    """
+    codes, uniques = pd.factorize(values)
+    labels = np.asarray(to_label(pd.Index(uniques)), dtype=object)
+    if categorical:
+        return categorical_from_codes(codes, labels)
+    return labels[codes]
+
+
+def _watermark(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM fs_meta WHERE key = ?", (_WATERMARK_KEY,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _reset_store(conn: sqlite3.Connection) -> None:
+    for table in ("fs_hospital", "fs_hospital_month", "fs_district_procedure", "fs_patient_month",
+                  "fs_claim_features", "fs_meta"):
+        conn.execute(f"DELETE FROM {table}")
+
+
+def update_feature_store(conn: sqlite3.Connection, rebuild: bool = False) -> int:
+    """
+    Fold claims appended since the last update into the feature store.
+
+    Only facts above the stored ``claim_key`` watermark are aggregated into the
+    running sums/counts, and only claims whose hospital-month or
+    district-procedure group received new claims get their
+    ``claim_frequency_per_month``, ``procedure_cost_deviation`` and
+    ``patient_repeat_ratio`` recomputed. A first run, ``rebuild=True``, or a run
+    after the facts were rebuilt underneath the store builds everything from
+    scratch.
+
+    Returns the number of claims folded in.
+    """
+    if not is_normalized(conn):
+        raise RuntimeError("Feature store requires the normalized claims schema")
+    for ddl in FEATURE_STORE_DDL:
+        conn.execute(ddl)
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        watermark = _watermark(conn)
+        max_key = conn.execute("SELECT coalesce(max(claim_key), 0) FROM claim_facts").fetchone()[0]
+        if max_key == watermark and not rebuild:
+            return 0
+        if rebuild or max_key < watermark:
+            _reset_store(conn)
+            watermark = 0
+
+        conn.execute("DROP TABLE IF EXISTS temp.fs_batch")
+        conn.execute(
+            """
+            CREATE TEMP TABLE fs_batch AS
+            SELECT f.claim_key, f.hospital_key, f.admission_month, d.district, f.procedure_key,
+                   f.patient_id, f.claim_amount
+            FROM claim_facts AS f
+            JOIN districts AS d ON d.district_key = f.district_key
+            WHERE f.claim_key > ?
+            """,
+            (watermark,),
+        )
+
+        # Running aggregates: O(batch) upserts
+        conn.execute(
+            """
+            INSERT INTO fs_hospital (hospital_key, amount_sum, claim_count)
+            SELECT hospital_key, sum(claim_amount), count(*) FROM fs_batch WHERE true GROUP BY hospital_key
+            ON CONFLICT (hospital_key) DO UPDATE SET
+                amount_sum = amount_sum + excluded.amount_sum,
+                claim_count = claim_count + excluded.claim_count
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO fs_hospital_month (hospital_key, admission_month, claim_count)
+            SELECT hospital_key, admission_month, count(*) FROM fs_batch WHERE true
+            GROUP BY hospital_key, admission_month
+            ON CONFLICT (hospital_key, admission_month) DO UPDATE SET
+                claim_count = claim_count + excluded.claim_count
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO fs_district_procedure (district, procedure_key, amount_sum, claim_count)
+            SELECT district, procedure_key, sum(claim_amount), count(*) FROM fs_batch WHERE true
+            GROUP BY district, procedure_key
+            ON CONFLICT (district, procedure_key) DO UPDATE SET
+                amount_sum = amount_sum + excluded.amount_sum,
+                claim_count = claim_count + excluded.claim_count
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO fs_patient_month (hospital_key, admission_month, patient_id, claim_count)
+            SELECT hospital_key, admission_month, patient_id, count(*) FROM fs_batch WHERE true
+            GROUP BY hospital_key, admission_month, patient_id
+            ON CONFLICT (hospital_key, admission_month, patient_id) DO UPDATE SET
+                claim_count = claim_count + excluded.claim_count
+            """
+        )
+
+        # Features for the new claims
+        conn.execute(
+            """
+            INSERT INTO fs_claim_features (
+                claim_key, claim_frequency_per_month, district_proc_avg_cost, procedure_cost_deviation,
+                patient_claim_count_hosp_month, patient_repeat_ratio
+            )
+            SELECT
+                b.claim_key,
+                hm.claim_count,
+                dp.amount_sum / dp.claim_count,
+                b.claim_amount - dp.amount_sum / dp.claim_count,
+                pm.claim_count,
+                CAST(pm.claim_count AS REAL) / max(hm.claim_count, 1)
+            FROM fs_batch AS b
+            JOIN fs_hospital_month AS hm
+              ON hm.hospital_key = b.hospital_key AND hm.admission_month = b.admission_month
+            JOIN fs_district_procedure AS dp
+              ON dp.district = b.district AND dp.procedure_key = b.procedure_key
+            JOIN fs_patient_month AS pm
+              ON pm.hospital_key = b.hospital_key AND pm.admission_month = b.admission_month
+             AND pm.patient_id = b.patient_id
+            """
+        )
+
+        if watermark > 0:
+            _refresh_affected_claims(conn, watermark)
+
+        conn.execute(
+            "INSERT INTO fs_meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (_WATERMARK_KEY, max_key),
+        )
+        folded = conn.execute("SELECT count(*) FROM fs_batch").fetchone()[0]
+        conn.execute("DROP TABLE temp.fs_batch")
+    return folded
+
+
+def _refresh_affected_claims(conn: sqlite3.Connection, watermark: int) -> None:
+    """
+    Recompute stored features of existing claims (``claim_key <= watermark``)
+    in the groups touched by ``fs_batch``.
+
+    The new values are staged in a temp table first: CROSS JOIN pins the join
+    order so SQLite walks the fact indexes per affected group, and the UPDATE
+    then only does primary-key lookups.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.fs_affected")
+    conn.execute(
+        """
+        CREATE TEMP TABLE fs_affected AS
+        SELECT f.claim_key, hm.claim_count AS month_count, pm.claim_count AS patient_count
+        FROM (SELECT DISTINCT hospital_key, admission_month FROM fs_batch) AS a
+        CROSS JOIN fs_hospital_month AS hm
+          ON hm.hospital_key = a.hospital_key AND hm.admission_month = a.admission_month
+        CROSS JOIN claim_facts AS f
+          ON f.hospital_key = a.hospital_key AND f.admission_month = a.admission_month
+        CROSS JOIN fs_patient_month AS pm
+          ON pm.hospital_key = f.hospital_key AND pm.admission_month = f.admission_month
+         AND pm.patient_id = f.patient_id
+        WHERE f.claim_key <= ?
+        """,
+        (watermark,),
+    )
+    conn.execute(
+        """
+        UPDATE fs_claim_features
+        SET claim_frequency_per_month = u.month_count,
+            patient_claim_count_hosp_month = u.patient_count,
+            patient_repeat_ratio = CAST(u.patient_count AS REAL) / max(u.month_count, 1)
+        FROM fs_affected AS u
+        WHERE fs_claim_features.claim_key = u.claim_key
+        """
+    )
+    conn.execute("DROP TABLE temp.fs_affected")
+    conn.execute(
+        """
+        CREATE TEMP TABLE fs_affected AS
+        SELECT f.claim_key, f.claim_amount, dp.amount_sum / dp.claim_count AS avg_cost
+        FROM (SELECT DISTINCT district, procedure_key FROM fs_batch) AS a
+        CROSS JOIN fs_district_procedure AS dp
+          ON dp.district = a.district AND dp.procedure_key = a.procedure_key
+        CROSS JOIN districts AS d ON d.district = a.district
+        CROSS JOIN claim_facts AS f
+          ON f.district_key = d.district_key AND f.procedure_key = a.procedure_key
+        WHERE f.claim_key <= ?
+        """,
+        (watermark,),
+    )
+    conn.execute(
+        """
+        UPDATE fs_claim_features
+        SET district_proc_avg_cost = u.avg_cost,
+            procedure_cost_deviation = u.claim_amount - u.avg_cost
+        FROM fs_affected AS u
+        WHERE fs_claim_features.claim_key = u.claim_key
+        """
+    )
+    conn.execute("DROP TABLE temp.fs_affected")
+
+
+def refresh_feature_store() -> int:
+    """
+    ``update_feature_store`` on a pooled connection. Pipeline builds call it,
+    so readers of the store (``batch_features``) never take its write lock.
+    """
+    conn = get_db_connection()
+    try:
+        return update_feature_store(conn)
+    finally:
+        conn.close()
+
+
+def build_features_store(columns: Optional[List[str]] = None, categorical: bool = False) -> FeatureData:
+    """
+    Build FeatureData from the persistent feature store, first folding in any
+    claims appended since the last refresh.
+
+    ``avg_claim_per_hospital`` is read from the running per-hospital sums at
+    load time rather than stored per claim, since every append would change it
+    for all of that hospital's claims. Running sums are accumulated batch by
+    batch, so group means can differ from the pandas path in the last bits.
+    """
+    if columns is None:
+        raw_columns = list(CLAIM_COLUMNS)
+    else:
+        raw_columns = list(dict.fromkeys(FEATURE_SOURCE_COLUMNS + list(columns)))
+
+    conn = get_db_connection()
+    try:
+        update_feature_store(conn)
+        conn.execute("BEGIN")
+        try:
+            dims = _read_dimensions(conn)
+            n_rows = conn.execute(
+                "SELECT count(*) FROM claim_facts AS f JOIN fs_claim_features AS c ON c.claim_key = f.claim_key"
+            ).fetchone()[0]
+            facts = fetch_columns(conn, _STORE_QUERY, _STORE_QUERY_DTYPES, n_rows)
+        finally:
+            conn.rollback()
+    finally:
+        conn.close()
+
+    return _assemble_feature_data(facts, dims, raw_columns, categorical=categorical)
+
+
+def _read_dimensions(conn) -> Dict[str, pd.DataFrame]:
+    return {
+        "hospitals": pd.read_sql_query("SELECT * FROM hospitals", conn, index_col="hospital_key"),
+        "districts": pd.read_sql_query("SELECT * FROM districts", conn, index_col="district_key"),
+        "procedures": pd.read_sql_query("SELECT * FROM procedures", conn, index_col="procedure_key"),
+    }
+
+
+def _assemble_feature_data(
+    facts: Mapping[str, object],
+    dims: Dict[str, pd.DataFrame],
+    raw_columns: List[str],
+    categorical: bool = False,
+) -> FeatureData:
+    """
+    Turn fact columns with integer keys and the stored group features
+    (arrays by column name) into FeatureData. With ``categorical`` the
+    ``CATEGORICAL_COLUMNS`` are built as categoricals.
+    """
+    # Assemble every output column once, in the pandas path's order, so the
+    # enriched frame is built without intermediate copies.
+    def column(name: str) -> pd.Series:
+        return pd.Series(facts[name], copy=False)
+
+    amount = column("claim_amount").astype(float)
+    scaler_claim_amount = MinMaxScaler()
+    data = {}
+    for c in raw_columns:
+        if c == "claim_amount":
+            data[c] = amount
+        elif c in _FACT_COLUMNS:
+            data[c] = column(c).astype("category") if categorical and c in CATEGORICAL_COLUMNS else column(c)
+        elif c in _DIMENSION_COLUMNS:
+            table, key = _DIMENSION_COLUMNS[c]
+            data[c] = _decode(facts[key], dims[table][c], categorical=categorical)
+        elif c == "admission_date":
+            data[c] = pd.to_datetime(column("admission_day"), unit="D").astype("datetime64[us]")
+        elif c == "discharge_date":
+            data[c] = _decode_labels(
+                column("discharge_day"), lambda days: pd.to_datetime(days, unit="D").strftime("%Y-%m-%d")
+            )
+    data["claim_amount_norm"] = scaler_claim_amount.fit_transform(amount.to_frame()).ravel()
+    data["month"] = _decode_labels(
+        column("admission_month"),
+        lambda months: [f"{m // 100:04d}-{m % 100:02d}" for m in months],
+        categorical=categorical,
+    )
+    data["avg_claim_per_hospital"] = column("avg_claim_per_hospital")
+    data["claim_frequency_per_month"] = column("claim_frequency_per_month")
+    data["district_proc_avg_cost"] = column("district_proc_avg_cost")
+    data["procedure_cost_deviation"] = column("procedure_cost_deviation")
+    data["patient_claim_count_hosp_month"] = column("patient_claim_count_hosp_month")
+    data["hosp_month_total_claims"] = data["claim_frequency_per_month"]
+    data["patient_repeat_ratio"] = column("patient_repeat_ratio")
+    del facts
+    df_enriched = pd.DataFrame(data, columns=raw_columns + _DERIVED_COLUMNS)
+
+    return FeatureData(
+        features=df_enriched[TARGET_FEATURE_COLUMNS].fillna(0.0),
+        enriched=df_enriched,
+        scaler_claim_amount=scaler_claim_amount,
+    )
+
+
+# Stored aggregates for the groups of a batch of unsaved claims (one row per
+# batch row); groups the store has not seen come back NULL.
+_BATCH_LOOKUP_QUERY = """
+    SELECT
+        b.row_id,
+        hs.amount_sum AS hospital_amount_sum,
+        hs.claim_count AS hospital_claim_count,
+        (SELECT count(*) FROM fs_hospital_month AS m WHERE m.hospital_key = h.hospital_key) AS hospital_months,
+        hm.claim_count AS month_claim_count,
+        dp.amount_sum AS district_proc_amount_sum,
+        dp.claim_count AS district_proc_claim_count,
+        pm.claim_count AS patient_claim_count,
+        h.hospital_type AS hospital_type,
+        hd.state AS state
+    FROM temp.fs_lookup AS b
+    LEFT JOIN hospitals AS h ON h.hospital_id = b.hospital_id
+    LEFT JOIN districts AS hd ON hd.district_key = h.district_key
+    LEFT JOIN fs_hospital AS hs ON hs.hospital_key = h.hospital_key
+    LEFT JOIN fs_hospital_month AS hm
+      ON hm.hospital_key = h.hospital_key AND hm.admission_month = b.admission_month
+    LEFT JOIN procedures AS p ON p.procedure_code = b.procedure_code
+    LEFT JOIN fs_district_procedure AS dp
+      ON dp.district = b.district AND dp.procedure_key = p.procedure_key
+    LEFT JOIN fs_patient_month AS pm
+      ON pm.hospital_key = h.hospital_key AND pm.admission_month = b.admission_month
+     AND pm.patient_id = b.patient_id
+    ORDER BY b.row_id
+"""
+
+
+def batch_features(
+    conn: sqlite3.Connection,
+    records: pd.DataFrame,
+    scaler_claim_amount: MinMaxScaler,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Engineer features for claims that are not stored, as if they were
+    appended to the claims in the feature store (the store is not modified).
+
+    Only the stored aggregates of the groups the batch falls into are read,
+    by primary key, and the batch's own contributions are added on top, so
+    the cost grows with the batch size rather than the stored claims.
+    ``claim_amount_norm`` uses the frozen ``scaler_claim_amount``. The store
+    must be current (see ``update_feature_store``).
+
+    Returns the enriched batch (``records`` plus the feature and rule input
+    columns of ``_add_derived_features``, and the stored ``hospital_type`` /
+    ``state`` of each hospital if missing) and the per hospital-month volumes
+    for ``apply_rule_based_flags(hospital_monthly=...)``.
+    """
+    df = records.copy().reset_index(drop=True)
+    df["claim_amount"] = df["claim_amount"].astype(float)
+    admission = pd.to_datetime(df["admission_date"])
+    df["month"] = admission.dt.strftime("%Y-%m")
+    admission_month = (admission.dt.year * 100 + admission.dt.month).astype("int64")
+
+    lookup = pd.DataFrame(
+        {
+            "row_id": np.arange(len(df)),
+            "hospital_id": df["hospital_id"].astype(str),
+            "admission_month": admission_month,
+            "district": df["district"].astype(str),
+            "procedure_code": df["procedure_code"].astype(str),
+            "patient_id": df["patient_id"].astype(str),
+        }
+    )
+    conn.execute("DROP TABLE IF EXISTS temp.fs_lookup")
+    conn.execute(
+        """
+        CREATE TEMP TABLE fs_lookup (
+            row_id INTEGER PRIMARY KEY, hospital_id TEXT, admission_month INTEGER,
+            district TEXT, procedure_code TEXT, patient_id TEXT
+        )
+        """
+    )
+    try:
+        # Committed right away so the temp insert leaves no transaction open
+        with conn:
+            conn.executemany(
+                "INSERT INTO temp.fs_lookup VALUES (?, ?, ?, ?, ?, ?)",
+                lookup.itertuples(index=False, name=None),
+            )
+        stored = pd.read_sql_query(_BATCH_LOOKUP_QUERY, conn)
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.fs_lookup")
+    # Hospital attributes (e.g. for segment routing) unless the records carry them
+    for col in ("hospital_type", "state"):
+        if col not in df.columns:
+            df[col] = stored.pop(col)
+    stored = stored.drop(columns=["hospital_type", "state"], errors="ignore").fillna(0.0)
+
+    keys = {
+        "hospital": [lookup["hospital_id"]],
+        "month": [lookup["hospital_id"], lookup["admission_month"]],
+        "district_proc": [lookup["district"], lookup["procedure_code"]],
+        "patient": [lookup["hospital_id"], lookup["admission_month"], lookup["patient_id"]],
+    }
+    amount = df["claim_amount"]
+
+    def batch_count(key: str) -> np.ndarray:
+        return amount.groupby(keys[key]).transform("count").to_numpy(dtype=float)
+
+    def batch_sum(key: str) -> np.ndarray:
+        return amount.groupby(keys[key]).transform("sum").to_numpy(dtype=float)
+
+    hospital_count = stored["hospital_claim_count"].to_numpy() + batch_count("hospital")
+    month_count = stored["month_claim_count"].to_numpy() + batch_count("month")
+    district_proc_count = stored["district_proc_claim_count"].to_numpy() + batch_count("district_proc")
+    patient_count = stored["patient_claim_count"].to_numpy() + batch_count("patient")
+
+    # Months of the batch the store has no claims for add to the hospital's month count
+    new_month = (stored["month_claim_count"] == 0) & ~lookup.duplicated(["hospital_id", "admission_month"])
+    new_months = new_month.groupby(lookup["hospital_id"]).transform("sum").to_numpy(dtype=float)
+    hospital_months = stored["hospital_months"].to_numpy() + new_months
+
+    # MinMaxScaler.transform, applied directly so scalers fitted with or
+    # without feature names both work
+    df["claim_amount_norm"] = amount.to_numpy() * scaler_claim_amount.scale_[0] + scaler_claim_amount.min_[0]
+    df["avg_claim_per_hospital"] = (stored["hospital_amount_sum"].to_numpy() + batch_sum("hospital")) / hospital_count
+    df["claim_frequency_per_month"] = month_count.astype(np.int64)
+    df["district_proc_avg_cost"] = (
+        stored["district_proc_amount_sum"].to_numpy() + batch_sum("district_proc")
+    ) / district_proc_count
+    df["procedure_cost_deviation"] = df["claim_amount"] - df["district_proc_avg_cost"]
+    df["patient_claim_count_hosp_month"] = patient_count.astype(np.int64)
+    df["hosp_month_total_claims"] = df["claim_frequency_per_month"]
+    df["patient_repeat_ratio"] = df["patient_claim_count_hosp_month"] / df["hosp_month_total_claims"].clip(lower=1)
+
+    hospital_monthly = pd.DataFrame(
+        {
+            "hospital_id": df["hospital_id"],
+            "month": df["month"],
+            "claims_in_month": df["claim_frequency_per_month"],
+            "hosp_avg_monthly_claims": hospital_count / hospital_months,
+        }
+    ).drop_duplicates(["hospital_id", "month"], ignore_index=True)
+    return df, hospital_monthly
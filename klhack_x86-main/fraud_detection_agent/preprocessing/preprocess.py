@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
-from typing import Tuple
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
-from fraud_detection_agent.database.db_setup import get_db_connection
+from fraud_detection_agent.database.db_setup import get_claims_version, get_db_connection
+from fraud_detection_agent.database.snapshot import load_claims_snapshot, write_claims_snapshot
 
 
 TARGET_FEATURE_COLUMNS = [
@@ -18,6 +21,39 @@ TARGET_FEATURE_COLUMNS = [
     "patient_repeat_ratio",
 ]
 
+# Raw claim columns the feature engineering itself depends on
+FEATURE_SOURCE_COLUMNS = [
+    "claim_id",
+    "hospital_id",
+    "patient_id",
+    "procedure_code",
+    "claim_amount",
+    "admission_date",
+    "length_of_stay",
+    "district",
+]
+
+
+# "pandas" computes group features in-process; "sql" computes them in SQLite
+# window functions (see sql_features.py); "store" reads them from the
+# incrementally maintained feature store (see feature_store.py)
+FEATURE_BACKEND = os.getenv("FEATURE_BACKEND", "pandas")
+
+# Low-cardinality label columns carried as pandas categoricals (int codes +
+# one shared dictionary per column) so groupbys/merges downstream run on
+# integer codes and labels are only decoded when a response is serialized.
+CATEGORICAL_COLUMNS = [
+    "hospital_id",
+    "hospital_name",
+    "state",
+    "district",
+    "hospital_type",
+    "procedure_code",
+    "patient_id",
+    "month",
+]
+ENCODE_CATEGORICALS = os.getenv("ENCODE_CATEGORICALS", "1") != "0"
+
 
 @dataclass
 class FeatureData:
@@ -26,18 +62,46 @@ class FeatureData:
     scaler_claim_amount: MinMaxScaler
 
 
-def load_claims_from_db() -> pd.DataFrame:
+def load_claims_from_db(columns: Optional[List[str]] = None, categorical: bool = False) -> pd.DataFrame:
     """
-    Load raw claims table from SQLite.
+    Load raw claims (optionally only ``columns``) from SQLite.
+
+    Reads go through the columnar snapshot next to the DB; it is rebuilt
+    first if the claims table changed since it was written. Falls back to a
+    plain SQL read if the snapshot cannot be used. With ``categorical=True``
+    the ``CATEGORICAL_COLUMNS`` present are returned as categoricals.
     """
     conn = get_db_connection()
     try:
-        df = pd.read_sql_query("SELECT * FROM claims", conn)
+        version = get_claims_version(conn)
+        encoded = CATEGORICAL_COLUMNS if categorical else ()
+        df = load_claims_snapshot(columns, version=version, categorical=encoded)
+        if df is None:
+            try:
+                write_claims_snapshot(conn)
+                df = load_claims_snapshot(columns, version=version, categorical=encoded)
+            except OSError:
+                df = None
+        if df is None:
+            select = "*" if columns is None else ", ".join(columns)
+            df = pd.read_sql_query(f"SELECT {select} FROM claims", conn)
+            if categorical:
+                df = encode_categoricals(df)
     finally:
         conn.close()
     return df
 
 
+def encode_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the ``CATEGORICAL_COLUMNS`` present in ``df`` to categoricals (in place).
+    """
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    return df
+
+
 def _normalize_claim_amount(df: pd.DataFrame) -> Tuple[pd.DataFrame, MinMaxScaler]:
     df = df.copy()
     scaler = MinMaxScaler()
@@ -45,56 +109,117 @@ def _normalize_claim_amount(df: pd.DataFrame) -> Tuple[pd.DataFrame, MinMaxScale
     return df, scaler
 
 
-def _add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def _factorize(values: pd.Series) -> Tuple[np.ndarray, int]:
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), len(uniques)
+
+
+def _combine_codes(*keys: Tuple[np.ndarray, int]) -> Tuple[np.ndarray, int]:
+    """
+    Combine per-column factorized codes into dense int64 group codes.
+
+    Each string column is factorized once and shared by every grouping that
+    uses it; combining is integer arithmetic plus one int64 factorize. Rows
+    with a missing value in any key get code -1 (pandas groupby drops them,
+    so their group statistics are NaN).
+    """
+    codes, n_groups = keys[0]
+    missing = codes < 0
+    for key_codes, key_n in keys[1:]:
+        missing = missing | (key_codes < 0)
+        combined = codes * key_n + key_codes
+        if missing.any():
+            codes = np.full(len(combined), -1, dtype=np.int64)
+            present_codes, uniques = pd.factorize(combined[~missing])
+            codes[~missing] = present_codes
+        else:
+            codes, uniques = pd.factorize(combined)
+            codes = codes.astype(np.int64)
+        n_groups = len(uniques)
+    return codes, n_groups
+
+
+def _group_count(codes: np.ndarray, n_groups: int, valid: np.ndarray) -> np.ndarray:
+    """
+    Per-row count of non-null values in the row's group (NaN for missing keys).
+    """
+    has_key = codes >= 0
+    counts = np.bincount(codes[has_key], weights=valid[has_key], minlength=n_groups)
+    out = np.full(len(codes), np.nan)
+    out[has_key] = counts[codes[has_key]]
+    return out
+
+
+def _group_mean(codes: np.ndarray, values: pd.Series) -> pd.Series:
+    """
+    Per-row group mean. Uses pandas' groupby on the integer codes so the
+    summation matches the reference merge chain exactly.
+    """
+    return values.groupby(np.where(codes >= 0, codes, np.nan)).transform("mean")
+
+
+def _to_int_if_complete(values: np.ndarray) -> np.ndarray:
+    return values.astype(np.int64) if not np.isnan(values).any() else values
+
+
+def _month_column(admission_date: pd.Series, categorical: bool = False) -> Tuple[object, Tuple[np.ndarray, int]]:
+    """
+    ``(month column, (month codes, n_months))`` for datetime admission dates.
+
+    Month labels are formatted once per distinct date rather than once per
+    row; codes follow sorted labels and are -1 for a missing date.
+    """
+    date_codes, date_uniques = pd.factorize(admission_date)
+    month_labels = pd.Series(pd.DatetimeIndex(date_uniques).to_period("M").astype(str))
+
+    label_codes, month_uniques = pd.factorize(month_labels, sort=True)
+    month = (np.where(date_codes >= 0, label_codes[date_codes], -1).astype(np.int64), len(month_uniques))
+    if categorical:
+        return pd.Categorical.from_codes(month[0], categories=month_uniques), month
+    return month_labels.reindex(date_codes).to_numpy(), month
+
+
+def _add_derived_features(df: pd.DataFrame, categorical_month: bool = False) -> pd.DataFrame:
+    """
+    Add group-level features in a single pass over shared factorized keys.
+
+    Each grouping (hospital, hospital-month, district-procedure,
+    hospital-month-patient) is factorized once into integer codes and every
+    statistic is broadcast back by code, so no intermediate frame is merged.
+    Key columns may be strings or categoricals; ``categorical_month`` builds
+    ``month`` as a categorical from the codes computed here.
+    """
+    df = df.copy().reset_index(drop=True)
 
-    # Ensure datetime for grouping
+    # Ensure datetime for grouping (to_datetime caches repeated strings)
     df["admission_date"] = pd.to_datetime(df["admission_date"])
-    df["month"] = df["admission_date"].dt.to_period("M").astype(str)
+    df["month"], month = _month_column(df["admission_date"], categorical=categorical_month)
+    hospital = _factorize(df["hospital_id"])
+
+    claim_present = df["claim_id"].notna().to_numpy(dtype=float)
+    amount = df["claim_amount"]
+
+    hospital_codes, _ = hospital
+    hosp_month_codes, n_hosp_month = _combine_codes(hospital, month)
+    district_proc_codes, _ = _combine_codes(_factorize(df["district"]), _factorize(df["procedure_code"]))
+    patient_codes, n_patient = _combine_codes((hosp_month_codes, n_hosp_month), _factorize(df["patient_id"]))
 
     # Average claim per hospital
-    hospital_avg = df.groupby("hospital_id")["claim_amount"].mean().rename("avg_claim_per_hospital")
-    df = df.merge(hospital_avg, on="hospital_id", how="left")
-
-    # Claim frequency per hospital per month
-    freq = (
-        df.groupby(["hospital_id", "month"])["claim_id"]
-        .count()
-        .rename("claim_frequency_per_month")
-        .reset_index()
-    )
-    df = df.merge(freq, on=["hospital_id", "month"], how="left")
+    df["avg_claim_per_hospital"] = _group_mean(hospital_codes, amount)
+
+    # Claim frequency per hospital per month (also the hospital-month total below)
+    hosp_month_total = _to_int_if_complete(_group_count(hosp_month_codes, n_hosp_month, claim_present))
+    df["claim_frequency_per_month"] = hosp_month_total
 
     # Procedure cost deviation against district average for that procedure
-    proc_district_avg = (
-        df.groupby(["district", "procedure_code"])["claim_amount"]
-        .mean()
-        .rename("district_proc_avg_cost")
-        .reset_index()
-    )
-    df = df.merge(proc_district_avg, on=["district", "procedure_code"], how="left")
+    df["district_proc_avg_cost"] = _group_mean(district_proc_codes, amount)
     df["procedure_cost_deviation"] = df["claim_amount"] - df["district_proc_avg_cost"]
 
     # Patient repeat ratio: claims for a patient within hospital-month
-    patient_counts = (
-        df.groupby(["hospital_id", "month", "patient_id"])["claim_id"]
-        .count()
-        .rename("patient_claim_count_hosp_month")
-        .reset_index()
-    )
-    df = df.merge(
-        patient_counts,
-        on=["hospital_id", "month", "patient_id"],
-        how="left",
+    df["patient_claim_count_hosp_month"] = _to_int_if_complete(
+        _group_count(patient_codes, n_patient, claim_present)
     )
-
-    hosp_month_counts = (
-        df.groupby(["hospital_id", "month"])["claim_id"]
-        .count()
-        .rename("hosp_month_total_claims")
-        .reset_index()
-    )
-    df = df.merge(hosp_month_counts, on=["hospital_id", "month"], how="left")
+    df["hosp_month_total_claims"] = hosp_month_total
 
     df["patient_repeat_ratio"] = (
         df["patient_claim_count_hosp_month"] / df["hosp_month_total_claims"].clip(lower=1)
@@ -103,15 +228,39 @@ def _add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def build_features_from_db() -> FeatureData:
+def build_features_from_db(
+    columns: Optional[List[str]] = None,
+    backend: Optional[str] = None,
+    categorical: Optional[bool] = None,
+) -> FeatureData:
     """
     Load claims from DB and construct feature matrix with engineered features.
+
+    ``columns`` limits the extra raw columns carried into ``enriched``
+    (the feature source columns are always loaded); None loads all columns.
+    ``backend`` overrides ``FEATURE_BACKEND`` ("pandas", "sql" or "store") and
+    ``categorical`` overrides ``ENCODE_CATEGORICALS``.
     """
-    df_raw = load_claims_from_db()
+    backend = backend or FEATURE_BACKEND
+    categorical = ENCODE_CATEGORICALS if categorical is None else categorical
+    if backend == "sql":
+        from fraud_detection_agent.preprocessing.sql_features import build_features_sql
+
+        return build_features_sql(columns, categorical=categorical)
+    if backend == "store":
+        from fraud_detection_agent.preprocessing.feature_store import build_features_store
+
+        return build_features_store(columns, categorical=categorical)
+    if backend != "pandas":
+        raise ValueError(f"Unknown feature backend: {backend}")
+
+    if columns is not None:
+        columns = list(dict.fromkeys(FEATURE_SOURCE_COLUMNS + list(columns)))
+    df_raw = load_claims_from_db(columns, categorical=categorical)
     df_raw["claim_amount"] = df_raw["claim_amount"].astype(float)
 
     df_norm, scaler_claim_amount = _normalize_claim_amount(df_raw)
-    df_enriched = _add_derived_features(df_norm)
+    df_enriched = _add_derived_features(df_norm, categorical_month=categorical)
 
     # Ensure required columns exist
     missing = [c for c in TARGET_FEATURE_COLUMNS if c not in df_enriched.columns]
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.database.db_setup import CLAIM_COLUMNS, get_claims_version, get_db_connection
+from fraud_detection_agent.database.schema import is_normalized
+from fraud_detection_agent.preprocessing.preprocess import (
+    FEATURE_SOURCE_COLUMNS,
+    TARGET_FEATURE_COLUMNS,
+    FeatureData,
+    _month_column,
+    _to_int_if_complete,
+    load_claims_from_db,
+)
+
+
+_FETCH_CHUNK_ROWS = 10_000
+
+# Column order produced by the pandas path after the raw columns
+_DERIVED_COLUMNS = [
+    "claim_amount_norm",
+    "month",
+    "avg_claim_per_hospital",
+    "claim_frequency_per_month",
+    "district_proc_avg_cost",
+    "procedure_cost_deviation",
+    "patient_claim_count_hosp_month",
+    "hosp_month_total_claims",
+    "patient_repeat_ratio",
+]
+
+# Every group feature, one row per claim in claim order. Groups match the
+# pandas path: the district-procedure average is over the district name (not
+# district_key), and a claim without an admission month or patient gets NULL
+# counts, as groupby drops missing keys.
+_FEATURE_QUERY = """
+    SELECT
+        avg_claim_per_hospital,
+        claim_frequency_per_month,
+        district_proc_avg_cost,
+        claim_amount - district_proc_avg_cost AS procedure_cost_deviation,
+        patient_claim_count_hosp_month,
+        CAST(patient_claim_count_hosp_month AS REAL) / max(claim_frequency_per_month, 1) AS patient_repeat_ratio
+    FROM (
+        SELECT
+            f.claim_key,
+            f.claim_amount,
+            avg(f.claim_amount) OVER (PARTITION BY f.hospital_key) AS avg_claim_per_hospital,
+            CASE WHEN f.admission_month IS NOT NULL THEN count(f.claim_id) OVER hospital_month END
+                AS claim_frequency_per_month,
+            avg(f.claim_amount) OVER (PARTITION BY d.district, f.procedure_key) AS district_proc_avg_cost,
+            CASE WHEN f.admission_month IS NOT NULL AND f.patient_id IS NOT NULL
+                THEN count(f.claim_id) OVER (PARTITION BY f.hospital_key, f.admission_month, f.patient_id) END
+                AS patient_claim_count_hosp_month
+        FROM claim_facts AS f
+        JOIN districts AS d ON d.district_key = f.district_key
+        WINDOW hospital_month AS (PARTITION BY f.hospital_key, f.admission_month)
+    )
+    ORDER BY claim_key
+"""
+
+# Read as float so NULLs come back as NaN; complete counts are cast back to int
+_FEATURE_QUERY_DTYPES = {
+    "avg_claim_per_hospital": np.float64,
+    "claim_frequency_per_month": np.float64,
+    "district_proc_avg_cost": np.float64,
+    "procedure_cost_deviation": np.float64,
+    "patient_claim_count_hosp_month": np.float64,
+    "patient_repeat_ratio": np.float64,
+}
+
+
+def fetch_columns(conn, query: str, dtypes: Dict[str, type], n_rows: int) -> Dict[str, np.ndarray]:
+    """
+    Run ``query`` and stream its rows, ``_FETCH_CHUNK_ROWS`` at a time, into
+    one preallocated array per column (``dtypes`` in result order), so
+    neither the row tuples nor per-chunk frames exist for the whole result.
+    ``n_rows`` is the number of rows the query returns; the caller reads it
+    in the same transaction.
+    """
+    out = {name: np.empty(n_rows, dtype=dtype) for name, dtype in dtypes.items()}
+    arrays = list(out.values())
+    cursor = conn.execute(query)
+    start = 0
+    while True:
+        rows = cursor.fetchmany(_FETCH_CHUNK_ROWS)
+        if not rows:
+            break
+        if start + len(rows) > n_rows:
+            raise RuntimeError("Claims changed while features were being read")
+        for array, values in zip(arrays, zip(*rows)):
+            array[start:start + len(rows)] = values
+        start += len(rows)
+    if start != n_rows:
+        raise RuntimeError("Claims changed while features were being read")
+    return out
+
+
+def build_features_sql(columns: Optional[List[str]] = None, categorical: bool = False) -> FeatureData:
+    """
+    Build the same FeatureData as ``build_features_from_db`` with every group
+    feature (hospital and district-procedure means, hospital-month and
+    patient counts, cost deviation and repeat ratio) computed by SQLite
+    window functions over the integer keys of ``claim_facts``.
+
+    Only the six numeric feature columns cross into Python, streamed into
+    one array each (see ``fetch_columns``); the raw columns come from the
+    columnar snapshot, as on the pandas path, so no grouping is done in
+    Python. SQLite's ``avg`` sums in a different order than pandas, so the
+    means agree to about 1e-11 relative, not bit for bit. The window sorts
+    cost more than pandas' groupbys over the snapshot at the app's size, so
+    "pandas" stays the default backend.
+    """
+    if columns is None:
+        raw_columns = list(CLAIM_COLUMNS)
+    else:
+        raw_columns = list(dict.fromkeys(FEATURE_SOURCE_COLUMNS + list(columns)))
+
+    conn = get_db_connection()
+    try:
+        if not is_normalized(conn):
+            raise RuntimeError("SQL feature backend requires the normalized claims schema")
+        # One read transaction, so the row count matches what the query returns
+        conn.execute("BEGIN")
+        try:
+            version = get_claims_version(conn)
+            n_rows = conn.execute("SELECT count(*) FROM claim_facts").fetchone()[0]
+            features = fetch_columns(conn, _FEATURE_QUERY, _FEATURE_QUERY_DTYPES, n_rows)
+        finally:
+            conn.rollback()
+    finally:
+        conn.close()
+
+    df_raw = load_claims_from_db(raw_columns, categorical=categorical)
+    if len(df_raw) != n_rows or _claims_version() != version:
+        raise RuntimeError("Claims changed while features were being read")
+
+    amount = df_raw["claim_amount"].astype(float)
+    scaler_claim_amount = MinMaxScaler()
+    data = {c: df_raw[c] for c in raw_columns}
+    data["claim_amount"] = amount
+    data["admission_date"] = pd.to_datetime(df_raw["admission_date"])
+    data["claim_amount_norm"] = scaler_claim_amount.fit_transform(amount.to_frame()).ravel()
+    data["month"], _ = _month_column(data["admission_date"], categorical=categorical)
+    data["avg_claim_per_hospital"] = features["avg_claim_per_hospital"]
+    data["claim_frequency_per_month"] = _to_int_if_complete(features["claim_frequency_per_month"])
+    data["district_proc_avg_cost"] = features["district_proc_avg_cost"]
+    data["procedure_cost_deviation"] = features["procedure_cost_deviation"]
+    data["patient_claim_count_hosp_month"] = _to_int_if_complete(features["patient_claim_count_hosp_month"])
+    data["hosp_month_total_claims"] = data["claim_frequency_per_month"]
+    data["patient_repeat_ratio"] = features["patient_repeat_ratio"]
+    del df_raw, features
+    df_enriched = pd.DataFrame(data, columns=raw_columns + _DERIVED_COLUMNS)
+
+    return FeatureData(
+        features=df_enriched[TARGET_FEATURE_COLUMNS].fillna(0.0),
+        enriched=df_enriched,
+        scaler_claim_amount=scaler_claim_amount,
+    )
+
+
+def _claims_version() -> str:
+    conn = get_db_connection()
+    try:
+        return get_claims_version(conn)
+    finally:
+        conn.close()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 import pandas as pd
 
@@ -17,12 +17,17 @@ def ensure_report_dir() -> None:
 
 def generate_fraud_report(
     hospital_risk_df: pd.DataFrame,
-    claims_df: pd.DataFrame,
+    claims_df: Optional[pd.DataFrame],
     top_n: int = 5,
+    claim_counts: Optional[Dict[str, int]] = None,
 ) -> Tuple[str, str]:
     """
     Generate a structured text fraud report and save it to disk.
 
+    ``claim_counts`` (total_claims, suspicious_claims, rule_flagged_claims)
+    can be passed instead of ``claims_df`` when the claim totals were already
+    computed elsewhere (e.g. from the out-of-core results table).
+
     Returns (report_text, report_path).
     """
     ensure_report_dir()
@@ -35,9 +40,14 @@ def generate_fraud_report(
         by="avg_risk_score", ascending=False
     ).head(top_n)
 
-    total_claims = len(claims_df)
-    suspicious_claims = int((claims_df["anomaly_label"] == 1).sum())
-    rule_flagged = int(claims_df["any_rule_flag"].sum())
+    if claim_counts is not None:
+        total_claims = claim_counts["total_claims"]
+        suspicious_claims = claim_counts["suspicious_claims"]
+        rule_flagged = claim_counts["rule_flagged_claims"]
+    else:
+        total_claims = len(claims_df)
+        suspicious_claims = int((claims_df["anomaly_label"] == 1).sum())
+        rule_flagged = int(claims_df["any_rule_flag"].sum())
 
     lines: list[str] = []
     lines.append("Ayushman Bharat Fraud Detection Report")
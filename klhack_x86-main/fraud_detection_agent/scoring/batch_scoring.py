@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.database.db_setup import get_db_connection
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector, HistogramDetector
+from fraud_detection_agent.models.segmented import SegmentedDetector
+from fraud_detection_agent.preprocessing.feature_store import batch_features
+from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+from fraud_detection_agent.scoring.duplicates import DuplicateIndex, flag_duplicates
+from fraud_detection_agent.scoring.risk_scoring import (
+    RiskConfig,
+    RiskReference,
+    apply_rule_based_flags,
+    compute_risk_scores,
+)
+
+
+ANOMALY_LABEL_THRESHOLD = 0.7
+
+# Columns returned per scored claim
+SCORED_COLUMNS = [
+    "claim_id",
+    "combined_score",
+    "anomaly_label",
+    "rule_upcoding",
+    "rule_ghost_billing",
+    "rule_claim_surge",
+    "rule_duplicate",
+    "duplicate_cluster_id",
+    "any_rule_flag",
+    "risk_score",
+    "risk_category",
+]
+
+
+@dataclass
+class ClaimScorer:
+    """
+    Everything frozen at fit time that is needed to score new claims: the
+    fitted detector, the claim amount scaler and the risk reference, plus
+    the duplicate index of the stored claims when one was built.
+    """
+
+    detector: AnomalyDetector | HistogramDetector | SegmentedDetector
+    scaler_claim_amount: MinMaxScaler
+    risk_reference: RiskReference
+    config: Optional[RiskConfig] = None
+    duplicate_index: Optional[DuplicateIndex] = None
+
+
+def score_claim_records(
+    scorer: ClaimScorer,
+    records: pd.DataFrame,
+    conn: Optional[sqlite3.Connection] = None,
+) -> pd.DataFrame:
+    """
+    Score a batch of claim records against the stored claims without
+    refitting anything.
+
+    Features are computed as if the batch were appended to the feature store
+    (see ``batch_features``), which is only read: the pipeline build the
+    scorer comes from refreshes it. The anomaly score comes from
+    ``AnomalyDetector.score`` and the risk score from the frozen reference,
+    so the cost grows with the batch size only. Duplicates are matched
+    against ``scorer.duplicate_index`` (read only) and within the batch.
+    Returns ``SCORED_COLUMNS``
+    in the order of ``records``.
+    """
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        df, hospital_monthly = batch_features(conn, records, scorer.scaler_claim_amount)
+    finally:
+        if own_conn:
+            conn.close()
+
+    X = df[TARGET_FEATURE_COLUMNS].fillna(0.0).to_numpy()
+    if isinstance(scorer.detector, SegmentedDetector):
+        scores = scorer.detector.score(X, df[scorer.detector.segment_key]).combined_score
+    else:
+        scores = scorer.detector.score(X).combined_score
+    df["combined_score"] = scores
+    df["anomaly_label"] = (scores > ANOMALY_LABEL_THRESHOLD).astype(np.int8)
+    df = compute_risk_scores(df, scores, config=scorer.config, reference=scorer.risk_reference)
+    df = apply_rule_based_flags(df, hospital_monthly=hospital_monthly)
+    df = flag_duplicates(df, index=scorer.duplicate_index, update=False)
+    return df[SCORED_COLUMNS]
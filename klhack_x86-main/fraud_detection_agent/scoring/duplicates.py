@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+# Two claims are duplicates when they share the block columns, their
+# admission dates are at most DUPLICATE_DATE_TOLERANCE_DAYS apart and their
+# amounts differ by at most DUPLICATE_AMOUNT_TOLERANCE (relative).
+DUPLICATE_DATE_TOLERANCE_DAYS = int(os.getenv("DUPLICATE_DATE_TOLERANCE_DAYS", "2"))
+DUPLICATE_AMOUNT_TOLERANCE = float(os.getenv("DUPLICATE_AMOUNT_TOLERANCE", "0.02"))
+
+DUPLICATE_BLOCK_COLUMNS = ["patient_id", "procedure_code", "hospital_id"]
+
+# "1" also counts rule_duplicate in any_rule_flag (and so in suspicious
+# claims, hospital rule flag counts and risk categories); off by default so
+# those established outputs are unchanged.
+DUPLICATES_IN_RULE_FLAG = os.getenv("DUPLICATES_IN_RULE_FLAG", "0") == "1"
+
+# Index key: the block hash in the high 44 bits, the admission day in the low
+# 20, so one sorted uint64 array orders claims by block, then date.
+_DAY_BITS = 20
+_DAY_MASK = np.uint64((1 << _DAY_BITS) - 1)
+
+
+@dataclass
+class DuplicateMatches:
+    """
+    Per-claim result, in the order of the claims passed in.
+    ``rule_duplicate`` marks claims matching an earlier claim; the first
+    claim of a cluster only gets its ``cluster_id`` (-1: no duplicate).
+    Results already returned for earlier batches are not revised when a
+    later claim joins their cluster.
+    """
+
+    rule_duplicate: np.ndarray
+    cluster_id: np.ndarray
+
+
+def _block_keys(df: pd.DataFrame) -> tuple:
+    """
+    ``(index key, admission day, has key)`` per row.
+    """
+    block = np.zeros(len(df), dtype=np.uint64)
+    has_key = np.ones(len(df), dtype=bool)
+    for column in DUPLICATE_BLOCK_COLUMNS:
+        values = df[column]
+        has_key &= values.notna().to_numpy()
+        with np.errstate(over="ignore"):
+            block = block * np.uint64(1_000_003) ^ pd.util.hash_array(np.asarray(values.array))
+    admission = pd.to_datetime(df["admission_date"])
+    has_key &= admission.notna().to_numpy()
+    day = (admission.to_numpy().astype("datetime64[D]").astype(np.int64)).clip(0, int(_DAY_MASK))
+    day = np.where(has_key, day, 0).astype(np.uint64)
+    keys = (block >> np.uint64(_DAY_BITS) << np.uint64(_DAY_BITS)) | day
+    return keys, day.astype(np.int64), has_key
+
+
+class DuplicateIndex:
+    """
+    Incremental near-duplicate index over claims.
+
+    Candidates are blocked on a hash of ``DUPLICATE_BLOCK_COLUMNS``: the index
+    keeps one sorted key array (block hash, then admission day), so the
+    candidates of a claim are the entries of its block within the date
+    tolerance, found by binary search; no pair across blocks is compared.
+    Matches (also within the tolerances on amount) are joined into clusters,
+    transitively. ``add`` matches a batch against the index and against
+    itself and then inserts it; the cost is linear in the batch and its
+    candidates plus one merge of the sorted arrays, never a rescan.
+
+    Block hashes are 44 bits, so distinct blocks collide with negligible
+    probability at millions of claims; a collision still needs the date and
+    amount to match.
+    """
+
+    def __init__(
+        self,
+        date_tolerance_days: int = DUPLICATE_DATE_TOLERANCE_DAYS,
+        amount_tolerance: float = DUPLICATE_AMOUNT_TOLERANCE,
+    ) -> None:
+        self.date_tolerance_days = date_tolerance_days
+        self.amount_tolerance = amount_tolerance
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._amounts = np.empty(0, dtype=np.float64)
+        # Cluster of each entry: the arrival number of the cluster's first claim
+        self._clusters = np.empty(0, dtype=np.int64)
+        self.n_claims = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def nbytes(self) -> int:
+        return self._keys.nbytes + self._amounts.nbytes + self._clusters.nbytes
+
+    def _amount_match(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.abs(a - b) <= self.amount_tolerance * np.maximum(np.abs(a), np.abs(b))
+
+    def _batch_pairs(self, keys: np.ndarray, day: np.ndarray, amounts: np.ndarray) -> tuple:
+        """
+        Matching pairs within the batch (rows of the batch's ``keys``).
+        """
+        order = np.argsort(keys, kind="stable")
+        block = (keys >> np.uint64(_DAY_BITS))[order]
+        sorted_day = day[order]
+        left, right = [], []
+        # Sorted by block then day: once no row is within tolerance of the row
+        # `lag` places on, no row is of any row further on
+        for lag in range(1, len(order)):
+            near = (block[lag:] == block[:-lag]) & (sorted_day[lag:] - sorted_day[:-lag] <= self.date_tolerance_days)
+            if not near.any():
+                break
+            i = np.flatnonzero(near)
+            left.append(order[i])
+            right.append(order[i + lag])
+        if not left:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        left, right = np.concatenate(left), np.concatenate(right)
+        match = self._amount_match(amounts[left], amounts[right])
+        return left[match], right[match]
+
+    def _index_pairs(self, keys: np.ndarray, day: np.ndarray, amounts: np.ndarray) -> tuple:
+        """
+        Matching ``(batch row, index position)`` pairs.
+        """
+        if not len(self._keys):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        block_bits = keys & ~_DAY_MASK
+        tol = self.date_tolerance_days
+        low = block_bits | np.maximum(day - tol, 0).astype(np.uint64)
+        high = block_bits | np.minimum(day + tol, int(_DAY_MASK)).astype(np.uint64)
+        lo = np.searchsorted(self._keys, low, side="left")
+        hi = np.searchsorted(self._keys, high, side="right")
+        counts = hi - lo
+        rows = np.repeat(np.arange(len(keys)), counts)
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        positions = starts + np.arange(len(rows))
+        match = self._amount_match(amounts[rows], self._amounts[positions])
+        return rows[match], positions[match]
+
+    def add(self, df: pd.DataFrame, update: bool = True) -> DuplicateMatches:
+        """
+        Match ``df``'s claims (block columns, ``admission_date``,
+        ``claim_amount``) against the index and each other, in arrival order,
+        and insert them. With ``update=False`` the index is left unchanged.
+        """
+        n = len(df)
+        keys, day, has_key = _block_keys(df)
+        amounts = df["claim_amount"].to_numpy(dtype=float, na_value=np.nan)
+        has_key &= ~np.isnan(amounts)
+        rows = np.flatnonzero(has_key)
+        keys, day, amounts = keys[rows], day[rows], amounts[rows]
+        m = len(rows)
+
+        within_a, within_b = self._batch_pairs(keys, day, amounts)
+        cross_rows, cross_pos = self._index_pairs(keys, day, amounts)
+        touched, cross_nodes = np.unique(self._clusters[cross_pos], return_inverse=True)
+
+        # Graph over batch rows and the existing clusters they touch
+        n_nodes = m + len(touched)
+        edges_a = np.concatenate([within_a, cross_rows])
+        edges_b = np.concatenate([within_b, m + cross_nodes.reshape(-1)])
+        graph = coo_matrix((np.ones(len(edges_a), dtype=np.int8), (edges_a, edges_b)), shape=(n_nodes, n_nodes))
+        n_components, component = connected_components(graph, directed=False)
+
+        arrival = self.n_claims + rows
+        # Component id: its oldest existing cluster, else its first batch claim
+        node_ids = np.concatenate([arrival, touched])
+        first = np.full(n_components, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, component, node_ids)
+        size = np.bincount(component, minlength=n_components)
+
+        row_component = component[:m]
+        row_cluster = first[row_component]
+        cluster_id = np.full(n, -1, dtype=np.int64)
+        rule_duplicate = np.zeros(n, dtype=bool)
+        cluster_id[rows] = np.where(size[row_component] > 1, row_cluster, -1)
+        rule_duplicate[rows] = row_cluster < arrival
+
+        if update:
+            if len(touched):
+                # Clusters joined through this batch take the oldest id
+                merged = first[component[m:]]
+                relabel = merged != touched
+                if relabel.any():
+                    lookup = pd.Series(merged[relabel], index=touched[relabel])
+                    hit = np.isin(self._clusters, touched[relabel])
+                    self._clusters[hit] = lookup.reindex(self._clusters[hit]).to_numpy()
+            order = np.argsort(keys, kind="stable")
+            at = np.searchsorted(self._keys, keys[order], side="right")
+            self._keys = np.insert(self._keys, at, keys[order])
+            self._amounts = np.insert(self._amounts, at, amounts[order])
+            self._clusters = np.insert(self._clusters, at, row_cluster[order])
+            self.n_claims += n
+        return DuplicateMatches(rule_duplicate=rule_duplicate, cluster_id=cluster_id)
+
+    def match(self, df: pd.DataFrame) -> DuplicateMatches:
+        """
+        Duplicates of ``df``'s claims among the indexed claims and the batch
+        itself, without inserting them.
+        """
+        return self.add(df, update=False)
+
+
+def flag_duplicates(
+    df: pd.DataFrame,
+    index: Optional[DuplicateIndex] = None,
+    update: bool = True,
+    fold_into_rule_flag: Optional[bool] = None,
+) -> pd.DataFrame:
+    """
+    Add ``rule_duplicate`` and ``duplicate_cluster_id``, matching the claims
+    against ``index`` (a new one over ``df`` alone by default). With
+    ``fold_into_rule_flag`` (default ``DUPLICATES_IN_RULE_FLAG``) the rule is
+    also ORed into ``any_rule_flag`` when present.
+    """
+    if fold_into_rule_flag is None:
+        fold_into_rule_flag = DUPLICATES_IN_RULE_FLAG
+    index = index if index is not None else DuplicateIndex()
+    matches = index.add(df, update=update)
+    df = df.copy()
+    df["rule_duplicate"] = matches.rule_duplicate
+    df["duplicate_cluster_id"] = matches.cluster_id
+    if fold_into_rule_flag and "any_rule_flag" in df.columns:
+        df["any_rule_flag"] = df["any_rule_flag"].to_numpy(dtype=bool) | matches.rule_duplicate
+    return df
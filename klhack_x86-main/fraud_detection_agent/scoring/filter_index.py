@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+FILTER_COLUMNS = ["hospital_type", "state", "district"]
+
+# Filter values meaning "no filter" (the API's defaults)
+_NO_FILTER = (None, "", "All")
+
+
+class FilterIndex:
+    """
+    Row positions of a frame per value of ``FILTER_COLUMNS``, and its rows
+    ranked by ``risk_score``, built once per pipeline build.
+
+    ``positions(state=..., district=..., hospital_type=...)`` returns the
+    matching rows (ascending) in time proportional to the smallest selected
+    group rather than the frame; ``top(k, ...)`` returns the k riskiest of
+    them, in ``sort_values("risk_score", ascending=False, kind="stable")``
+    order (ties by row order), without sorting. With ``suspicious`` given, ``top_suspicious`` does the same over
+    the suspicious rows, walking a precomputed order when unfiltered.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        columns: list = FILTER_COLUMNS,
+        suspicious: Optional[np.ndarray] = None,
+    ) -> None:
+        self.n_rows = len(df)
+        self._codes: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, Dict[str, int]] = {}
+        self._groups: Dict[str, list] = {}
+        for column in columns:
+            if column not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[column])
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._codes[column] = codes
+            self._values[column] = {str(value): i for i, value in enumerate(uniques)}
+            self._groups[column] = [order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))]
+
+        self.risk_rank = None
+        if "risk_score" in df.columns:
+            risk = df["risk_score"].to_numpy(dtype=float, na_value=np.nan)
+            # Stable descending order with NaN last, as sort_values(ascending=False)
+            order = np.argsort(-risk, kind="stable")
+            self.risk_rank = np.empty(len(order), dtype=np.int64)
+            self.risk_rank[order] = np.arange(len(order))
+
+        self.suspicious = None
+        self.suspicious_order = None
+        if suspicious is not None:
+            self.suspicious = np.asarray(suspicious, dtype=bool)
+            if self.risk_rank is not None:
+                ranked = np.flatnonzero(self.suspicious)
+                self.suspicious_order = ranked[np.argsort(self.risk_rank[ranked])]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = list(self._codes.values())
+        arrays += [a for a in (self.risk_rank, self.suspicious, self.suspicious_order) if a is not None]
+        return sum(a.nbytes for a in arrays) + sum(a.nbytes for g in self._groups.values() for a in g)
+
+    def _active(self, filters: Dict[str, Optional[str]]) -> Optional[list]:
+        """
+        ``[(column, code)]`` of the real filters, or None when a filter value
+        does not occur (nothing matches).
+        """
+        active = []
+        for column, value in filters.items():
+            if value in _NO_FILTER:
+                continue
+            code = self._values[column].get(str(value))
+            if code is None:
+                return None
+            active.append((column, code))
+        return active
+
+    def is_filtered(self, **filters: Optional[str]) -> bool:
+        return any(value not in _NO_FILTER for value in filters.values())
+
+    def positions(self, **filters: Optional[str]) -> np.ndarray:
+        """
+        Ascending positions of the rows matching every filter ("All" / None
+        / "" means no filter on that column).
+        """
+        active = self._active(filters)
+        if active is None:
+            return np.empty(0, dtype=np.int64)
+        if not active:
+            return np.arange(self.n_rows)
+        groups = sorted(((self._groups[c][code], c, code) for c, code in active), key=lambda g: len(g[0]))
+        rows = groups[0][0]
+        for _, column, code in groups[1:]:
+            rows = rows[self._codes[column][rows] == code]
+        return rows
+
+    def select(self, df: pd.DataFrame, **filters: Optional[str]) -> pd.DataFrame:
+        """
+        The matching rows of ``df`` (the indexed frame); ``df`` itself when
+        nothing is filtered.
+        """
+        if not self.is_filtered(**filters):
+            return df
+        return df.take(self.positions(**filters))
+
+    def top(self, k: int, rows: np.ndarray) -> np.ndarray:
+        """
+        The (at most) ``k`` riskiest of ``rows``, riskiest first.
+        """
+        if k < 0:
+            raise ValueError(f"k must be non-negative, got {k}")
+        if len(rows) > k:
+            rows = rows[np.argpartition(self.risk_rank[rows], k - 1)[:k]] if k > 0 else rows[:0]
+        return rows[np.argsort(self.risk_rank[rows])]
+
+    def top_suspicious(self, k: int, **filters: Optional[str]) -> np.ndarray:
+        """
+        Positions of the ``k`` riskiest suspicious rows matching the filters.
+        """
+        if k < 0:
+            raise ValueError(f"k must be non-negative, got {k}")
+        if not self.is_filtered(**filters):
+            return self.suspicious_order[:k]
+        rows = self.positions(**filters)
+        return self.top(k, rows[self.suspicious[rows]])
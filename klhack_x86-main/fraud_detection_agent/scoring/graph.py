@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix, triu
+from scipy.sparse.csgraph import connected_components
+
+
+# A hospital pair is linked when it shares at least GRAPH_MIN_SHARED patients
+# and GRAPH_MIN_LIFT times as many as independent patient choices would give
+# (shared * n_patients / (patients_i * patients_j)). Linked components of at
+# least GRAPH_MIN_RING_SIZE hospitals with at least GRAPH_MIN_DENSITY of
+# their possible links are reported as collusion rings.
+GRAPH_MIN_SHARED = int(os.getenv("GRAPH_MIN_SHARED", "10"))
+GRAPH_MIN_LIFT = float(os.getenv("GRAPH_MIN_LIFT", "2.0"))
+GRAPH_MIN_RING_SIZE = int(os.getenv("GRAPH_MIN_RING_SIZE", "3"))
+GRAPH_MIN_DENSITY = float(os.getenv("GRAPH_MIN_DENSITY", "0.5"))
+
+GRAPH_FEATURE_COLUMNS = [
+    "shared_patient_ratio",
+    "copatient_links",
+    "max_copatient_lift",
+    "collusion_ring_id",
+    "collusion_ring_size",
+    "collusion_ring_density",
+]
+
+_INCIDENCE_QUERY = """
+    SELECT patient_id, hospital_id, COUNT(*) AS n_claims
+    FROM claims
+    WHERE patient_id IS NOT NULL AND hospital_id IS NOT NULL
+    GROUP BY patient_id, hospital_id
+"""
+
+
+@dataclass
+class PatientHospitalGraph:
+    """
+    Sparse patient x hospital incidence (CSR, claim counts); column ``j`` is
+    ``hospital_ids[j]``. Memory grows with the distinct patient-hospital
+    pairs, not with patients x hospitals.
+    """
+
+    incidence: csr_matrix
+    hospital_ids: np.ndarray
+
+    @property
+    def n_patients(self) -> int:
+        return self.incidence.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        m = self.incidence
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+
+
+def build_incidence(patient_ids, hospital_ids, counts=None) -> PatientHospitalGraph:
+    """
+    Incidence matrix from parallel patient / hospital arrays (one entry per
+    claim, or per pair with ``counts``); repeated pairs are summed.
+    """
+    patient_codes, _ = pd.factorize(np.asarray(patient_ids, dtype=object))
+    hospital_codes, hospitals = pd.factorize(np.asarray(hospital_ids, dtype=object), sort=True)
+    keep = (patient_codes >= 0) & (hospital_codes >= 0)
+    weights = np.ones(len(patient_codes)) if counts is None else np.asarray(counts, dtype=float)
+    matrix = coo_matrix(
+        (weights[keep], (patient_codes[keep], hospital_codes[keep])),
+        shape=(int(patient_codes.max()) + 1 if len(patient_codes) else 0, len(hospitals)),
+    ).tocsr()
+    return PatientHospitalGraph(incidence=matrix, hospital_ids=np.asarray(hospitals, dtype=object))
+
+
+def incidence_from_claims(df: pd.DataFrame) -> PatientHospitalGraph:
+    return build_incidence(df["patient_id"], df["hospital_id"])
+
+
+def load_incidence(conn: sqlite3.Connection) -> PatientHospitalGraph:
+    """
+    Incidence of the ``claims`` table, aggregated to patient-hospital pairs
+    by SQLite so claim rows are never loaded.
+    """
+    pairs = pd.read_sql_query(_INCIDENCE_QUERY, conn)
+    return build_incidence(pairs["patient_id"], pairs["hospital_id"], pairs["n_claims"])
+
+
+def copatient_matrix(graph: PatientHospitalGraph) -> csr_matrix:
+    """
+    Hospital x hospital counts of shared patients (``B.T @ B`` on the binary
+    incidence); the diagonal holds each hospital's distinct patients.
+    """
+    binary = graph.incidence.copy()
+    binary.data = np.ones_like(binary.data)
+    return (binary.T @ binary).tocsr()
+
+
+def hospital_graph_features(
+    graph: PatientHospitalGraph,
+    min_shared: int = GRAPH_MIN_SHARED,
+    min_lift: float = GRAPH_MIN_LIFT,
+    min_ring_size: int = GRAPH_MIN_RING_SIZE,
+    min_density: float = GRAPH_MIN_DENSITY,
+) -> pd.DataFrame:
+    """
+    Per-hospital co-patient features (``GRAPH_FEATURE_COLUMNS``, one row per
+    ``graph.hospital_ids``): the share of its patients who also claimed
+    elsewhere, its links and strongest lift, and the collusion ring it
+    belongs to (-1 for none). Everything stays sparse.
+    """
+    n_hospitals = len(graph.hospital_ids)
+    shared = copatient_matrix(graph)
+    patients_per_hospital = shared.diagonal()
+
+    # Patients claiming at more than one hospital, counted per hospital
+    binary = graph.incidence.copy()
+    binary.data = np.ones_like(binary.data)
+    multi_hospital = (np.diff(binary.indptr) > 1).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shared_ratio = np.nan_to_num((binary.T @ multi_hospital) / patients_per_hospital)
+
+    pairs = triu(shared, k=1).tocoo()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lift = pairs.data * graph.n_patients / (patients_per_hospital[pairs.row] * patients_per_hospital[pairs.col])
+    strong = pairs.data >= min_shared
+    linked = strong & (lift >= min_lift)
+    rows, cols = pairs.row[linked], pairs.col[linked]
+
+    max_lift = np.zeros(n_hospitals)
+    np.maximum.at(max_lift, pairs.row[strong], lift[strong])
+    np.maximum.at(max_lift, pairs.col[strong], lift[strong])
+    links = np.bincount(rows, minlength=n_hospitals) + np.bincount(cols, minlength=n_hospitals)
+
+    edges = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_hospitals, n_hospitals))
+    _, component = connected_components(edges, directed=False)
+    size = np.bincount(component)
+    edge_count = np.bincount(component[rows], minlength=len(size))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        density = np.nan_to_num(edge_count / (size * (size - 1) / 2))
+    is_ring = (size >= min_ring_size) & (density >= min_density)
+    ring_ids = np.full(len(size), -1, dtype=np.int64)
+    ring_ids[is_ring] = np.arange(int(is_ring.sum()))
+
+    in_ring = is_ring[component]
+    return pd.DataFrame(
+        {
+            "hospital_id": graph.hospital_ids,
+            "shared_patient_ratio": shared_ratio,
+            "copatient_links": links.astype(np.int64),
+            "max_copatient_lift": max_lift,
+            "collusion_ring_id": ring_ids[component],
+            "collusion_ring_size": np.where(in_ring, size[component], 0).astype(np.int64),
+            "collusion_ring_density": np.where(in_ring, density[component], 0.0),
+        }
+    )
@@ -0,0 +1,609 @@
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.database.db_setup import (
+    CLAIMS_META_TABLE,
+    get_claims_version,
+    get_db_connection,
+)
+from fraud_detection_agent.database.pool import CONNECTION_PRAGMAS
+from fraud_detection_agent.models.anomaly_model import AnomalyDetector
+from fraud_detection_agent.models.registry import ModelRegistry, fit_or_load
+from fraud_detection_agent.preprocessing.feature_store import update_feature_store
+from fraud_detection_agent.preprocessing.preprocess import TARGET_FEATURE_COLUMNS
+from fraud_detection_agent.scoring.batch_scoring import ANOMALY_LABEL_THRESHOLD, ClaimScorer
+from fraud_detection_agent.scoring.risk_scoring import (
+    HOSPITAL_KEYS,
+    RiskComponents,
+    RiskConfig,
+    RiskReference,
+    _scale_with_bounds,
+)
+
+
+# Out-of-core pipeline: claims are streamed from SQLite in chunks and the
+# flagged results are written back to ``claim_results`` / ``hospital_results``
+# instead of being held as DataFrames. Python memory is bounded by the chunk
+# size and the model's training sample, not by the number of claims.
+RESULTS_TABLE = "claim_results"
+HOSPITAL_RESULTS_TABLE = "hospital_results"
+RESULTS_VIEW = "claim_results_view"
+_RESULTS_VERSION_KEY = "results_version"
+# JSON with the registry fingerprint of the fitted model, the claim amount
+# bounds and the risk reference, to score new claims against the results
+_RESULTS_SCORER_KEY = "results_scorer"
+
+_RESULTS_DDL = f"""
+    CREATE TABLE {RESULTS_TABLE} (
+        claim_key INTEGER PRIMARY KEY,
+        anomaly_score REAL NOT NULL,
+        anomaly_label INTEGER NOT NULL,
+        procedure_cost_deviation REAL NOT NULL,
+        claim_frequency_per_month INTEGER NOT NULL,
+        rule_upcoding INTEGER NOT NULL,
+        rule_ghost_billing INTEGER NOT NULL,
+        rule_claim_surge INTEGER NOT NULL,
+        any_rule_flag INTEGER NOT NULL,
+        risk_score REAL,
+        risk_category TEXT
+    )
+"""
+
+# Claim-level rows in the layout the API returns: raw claim columns, the
+# main features, model score, risk and rule flags.
+_RESULTS_VIEW_DDL = f"""
+    CREATE VIEW {RESULTS_VIEW} AS
+    SELECT
+        f.claim_id AS claim_id,
+        h.hospital_id AS hospital_id,
+        h.hospital_name AS hospital_name,
+        f.patient_id AS patient_id,
+        p.procedure_code AS procedure_code,
+        f.claim_amount AS claim_amount,
+        date(f.admission_day * 86400, 'unixepoch') AS admission_date,
+        date(f.discharge_day * 86400, 'unixepoch') AS discharge_date,
+        f.length_of_stay AS length_of_stay,
+        d.district AS district,
+        d.state AS state,
+        h.hospital_type AS hospital_type,
+        printf('%04d-%02d', f.admission_month / 100, f.admission_month % 100) AS month,
+        r.claim_frequency_per_month AS claim_frequency_per_month,
+        r.procedure_cost_deviation AS procedure_cost_deviation,
+        r.anomaly_score AS anomaly_score,
+        r.anomaly_label AS anomaly_label,
+        r.risk_score AS risk_score,
+        r.risk_category AS risk_category,
+        r.rule_upcoding AS rule_upcoding,
+        r.rule_ghost_billing AS rule_ghost_billing,
+        r.rule_claim_surge AS rule_claim_surge,
+        r.any_rule_flag AS any_rule_flag
+    FROM {RESULTS_TABLE} AS r
+    JOIN claim_facts AS f ON f.claim_key = r.claim_key
+    JOIN hospitals AS h ON h.hospital_key = f.hospital_key
+    JOIN districts AS d ON d.district_key = f.district_key
+    JOIN procedures AS p ON p.procedure_key = f.procedure_key
+"""
+
+# Model inputs per claim, read from the feature store (claim_amount is
+# normalized on the Python side with the global min/max).
+_FEATURE_CHUNK_QUERY = """
+    SELECT
+        f.claim_key,
+        f.claim_amount,
+        f.length_of_stay,
+        h.amount_sum / h.claim_count AS avg_claim_per_hospital,
+        c.claim_frequency_per_month,
+        c.procedure_cost_deviation,
+        c.patient_repeat_ratio
+    FROM claim_facts AS f
+    JOIN fs_claim_features AS c ON c.claim_key = f.claim_key
+    JOIN fs_hospital AS h ON h.hospital_key = f.hospital_key
+    ORDER BY f.claim_key
+"""
+
+# Same rules as apply_rule_based_flags, evaluated against the stored group
+# aggregates (surge: hospital-month count > 2.5x the hospital's mean month).
+_INSERT_RESULTS_SQL = f"""
+    INSERT INTO {RESULTS_TABLE} (
+        claim_key, anomaly_score, anomaly_label, procedure_cost_deviation, claim_frequency_per_month,
+        rule_upcoding, rule_ghost_billing, rule_claim_surge, any_rule_flag
+    )
+    SELECT
+        s.claim_key,
+        s.anomaly_score,
+        s.anomaly_score > {ANOMALY_LABEL_THRESHOLD},
+        c.procedure_cost_deviation,
+        c.claim_frequency_per_month,
+        f.claim_amount > 2.0 * c.district_proc_avg_cost,
+        c.patient_claim_count_hosp_month > 3,
+        hm.claim_count > 2.5 * ha.avg_monthly_claims,
+        f.claim_amount > 2.0 * c.district_proc_avg_cost
+            OR c.patient_claim_count_hosp_month > 3
+            OR hm.claim_count > 2.5 * ha.avg_monthly_claims
+    FROM temp.ooc_scores AS s
+    JOIN claim_facts AS f ON f.claim_key = s.claim_key
+    JOIN fs_claim_features AS c ON c.claim_key = s.claim_key
+    JOIN fs_hospital_month AS hm
+      ON hm.hospital_key = f.hospital_key AND hm.admission_month = f.admission_month
+    JOIN (
+        SELECT hospital_key, avg(claim_count) AS avg_monthly_claims
+        FROM fs_hospital_month GROUP BY hospital_key
+    ) AS ha ON ha.hospital_key = f.hospital_key
+    ORDER BY s.claim_key
+"""
+
+_HOSPITAL_AGG_QUERY = f"""
+    SELECT
+        h.hospital_id,
+        h.hospital_name,
+        d.state,
+        d.district,
+        h.hospital_type,
+        count(*) AS total_claims,
+        avg(r.risk_score) AS avg_risk_score,
+        sum(r.risk_category = 'High') AS high_risk_claims,
+        sum(r.anomaly_label = 1) AS suspicious_claims,
+        sum(r.any_rule_flag) AS any_rule_flags
+    FROM {RESULTS_TABLE} AS r
+    JOIN claim_facts AS f ON f.claim_key = r.claim_key
+    JOIN hospitals AS h ON h.hospital_key = f.hospital_key
+    JOIN districts AS d ON d.district_key = f.district_key
+    GROUP BY h.hospital_id, h.hospital_name, d.state, d.district, h.hospital_type
+    ORDER BY h.hospital_id, h.hospital_name, d.state, d.district, h.hospital_type
+"""
+
+
+def _connect(db_path: Optional[Path | str]) -> sqlite3.Connection:
+    if db_path is None:
+        return get_db_connection()
+    conn = sqlite3.connect(db_path)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _iter_feature_chunks(
+    conn: sqlite3.Connection,
+    amount_scaler: MinMaxScaler,
+    chunk_size: int,
+) -> Iterator[tuple]:
+    """
+    Yield (claim_keys, feature matrix) per chunk, columns in TARGET_FEATURE_COLUMNS order.
+    """
+    for chunk in pd.read_sql_query(_FEATURE_CHUNK_QUERY, conn, chunksize=chunk_size):
+        chunk["claim_amount_norm"] = amount_scaler.transform(chunk[["claim_amount"]].to_numpy(dtype=float)).ravel()
+        yield chunk["claim_key"].to_numpy(), chunk[TARGET_FEATURE_COLUMNS].fillna(0.0).to_numpy(dtype=float)
+
+
+def _reservoir_sample(chunks: Iterator[tuple], sample_size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Uniform sample without replacement over a stream of chunks: every row gets
+    a random priority and the ``sample_size`` smallest priorities are kept.
+    """
+    sample = np.empty((0, len(TARGET_FEATURE_COLUMNS)))
+    priorities = np.empty(0)
+    for _, X in chunks:
+        sample = np.vstack([sample, X])
+        priorities = np.concatenate([priorities, rng.random(len(X))])
+        if len(priorities) > sample_size:
+            keep = np.sort(np.argpartition(priorities, sample_size)[:sample_size])
+            sample, priorities = sample[keep], priorities[keep]
+    return sample
+
+
+def _quantile(conn: sqlite3.Connection, q: float, n_rows: int) -> float:
+    """
+    Linear-interpolated quantile of ``risk_score`` (pandas' default), read via
+    the risk index instead of loading the column.
+    """
+    position = q * (n_rows - 1)
+    lower = int(math.floor(position))
+    values = [
+        row[0]
+        for row in conn.execute(
+            f"SELECT risk_score FROM {RESULTS_TABLE} ORDER BY risk_score LIMIT 2 OFFSET ?", (lower,)
+        ).fetchall()
+    ]
+    if len(values) == 1:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * (position - lower)
+
+
+def _score_range(conn: sqlite3.Connection, column: str) -> tuple:
+    low, high = conn.execute(f"SELECT min({column}), max({column}) FROM {RESULTS_TABLE}").fetchone()
+    if high is None:
+        return 0.0, 0.0
+    return float(low), float(high)
+
+
+def _scaled_sql(column: str, bounds: tuple) -> str:
+    # MinMax scaling as in risk_scoring._minmax; a constant column scales to 0
+    low, high = bounds
+    if high == low:
+        return "0.0"
+    return f"(({column} - {low!r}) / {float(high - low)!r})"
+
+
+def _write_results_version(conn: sqlite3.Connection, version: str, scorer_meta: Dict[str, Any]) -> None:
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {CLAIMS_META_TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    )
+    with conn:
+        conn.executemany(
+            f"""
+            INSERT INTO {CLAIMS_META_TABLE} (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """,
+            [(_RESULTS_VERSION_KEY, version), (_RESULTS_SCORER_KEY, json.dumps(scorer_meta))],
+        )
+
+
+def load_results_scorer(
+    conn: sqlite3.Connection,
+    registry: Optional[ModelRegistry] = None,
+) -> Optional[ClaimScorer]:
+    """
+    Rebuild the ``ClaimScorer`` of the last out-of-core run from the recorded
+    model fingerprint and reference. None if there is no record or the model
+    was pruned from the registry.
+    """
+    try:
+        row = conn.execute(
+            f"SELECT value FROM {CLAIMS_META_TABLE} WHERE key = ?", (_RESULTS_SCORER_KEY,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None:
+        return None
+    meta = json.loads(row[0])
+    entry = (registry or ModelRegistry()).load(meta["fingerprint"])
+    if entry is None:
+        return None
+    amount_scaler = MinMaxScaler().fit(np.array(meta["claim_amount_bounds"], dtype=float).reshape(-1, 1))
+    reference = meta["risk_reference"]
+    return ClaimScorer(
+        detector=entry.detector,
+        scaler_claim_amount=amount_scaler,
+        risk_reference=RiskReference(
+            anomaly_bounds=tuple(reference["anomaly_bounds"]),
+            proc_dev_bounds=tuple(reference["proc_dev_bounds"]),
+            claim_freq_bounds=tuple(reference["claim_freq_bounds"]),
+            q_low=reference["q_low"],
+            q_med=reference["q_med"],
+        ),
+    )
+
+
+def results_are_current(conn: sqlite3.Connection) -> bool:
+    """
+    True when the results tables were built from the current claims data.
+    """
+    try:
+        row = conn.execute(
+            f"SELECT value FROM {CLAIMS_META_TABLE} WHERE key = ?", (_RESULTS_VERSION_KEY,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return False
+    return row is not None and row[0] == get_claims_version(conn)
+
+
+def run_out_of_core_pipeline(
+    chunk_size: int = 100_000,
+    sample_size: int = 50_000,
+    config: RiskConfig | None = None,
+    random_state: int = 42,
+    db_path: Optional[Path | str] = None,
+    registry: Optional[ModelRegistry] = None,
+) -> Dict[str, Any]:
+    """
+    Score every claim without materializing the claims table.
+
+    1. Accumulate: fold claims into the feature store's running group
+       aggregates inside SQLite (see feature_store.py).
+    2. Sample: stream feature chunks and keep a reservoir sample of
+       ``sample_size`` rows; fit the IsolationForest + LOF on it (the score
+       scaling is frozen on the sample, see ``AnomalyDetector.score``).
+    3. Apply: stream the chunks again, score them, and write scores, rule
+       flags and risk scores to ``claim_results``; hospital aggregates go to
+       ``hospital_results``.
+
+    Scores match ``run_full_pipeline`` in construction (same features, rules
+    and risk formula) but come from a model fitted on the sample. The model
+    goes through the registry and is recorded with the results, so
+    ``load_results_scorer`` can score new claims later. Returns run
+    statistics and the ``ClaimScorer``.
+    """
+    config = config or RiskConfig()
+    timings: Dict[str, float] = {}
+    conn = _connect(db_path)
+    reader = _connect(db_path)
+    # Temp tables and sorts here are O(claims); spill them to disk rather
+    # than the pool's in-memory default.
+    conn.execute("PRAGMA temp_store=FILE")
+    try:
+        start = time.perf_counter()
+        update_feature_store(conn)
+        version = get_claims_version(conn)
+        low, high = conn.execute("SELECT min(claim_amount), max(claim_amount) FROM claim_facts").fetchone()
+        amount_scaler = MinMaxScaler().fit(np.array([[low], [high]], dtype=float))
+        timings["accumulate"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rng = np.random.default_rng(random_state)
+        sample = _reservoir_sample(_iter_feature_chunks(reader, amount_scaler, chunk_size), sample_size, rng)
+        detector, _, model_meta = fit_or_load(
+            pd.DataFrame(sample, columns=TARGET_FEATURE_COLUMNS),
+            registry=registry,
+            detector=AnomalyDetector(random_state=random_state),
+        )
+        timings["fit"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        conn.execute("DROP TABLE IF EXISTS temp.ooc_scores")
+        conn.execute("CREATE TEMP TABLE ooc_scores (claim_key INTEGER PRIMARY KEY, anomaly_score REAL NOT NULL)")
+        n_claims = 0
+        for keys, X in _iter_feature_chunks(reader, amount_scaler, chunk_size):
+            scores = detector.score(X).combined_score
+            with conn:
+                conn.executemany("INSERT INTO temp.ooc_scores VALUES (?, ?)", zip(keys.tolist(), scores.tolist()))
+            n_claims += len(keys)
+        timings["score"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = _write_claim_results(conn, config, n_claims)
+        hospital_risk = _write_hospital_results(conn, config)
+        conn.execute("DROP TABLE temp.ooc_scores")
+        scorer_meta = {
+            "fingerprint": model_meta["fingerprint"],
+            "claim_amount_bounds": [low, high],
+            "risk_reference": asdict(reference),
+        }
+        _write_results_version(conn, version, scorer_meta)
+        timings["write_results"] = time.perf_counter() - start
+    finally:
+        conn.execute("PRAGMA temp_store=MEMORY")
+        reader.close()
+        conn.close()
+
+    return {
+        "version": version,
+        "n_claims": n_claims,
+        "n_hospitals": len(hospital_risk),
+        "sample_size": len(sample),
+        "timings": timings,
+        "hospital_risk": hospital_risk,
+        "scorer": ClaimScorer(detector, amount_scaler, reference, config),
+    }
+
+
+def _write_claim_results(conn: sqlite3.Connection, config: RiskConfig, n_claims: int) -> RiskReference:
+    conn.create_function("pow", 2, math.pow, deterministic=True)
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute(f"DROP VIEW IF EXISTS {RESULTS_VIEW}")
+        conn.execute(f"DROP TABLE IF EXISTS {RESULTS_TABLE}")
+        conn.execute(_RESULTS_DDL)
+        conn.execute(_INSERT_RESULTS_SQL)
+
+        # compute_risk_scores, with the per-column min/max read from the table
+        reference = RiskReference(
+            anomaly_bounds=_score_range(conn, "anomaly_score"),
+            proc_dev_bounds=_score_range(conn, "procedure_cost_deviation"),
+            claim_freq_bounds=_score_range(conn, "claim_frequency_per_month"),
+        )
+        raw = (
+            f"{config.w_anomaly!r} * {_scaled_sql('anomaly_score', reference.anomaly_bounds)}"
+            f" + {config.w_proc_dev!r} * "
+            f"{_scaled_sql('procedure_cost_deviation', reference.proc_dev_bounds)}"
+            f" + {config.w_claim_freq!r} * "
+            f"{_scaled_sql('claim_frequency_per_month', reference.claim_freq_bounds)}"
+        )
+        conn.execute(
+            f"UPDATE {RESULTS_TABLE} SET risk_score = min(max(pow(min(max({raw}, 0.0), 1.0), 0.7) * 100, 0), 100)"
+        )
+        conn.execute(f"CREATE INDEX idx_{RESULTS_TABLE}_risk ON {RESULTS_TABLE} (risk_score)")
+
+        max_score = conn.execute(f"SELECT max(risk_score) FROM {RESULTS_TABLE}").fetchone()[0]
+        if n_claims >= 3 and max_score and max_score > 0:
+            low, med = config.claim_band_quantiles
+            q_low = reference.q_low = _quantile(conn, low, n_claims)
+            q_med = reference.q_med = _quantile(conn, med, n_claims)
+            conn.execute(
+                f"""
+                UPDATE {RESULTS_TABLE} SET risk_category = CASE
+                    WHEN risk_score <= ? THEN 'Low'
+                    WHEN risk_score <= ? THEN 'Medium'
+                    ELSE 'High'
+                END
+                """,
+                (q_low, q_med),
+            )
+        else:
+            conn.execute(f"UPDATE {RESULTS_TABLE} SET risk_category = 'Low'")
+        conn.execute(_RESULTS_VIEW_DDL)
+    conn.execute(f"ANALYZE {RESULTS_TABLE}")
+    return reference
+
+
+def _write_hospital_results(conn: sqlite3.Connection, config: RiskConfig) -> pd.DataFrame:
+    """
+    Aggregate claim results per hospital in SQLite; the audit priority bands
+    (as in aggregate_hospital_risk) are computed on the small result in pandas.
+    """
+    agg = pd.read_sql_query(_HOSPITAL_AGG_QUERY, conn)
+    agg["audit_priority_score"] = (
+        agg["avg_risk_score"] + (agg["any_rule_flags"] / agg["total_claims"]) * 100
+    ).clip(0, 100)
+    scores = agg["audit_priority_score"].fillna(0.0)
+    if len(agg) >= 3 and scores.max() > 0:
+        q_low = scores.quantile(config.hospital_band_quantiles[0])
+        q_med = scores.quantile(config.hospital_band_quantiles[1])
+        agg["risk_category_overall"] = np.select(
+            [scores <= q_low, scores <= q_med], ["Low", "Medium"], default="High"
+        )
+    else:
+        agg["risk_category_overall"] = "Low"
+    agg.to_sql(HOSPITAL_RESULTS_TABLE, conn, if_exists="replace", index=False)
+    return agg
+
+
+_COMPONENTS_QUERY = f"""
+    SELECT f.hospital_key, f.district_key, r.anomaly_score, r.procedure_cost_deviation,
+           r.claim_frequency_per_month, r.anomaly_label, r.any_rule_flag
+    FROM {RESULTS_TABLE} AS r
+    JOIN claim_facts AS f ON f.claim_key = r.claim_key
+    ORDER BY r.claim_key
+"""
+
+# Hospital groups in the order of _HOSPITAL_AGG_QUERY
+_COMPONENT_GROUPS_QUERY = """
+    SELECT g.hospital_key, g.district_key, h.hospital_id, h.hospital_name, d.state, d.district, h.hospital_type
+    FROM (SELECT DISTINCT hospital_key, district_key FROM claim_facts) AS g
+    JOIN hospitals AS h ON h.hospital_key = g.hospital_key
+    JOIN districts AS d ON d.district_key = g.district_key
+    ORDER BY h.hospital_id, h.hospital_name, d.state, d.district, h.hospital_type
+"""
+
+
+def load_risk_components(conn: sqlite3.Connection, reference: RiskReference) -> RiskComponents:
+    """
+    ``RiskComponents`` of the stored results, for re-weighting without the
+    claims frame: the components are rescaled with the results' reference
+    bounds. Holds three float columns and a group code per claim.
+    """
+    claims = pd.read_sql_query(_COMPONENTS_QUERY, conn)
+    groups = pd.read_sql_query(_COMPONENT_GROUPS_QUERY, conn)
+    stride = int(max(groups["district_key"].max(), claims["district_key"].max(), 0)) + 1
+    group_ids = pd.Index(groups["hospital_key"].to_numpy() * stride + groups["district_key"].to_numpy())
+    codes = group_ids.get_indexer(claims["hospital_key"].to_numpy() * stride + claims["district_key"].to_numpy())
+    codes = codes.astype(np.int64)
+    has_key = codes >= 0
+    n_groups = len(groups)
+
+    def group_count(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(codes[has_key], weights=weights[has_key], minlength=n_groups).astype(np.int64)
+
+    hospitals = groups[HOSPITAL_KEYS].copy()
+    hospitals["total_claims"] = np.bincount(codes[has_key], minlength=n_groups)
+    hospitals["suspicious_claims"] = group_count(claims["anomaly_label"].to_numpy() == 1)
+    hospitals["any_rule_flags"] = group_count(claims["any_rule_flag"].to_numpy() != 0)
+    return RiskComponents(
+        anomaly_scaled=_scale_with_bounds(claims["anomaly_score"].to_numpy(dtype=float), reference.anomaly_bounds),
+        proc_dev_scaled=_scale_with_bounds(
+            claims["procedure_cost_deviation"].to_numpy(dtype=float), reference.proc_dev_bounds
+        ),
+        claim_freq_scaled=_scale_with_bounds(
+            claims["claim_frequency_per_month"].to_numpy(dtype=float), reference.claim_freq_bounds
+        ),
+        group_codes=codes,
+        hospitals=hospitals,
+    )
+
+
+def _filters(hospital_type: Optional[str], state: Optional[str], district: Optional[str]) -> tuple:
+    clauses, params = [], []
+    for col, value in (("hospital_type", hospital_type), ("state", state), ("district", district)):
+        if value is not None and value != "All":
+            clauses.append(f"{col} = ?")
+            params.append(value)
+    return clauses, params
+
+
+def query_hospital_results(
+    conn: sqlite3.Connection,
+    hospital_type: Optional[str] = None,
+    state: Optional[str] = "All",
+    district: Optional[str] = "All",
+) -> pd.DataFrame:
+    clauses, params = _filters(hospital_type, state, district)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return pd.read_sql_query(f"SELECT * FROM {HOSPITAL_RESULTS_TABLE}{where}", conn, params=params)
+
+
+def query_claim_results(
+    conn: sqlite3.Connection,
+    hospital_type: Optional[str] = None,
+    state: Optional[str] = "All",
+    district: Optional[str] = "All",
+    suspicious_only: bool = False,
+    search: Optional[str] = None,
+    limit: int = 100,
+) -> pd.DataFrame:
+    """
+    Top ``limit`` claims by risk score matching the filters, read from the
+    results view (walks the risk-score index).
+    """
+    clauses, params = _filters(hospital_type, state, district)
+    if suspicious_only:
+        clauses.append("(anomaly_label = 1 OR any_rule_flag)")
+    if search:
+        clauses.append("(lower(claim_id) LIKE ? OR lower(patient_id) LIKE ?)")
+        params.extend([f"%{search.lower()}%"] * 2)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    df = pd.read_sql_query(
+        f"SELECT * FROM {RESULTS_VIEW}{where} ORDER BY risk_score DESC LIMIT ?",
+        conn,
+        params=params + [limit],
+    )
+    for col in ("rule_upcoding", "rule_ghost_billing", "rule_claim_surge", "any_rule_flag"):
+        df[col] = df[col].astype(bool)
+    return df
+
+
+def summarize_claim_results(
+    conn: sqlite3.Connection,
+    hospital_type: Optional[str] = None,
+    state: Optional[str] = "All",
+    district: Optional[str] = "All",
+) -> Dict[str, Any]:
+    """
+    Claim-level totals, monthly suspicious counts and rule counts computed in
+    SQLite over the results view.
+    """
+    clauses, params = _filters(hospital_type, state, district)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    suspicious = "(anomaly_label = 1 OR any_rule_flag)"
+    totals = conn.execute(
+        f"""
+        SELECT
+            count(*),
+            coalesce(sum({suspicious}), 0),
+            coalesce(sum(CASE WHEN {suspicious} THEN claim_amount ELSE 0 END), 0.0),
+            coalesce(sum(rule_upcoding), 0),
+            coalesce(sum(rule_ghost_billing), 0),
+            coalesce(sum(rule_claim_surge), 0),
+            coalesce(sum(anomaly_label), 0),
+            coalesce(sum(any_rule_flag), 0)
+        FROM {RESULTS_VIEW}{where}
+        """,
+        params,
+    ).fetchone()
+    monthly = pd.read_sql_query(
+        f"SELECT month, sum({suspicious}) AS is_suspicious FROM {RESULTS_VIEW}{where} GROUP BY month ORDER BY month",
+        conn,
+        params=params,
+    )
+    return {
+        "total_claims": int(totals[0]),
+        "suspicious_claims": int(totals[1]),
+        "total_fraud_amount": float(totals[2]),
+        "rule_flagged_claims": int(totals[7]),
+        "rule_counts": {
+            "Up-coding": int(totals[3]),
+            "Ghost Billing": int(totals[4]),
+            "Claim Surge": int(totals[5]),
+            "ML Anomalies": int(totals[6]),
+        },
+        "monthly": monthly.to_dict(orient="records"),
+    }
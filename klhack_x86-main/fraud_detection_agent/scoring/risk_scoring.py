@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+
+from fraud_detection_agent.scoring.rules import RuleReport, get_rule_engine, hospital_monthly_operands
+
+
+RISK_CATEGORIES = ["Low", "Medium", "High"]
 
 
 @dataclass
@@ -12,153 +17,410 @@ class RiskConfig:
     w_anomaly: float = 0.5
     w_proc_dev: float = 0.3
     w_claim_freq: float = 0.2
+    # Low/Medium and Medium/High cut-offs, as quantiles of the claim risk
+    # scores (~50% Low, ~35% Medium, ~15% High) and of the hospitals' audit
+    # priority scores (q80 rather than q85 for more 'High' visibility)
+    claim_band_quantiles: Tuple[float, float] = (0.5, 0.85)
+    hospital_band_quantiles: Tuple[float, float] = (0.5, 0.8)
+
+
+@dataclass
+class RiskReference:
+    """
+    Scaling bounds and risk band cut-offs frozen from a scored population, so
+    claims scored later land on the same scale (see ``build_risk_reference``).
+    ``q_low``/``q_med`` are None when the population put every claim in Low.
+    """
+
+    anomaly_bounds: Tuple[float, float]
+    proc_dev_bounds: Tuple[float, float]
+    claim_freq_bounds: Tuple[float, float]
+    q_low: Optional[float] = None
+    q_med: Optional[float] = None
+
+
+def _minmax(values: np.ndarray) -> np.ndarray:
+    # MinMaxScaler's arithmetic (x * scale_ + min_), so results match it bit for bit;
+    # a constant column scales to 0
+    if len(values) <= 1:
+        return np.zeros(len(values))
+    low, high = values.min(), values.max()
+    scale = 1.0 / (high - low) if high > low else 1.0
+    return values * scale + (0.0 - low * scale)
+
 
+def _series_bounds(series: pd.Series) -> Tuple[float, float]:
+    values = series.fillna(0.0).to_numpy(dtype=float)
+    if len(values) == 0:
+        return 0.0, 0.0
+    return float(values.min()), float(values.max())
 
-def _scale_series(series: pd.Series) -> pd.Series:
-    scaler = MinMaxScaler()
-    reshaped = series.fillna(0.0).to_numpy(dtype=float).reshape(-1, 1)
-    if reshaped.shape[0] <= 1:
-        return pd.Series(np.zeros_like(reshaped.squeeze()), index=series.index)
-    scaled = scaler.fit_transform(reshaped).squeeze()
-    return pd.Series(scaled, index=series.index)
+
+def _scale_with_bounds(values: np.ndarray, bounds: Tuple[float, float]) -> np.ndarray:
+    # Same MinMax scaling as _minmax with frozen bounds; values outside
+    # the reference range are clipped and a constant reference scales to 0
+    low, high = bounds
+    if high <= low:
+        return np.zeros(len(values))
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def _band_codes(scores: np.ndarray, q_low: float, q_med: float) -> np.ndarray:
+    """
+    0/1/2 (Low/Medium/High) for ``score <= q_low``, ``<= q_med`` and above.
+    """
+    return np.digitize(scores, [q_low, q_med], right=True).astype(np.int8)
+
+
+def _bands(codes: np.ndarray | None, n_rows: int) -> pd.Categorical:
+    if codes is None:
+        codes = np.zeros(n_rows, dtype=np.int8)
+    return pd.Categorical.from_codes(codes, categories=RISK_CATEGORIES)
+
+
+def risk_score_kernel(
+    anomaly: np.ndarray,
+    proc_dev: np.ndarray,
+    claim_freq: np.ndarray,
+    config: RiskConfig,
+    reference: RiskReference | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Columnar core of ``compute_risk_scores`` on plain float arrays (NaN
+    already filled): scaled components, raw and final risk score, and the
+    band codes (``None`` when every claim is Low).
+    """
+    if reference is None:
+        anomaly_scaled = _minmax(anomaly)
+        proc_dev_scaled = _minmax(proc_dev)
+        claim_freq_scaled = _minmax(claim_freq)
+    else:
+        anomaly_scaled = _scale_with_bounds(anomaly, reference.anomaly_bounds)
+        proc_dev_scaled = _scale_with_bounds(proc_dev, reference.proc_dev_bounds)
+        claim_freq_scaled = _scale_with_bounds(claim_freq, reference.claim_freq_bounds)
+
+    return {
+        "anomaly_score_scaled": anomaly_scaled,
+        "procedure_cost_deviation_scaled": proc_dev_scaled,
+        "claim_frequency_scaled": claim_freq_scaled,
+        **weighted_risk(anomaly_scaled, proc_dev_scaled, claim_freq_scaled, config, reference),
+    }
+
+
+def weighted_risk(
+    anomaly_scaled: np.ndarray,
+    proc_dev_scaled: np.ndarray,
+    claim_freq_scaled: np.ndarray,
+    config: RiskConfig,
+    reference: RiskReference | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Risk score and band codes from the already scaled components; the part
+    of ``risk_score_kernel`` that depends on the weights and band quantiles.
+    """
+    raw = (
+        config.w_anomaly * anomaly_scaled
+        + config.w_proc_dev * proc_dev_scaled
+        + config.w_claim_freq * claim_freq_scaled
+    )
+    # Non-linear scaling to push clearly anomalous cases higher, closer to real-world audit needs
+    risk = np.clip(np.clip(raw, 0, 1) ** 0.7 * 100, 0, 100)
+
+    # Derive per-claim risk bands from the empirical distribution so that
+    # Low / Medium / High are always represented in a realistic proportion.
+    scores = np.nan_to_num(risk, nan=0.0)
+    if reference is not None:
+        q_low, q_med = reference.q_low, reference.q_med
+    elif len(scores) >= 3 and scores.max() > 0:
+        q_low, q_med = np.quantile(scores, config.claim_band_quantiles)
+    else:
+        q_low = q_med = None
+
+    return {
+        "risk_score_raw": raw,
+        "risk_score": risk,
+        "band_codes": _band_codes(scores, q_low, q_med) if q_low is not None else None,
+    }
 
 
 def compute_risk_scores(
     df: pd.DataFrame,
     anomaly_scores: np.ndarray,
     config: RiskConfig | None = None,
+    reference: RiskReference | None = None,
 ) -> pd.DataFrame:
     """
     Compute per-claim risk score and category based on anomaly scores and engineered features.
+
+    By default each input is MinMax-scaled over ``df`` and the risk bands are
+    quantiles of ``df``'s own scores. With a ``reference`` the scaling bounds
+    and band cut-offs are taken from it instead, so a small batch is scored
+    exactly as if it were part of the reference population. The arithmetic
+    runs in ``risk_score_kernel`` on NumPy arrays.
     """
     if config is None:
         config = RiskConfig()
 
     df = df.copy()
     df["anomaly_score"] = anomaly_scores
-
-    df["anomaly_score_scaled"] = _scale_series(df["anomaly_score"])
-    df["procedure_cost_deviation_scaled"] = _scale_series(df["procedure_cost_deviation"])
-    df["claim_frequency_scaled"] = _scale_series(df["claim_frequency_per_month"])
-
-    df["risk_score_raw"] = (
-        config.w_anomaly * df["anomaly_score_scaled"]
-        + config.w_proc_dev * df["procedure_cost_deviation_scaled"]
-        + config.w_claim_freq * df["claim_frequency_scaled"]
+    kernel = risk_score_kernel(
+        df["anomaly_score"].fillna(0.0).to_numpy(dtype=float),
+        df["procedure_cost_deviation"].fillna(0.0).to_numpy(dtype=float),
+        df["claim_frequency_per_month"].fillna(0.0).to_numpy(dtype=float),
+        config,
+        reference,
     )
+    df["anomaly_score_scaled"] = kernel["anomaly_score_scaled"]
+    df["procedure_cost_deviation_scaled"] = kernel["procedure_cost_deviation_scaled"]
+    df["claim_frequency_scaled"] = kernel["claim_frequency_scaled"]
+    df["risk_score_raw"] = kernel["risk_score_raw"]
+    df["risk_score"] = kernel["risk_score"]
+    df["risk_category"] = _bands(kernel["band_codes"], len(df))
+    return df
 
-    # Non-linear scaling to push clearly anomalous cases higher, closer to real-world audit needs
-    df["risk_score"] = (df["risk_score_raw"].clip(0, 1) ** 0.7 * 100).clip(0, 100)
-
-    # Derive per-claim risk bands from the empirical distribution so that
-    # Low / Medium / High are always represented in a realistic proportion.
-    scores = df["risk_score"].fillna(0.0)
-    if len(df) >= 3 and scores.max() > 0:
-        q_low = scores.quantile(0.5)   # ~50% Low
-        q_med = scores.quantile(0.85)  # ~35% Medium, ~15% High
-
-        def categorize(score: float) -> str:
-            if score <= q_low:
-                return "Low"
-            if score <= q_med:
-                return "Medium"
-            return "High"
-
-        df["risk_category"] = scores.apply(categorize)
-    else:
-        df["risk_category"] = "Low"
 
-    return df
+def build_risk_reference(scored: pd.DataFrame, config: RiskConfig | None = None) -> RiskReference:
+    """
+    Freeze the scaling bounds and band cut-offs ``compute_risk_scores`` used
+    for ``scored`` (its output frame).
+    """
+    config = config or RiskConfig()
+    scores = scored["risk_score"].fillna(0.0)
+    q_low = q_med = None
+    if len(scored) >= 3 and scores.max() > 0:
+        low, med = config.claim_band_quantiles
+        q_low, q_med = float(scores.quantile(low)), float(scores.quantile(med))
+    return RiskReference(
+        anomaly_bounds=_series_bounds(scored["anomaly_score"]),
+        proc_dev_bounds=_series_bounds(scored["procedure_cost_deviation"]),
+        claim_freq_bounds=_series_bounds(scored["claim_frequency_per_month"]),
+        q_low=q_low,
+        q_med=q_med,
+    )
 
 
-def apply_rule_based_flags(df: pd.DataFrame) -> pd.DataFrame:
+def apply_rule_based_flags(df: pd.DataFrame, hospital_monthly: pd.DataFrame | None = None) -> pd.DataFrame:
     """
     Apply rule-based fraud detection flags:
     - Up-coding: procedure cost > 2x district average
     - Ghost billing: same patient repeated > 3 times/month in same hospital
     - Claim surge: hospital monthly claims spike > ~150% vs hospital's average monthly volume
+
+    Monthly volumes are counted over ``df`` unless ``hospital_monthly``
+    (hospital_id, month, claims_in_month, hosp_avg_monthly_claims) supplies
+    them, e.g. for a batch scored against the stored population.
+
+    The rules are declared in ``scoring.rules`` (``DEFAULT_RULES``, extended
+    by ``FRAUD_RULES_PATH``) and evaluated in one pass by the compiled
+    ``RuleEngine``; each rule adds one boolean column.
     """
-    df = df.copy()
+    return evaluate_rule_flags(df, hospital_monthly)[0]
 
-    # Up-coding
-    df["rule_upcoding"] = (
-        df["claim_amount"]
-        > 2.0 * df["district_proc_avg_cost"].replace(0, np.nan).fillna(df["district_proc_avg_cost"])
-    )
 
-    # Ghost billing: patient_claim_count_hosp_month > 3 (tighter, more realistic threshold)
-    df["rule_ghost_billing"] = df["patient_claim_count_hosp_month"] > 3
+def evaluate_rule_flags(
+    df: pd.DataFrame, hospital_monthly: pd.DataFrame | None = None
+) -> Tuple[pd.DataFrame, RuleReport]:
+    """
+    ``apply_rule_based_flags`` plus the engine's timing report for this
+    evaluation. The report is returned, not kept on the shared engine, so
+    the caller decides which evaluation it describes.
+    """
+    engine = get_rule_engine()
+    provided = hospital_monthly_operands(df, hospital_monthly) if hospital_monthly is not None else None
+    masks, report = engine.evaluate(df, provided=provided)
 
-    # Claim surge: hospital monthly claims vs hospital average monthly
-    hosp_month = (
-        df.groupby(["hospital_id", "month"])["claim_id"]
-        .count()
-        .rename("claims_in_month")
-        .reset_index()
-    )
-    hosp_avg = (
-        hosp_month.groupby("hospital_id")["claims_in_month"]
-        .mean()
-        .rename("hosp_avg_monthly_claims")
-        .reset_index()
-    )
-    hosp_month = hosp_month.merge(hosp_avg, on="hospital_id", how="left")
-    hosp_month["rule_claim_surge"] = (
-        hosp_month["claims_in_month"]
-        > hosp_month["hosp_avg_monthly_claims"].fillna(0) * 2.5
-    )  # > 150% spike => >2.5x
-
-    df = df.merge(
-        hosp_month[["hospital_id", "month", "rule_claim_surge"]],
-        on=["hospital_id", "month"],
-        how="left",
-    )
+    df = df.reset_index(drop=True)
+    flags = pd.DataFrame(masks)
+    flags["any_rule_flag"] = np.logical_or.reduce(list(masks.values())) if masks else False
+    return pd.concat([df.drop(columns=flags.columns, errors="ignore"), flags], axis=1), report
 
-    # Consolidated flag
-    df["any_rule_flag"] = (
-        df["rule_upcoding"] | df["rule_ghost_billing"] | df["rule_claim_surge"]
-    )
 
-    return df
+HOSPITAL_KEYS = ["hospital_id", "hospital_name", "state", "district", "hospital_type"]
 
 
-def aggregate_hospital_risk(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Aggregate claim-level risk to hospital level for dashboard and reports.
+def _key_values(series: pd.Series) -> np.ndarray:
+    # Integer codes for categoricals (cheap to compare), raw values otherwise
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    return np.asarray(series.array)
+
+
+def _hospital_group_codes(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     """
-    agg = (
-        df.groupby(["hospital_id", "hospital_name", "state", "district", "hospital_type"])
-        .agg(
-            total_claims=("claim_id", "count"),
-            avg_risk_score=("risk_score", "mean"),
-            high_risk_claims=("risk_category", lambda s: (s == "High").sum()),
-            suspicious_claims=("anomaly_label", lambda s: (s == 1).sum()),
-            any_rule_flags=("any_rule_flag", "sum"),
-        )
-        .reset_index()
-    )
+    Group code per claim (-1 for claims groupby would drop) and the first
+    row of each group, with groups in ``groupby(HOSPITAL_KEYS)`` order.
 
+    Only ``hospital_id`` is factorized when the other keys are constant per
+    hospital (checked with one vectorized comparison per key); otherwise
+    the codes come from a full multi-key ``groupby().ngroup()``.
+    """
+    codes, uniques = pd.factorize(df["hospital_id"], sort=True)
+    has_key = codes >= 0
+    rows = np.flatnonzero(has_key)
+    first = np.full(len(uniques), len(df), dtype=np.int64)
+    np.minimum.at(first, codes[rows], rows)
+
+    consistent = True
+    for key in HOSPITAL_KEYS[1:]:
+        values = _key_values(df[key])
+        if not (values[rows] == values[first][codes[rows]]).all():
+            consistent = False
+            break
+    if consistent:
+        return codes.astype(np.int64), first
+
+    codes = df.groupby(HOSPITAL_KEYS, observed=True).ngroup().to_numpy()
+    codes = np.where(np.isnan(codes), -1, codes).astype(np.int64)
+    rows = np.flatnonzero(codes >= 0)
+    first = np.full(int(codes.max()) + 1 if len(rows) else 0, len(df), dtype=np.int64)
+    np.minimum.at(first, codes[rows], rows)
+    return codes, first
+
+
+def _hospital_bands(agg: pd.DataFrame, config: RiskConfig) -> pd.DataFrame:
+    """
+    Audit priority score and overall category from the per-hospital counts
+    and mean risk.
+    """
     # Incorporate rule flags into the categorization logic
     # Each rule flag adds to the final audit priority score
-    agg["audit_priority_score"] = (
-        agg["avg_risk_score"] + (agg["any_rule_flags"] / agg["total_claims"]) * 100
-    ).clip(0, 100)
+    total = agg["total_claims"].to_numpy()
+    agg["audit_priority_score"] = np.clip(
+        agg["avg_risk_score"].to_numpy() + (agg["any_rule_flags"].to_numpy() / total) * 100, 0, 100
+    )
 
-    scores = agg["audit_priority_score"].fillna(0.0)
+    scores = agg["audit_priority_score"].fillna(0.0).to_numpy()
+    band_codes = None
     if len(agg) >= 3 and scores.max() > 0:
-        q_low = scores.quantile(0.5)
-        q_med = scores.quantile(0.8)  # Lowered to 0.8 to ensure more 'High' visibility
+        q_low, q_med = np.quantile(scores, config.hospital_band_quantiles)
+        band_codes = _band_codes(scores, q_low, q_med)
+    agg["risk_category_overall"] = _bands(band_codes, len(agg))
+    return agg
 
-        def categorize_hospital(score: float) -> str:
-            if score <= q_low:
-                return "Low"
-            if score <= q_med:
-                return "Medium"
-            return "High"
 
-        agg["risk_category_overall"] = scores.apply(categorize_hospital)
-    else:
-        agg["risk_category_overall"] = "Low"
+def aggregate_hospital_risk(
+    df: pd.DataFrame,
+    config: RiskConfig | None = None,
+    graph_features: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """
+    Aggregate claim-level risk to hospital level for dashboard and reports.
 
+    Claims are mapped to group codes once (see ``_hospital_group_codes``);
+    the counts are ``np.bincount`` passes over those codes. The mean goes
+    through pandas on the integer codes so its summation matches
+    ``groupby().mean()``. ``graph_features`` (see
+    ``scoring.graph.hospital_graph_features``) adds the co-patient columns,
+    looked up by hospital_id.
+    """
+    codes, first = _hospital_group_codes(df)
+    has_key = codes >= 0
+    codes = codes[has_key]
+    n_groups = len(first)
+    agg = df[HOSPITAL_KEYS].iloc[first].reset_index(drop=True)
+
+    def group_count(mask: pd.Series) -> np.ndarray:
+        weights = mask.to_numpy(dtype=bool, na_value=False)[has_key]
+        return np.bincount(codes, weights=weights, minlength=n_groups).astype(np.int64)
+
+    agg["total_claims"] = group_count(df["claim_id"].notna())
+    agg["avg_risk_score"] = _group_mean(codes, df["risk_score"].to_numpy(dtype=float)[has_key])
+    agg["high_risk_claims"] = group_count(df["risk_category"] == "High")
+    agg["suspicious_claims"] = group_count(df["anomaly_label"] == 1)
+    agg["any_rule_flags"] = group_count(df["any_rule_flag"])
+    if graph_features is not None:
+        agg = _add_graph_features(agg, graph_features)
+    return _hospital_bands(agg, config or RiskConfig())
+
+
+def _add_graph_features(agg: pd.DataFrame, graph_features: pd.DataFrame) -> pd.DataFrame:
+    rows = pd.Index(graph_features["hospital_id"].astype(object)).get_indexer(agg["hospital_id"].astype(object))
+    found = rows >= 0
+    for column in graph_features.columns.drop("hospital_id"):
+        values = graph_features[column].to_numpy()
+        missing = -1 if column == "collusion_ring_id" else 0
+        out = np.full(len(agg), missing, dtype=values.dtype)
+        out[found] = values[rows[found]]
+        agg[column] = out
     return agg
 
+
+def _group_mean(codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # pandas on the integer codes, so the summation matches groupby().mean()
+    return pd.Series(values).groupby(codes).mean().to_numpy()
+
+
+@dataclass
+class RiskComponents:
+    """
+    What re-weighting needs from a scored population: the scaled component
+    columns of ``compute_risk_scores`` and the weight-independent hospital
+    aggregates, keyed by hospital group code (see ``reweight_risk``).
+    """
+
+    anomaly_scaled: np.ndarray
+    proc_dev_scaled: np.ndarray
+    claim_freq_scaled: np.ndarray
+    group_codes: np.ndarray
+    hospitals: pd.DataFrame
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.anomaly_scaled, self.proc_dev_scaled, self.claim_freq_scaled, self.group_codes)
+        return sum(a.nbytes for a in arrays)
+
+
+def build_risk_components(scored: pd.DataFrame) -> RiskComponents:
+    """
+    Cache the scaled components and hospital counts of a frame that went
+    through ``compute_risk_scores`` and ``apply_rule_based_flags``.
+    """
+    codes, first = _hospital_group_codes(scored)
+    has_key = codes >= 0
+    n_groups = len(first)
+    hospitals = scored[HOSPITAL_KEYS].iloc[first].reset_index(drop=True)
+
+    def group_count(mask: pd.Series) -> np.ndarray:
+        weights = mask.to_numpy(dtype=bool, na_value=False)[has_key]
+        return np.bincount(codes[has_key], weights=weights, minlength=n_groups).astype(np.int64)
+
+    hospitals["total_claims"] = group_count(scored["claim_id"].notna())
+    hospitals["suspicious_claims"] = group_count(scored["anomaly_label"] == 1)
+    hospitals["any_rule_flags"] = group_count(scored["any_rule_flag"])
+    return RiskComponents(
+        anomaly_scaled=scored["anomaly_score_scaled"].to_numpy(dtype=float),
+        proc_dev_scaled=scored["procedure_cost_deviation_scaled"].to_numpy(dtype=float),
+        claim_freq_scaled=scored["claim_frequency_scaled"].to_numpy(dtype=float),
+        group_codes=codes,
+        hospitals=hospitals,
+    )
+
+
+def reweight_risk(components: RiskComponents, config: RiskConfig) -> pd.DataFrame:
+    """
+    Hospital risk table (``aggregate_hospital_risk`` columns) under other
+    weights / band quantiles, from the cached components alone: one weighted
+    sum, one quantile pass and a few bincounts. Adds the per-hospital claim
+    counts per band (``low_risk_claims``, ``medium_risk_claims``).
+    """
+    kernel = weighted_risk(
+        components.anomaly_scaled, components.proc_dev_scaled, components.claim_freq_scaled, config
+    )
+    codes = components.group_codes
+    has_key = codes >= 0
+    codes = codes[has_key]
+    n_groups = len(components.hospitals)
+    bands = kernel["band_codes"]
+    if bands is None:
+        bands = np.zeros(len(has_key), dtype=np.int8)
+    band_counts = np.bincount(
+        codes * 3 + bands[has_key], minlength=n_groups * 3
+    ).reshape(n_groups, 3)
+
+    agg = components.hospitals.copy()
+    agg.insert(len(HOSPITAL_KEYS) + 1, "avg_risk_score", _group_mean(codes, kernel["risk_score"][has_key]))
+    agg.insert(len(HOSPITAL_KEYS) + 2, "high_risk_claims", band_counts[:, 2])
+    agg = _hospital_bands(agg, config)
+    agg["low_risk_claims"] = band_counts[:, 0]
+    agg["medium_risk_claims"] = band_counts[:, 1]
+    return agg
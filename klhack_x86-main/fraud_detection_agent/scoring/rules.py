@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# JSON file with a list of rule specs (same layout as DEFAULT_RULES); rules
+# with the name of a default rule replace it, others are added. Empty (the
+# default) uses DEFAULT_RULES only.
+FRAUD_RULES_PATH = os.getenv("FRAUD_RULES_PATH", "")
+
+# Fraud rules as data. A rule compares a ``value`` operand with either a
+# constant ``threshold`` or ``factor`` times a ``baseline`` operand. Operands:
+#   "column"                                      a column of the claims frame
+#   {"count": [keys]}                             claims in the row's group
+#   {"mean": column, "by": [keys]}                mean of column over the row's group
+#   {"count_mean": [keys], "by": [coarser keys]}  mean, over the coarser group's
+#                                                 sub-groups, of their claim counts
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        "name": "rule_upcoding",
+        "description": "Up-coding: procedure cost > 2x district average",
+        "value": "claim_amount",
+        "op": ">",
+        "factor": 2.0,
+        "baseline": {"mean": "claim_amount", "by": ["district", "procedure_code"]},
+    },
+    {
+        "name": "rule_ghost_billing",
+        "description": "Ghost billing: same patient repeated > 3 times/month in same hospital",
+        "value": {"count": ["hospital_id", "month", "patient_id"]},
+        "op": ">",
+        "threshold": 3,
+    },
+    {
+        "name": "rule_claim_surge",
+        "description": "Claim surge: hospital monthly claims > 2.5x the hospital's average month",
+        "value": {"count": ["hospital_id", "month"]},
+        "op": ">",
+        "factor": 2.5,
+        "baseline": {"count_mean": ["hospital_id", "month"], "by": ["hospital_id"]},
+    },
+]
+
+_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+@dataclass(frozen=True)
+class Operand:
+    kind: str  # "column", "count", "mean" or "count_mean"
+    column: Optional[str] = None
+    by: Tuple[str, ...] = ()
+    within: Tuple[str, ...] = ()  # count_mean: the sub-group keys
+
+    @property
+    def label(self) -> str:
+        if self.kind == "column":
+            return self.column
+        if self.kind == "count":
+            return f"count[{','.join(self.by)}]"
+        if self.kind == "mean":
+            return f"mean({self.column})[{','.join(self.by)}]"
+        return f"mean(count[{','.join(self.within)}])[{','.join(self.by)}]"
+
+
+# Group statistics preprocessing already broadcasts onto the claims frame;
+# used instead of recomputing when present (first column found wins).
+PRECOMPUTED_OPERANDS: Dict[Operand, Tuple[str, ...]] = {
+    Operand("count", by=("hospital_id", "month")): ("hosp_month_total_claims", "claim_frequency_per_month"),
+    Operand("count", by=("hospital_id", "month", "patient_id")): ("patient_claim_count_hosp_month",),
+    Operand("mean", "claim_amount", ("district", "procedure_code")): ("district_proc_avg_cost",),
+}
+
+HOSPITAL_MONTH_COUNT = Operand("count", by=("hospital_id", "month"))
+HOSPITAL_AVG_MONTH_COUNT = Operand("count_mean", by=("hospital_id",), within=("hospital_id", "month"))
+
+
+def hospital_monthly_operands(df: pd.DataFrame, hospital_monthly: pd.DataFrame) -> Dict[Operand, np.ndarray]:
+    """
+    Per-row monthly volumes from ``hospital_monthly`` (hospital_id, month,
+    claims_in_month, hosp_avg_monthly_claims), looked up by key instead of
+    merged, for rows scored against the stored population.
+    """
+    keys = ["hospital_id", "month"]
+    index = pd.MultiIndex.from_frame(hospital_monthly[keys].astype(object))
+    rows = index.get_indexer(pd.MultiIndex.from_frame(df[keys].astype(object)))
+    found = rows >= 0
+
+    def lookup(values: pd.Series) -> np.ndarray:
+        out = np.full(len(df), np.nan)
+        out[found] = values.to_numpy(dtype=float)[rows[found]]
+        return out
+
+    return {
+        HOSPITAL_MONTH_COUNT: lookup(hospital_monthly["claims_in_month"]),
+        HOSPITAL_AVG_MONTH_COUNT: lookup(hospital_monthly["hosp_avg_monthly_claims"].fillna(0)),
+    }
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    value: Operand
+    op: str
+    threshold: Optional[float] = None
+    baseline: Optional[Operand] = None
+    factor: float = 1.0
+    description: str = ""
+
+
+def parse_operand(spec: Any) -> Operand:
+    if isinstance(spec, str):
+        return Operand("column", column=spec)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Invalid rule operand: {spec!r}")
+    if "count" in spec:
+        return Operand("count", by=tuple(spec["count"]))
+    if "mean" in spec:
+        return Operand("mean", column=spec["mean"], by=tuple(spec["by"]))
+    if "count_mean" in spec:
+        within, by = tuple(spec["count_mean"]), tuple(spec["by"])
+        if not set(by) <= set(within):
+            raise ValueError(f"count_mean keys {by} must be a subset of {within}")
+        return Operand("count_mean", by=by, within=within)
+    raise ValueError(f"Invalid rule operand: {spec!r}")
+
+
+def parse_rule(spec: Dict[str, Any]) -> Rule:
+    if spec.get("op") not in _OPS:
+        raise ValueError(f"Rule {spec.get('name')!r}: op must be one of {sorted(_OPS)}")
+    if ("threshold" in spec) == ("baseline" in spec):
+        raise ValueError(f"Rule {spec.get('name')!r}: needs exactly one of threshold / baseline")
+    return Rule(
+        name=spec["name"],
+        value=parse_operand(spec["value"]),
+        op=spec["op"],
+        threshold=float(spec["threshold"]) if "threshold" in spec else None,
+        baseline=parse_operand(spec["baseline"]) if "baseline" in spec else None,
+        factor=float(spec.get("factor", 1.0)),
+        description=spec.get("description", ""),
+    )
+
+
+def load_rules(path: Path | str | None = None) -> List[Rule]:
+    """
+    DEFAULT_RULES merged with the rule specs in ``path`` (default
+    ``FRAUD_RULES_PATH``), in declaration order.
+    """
+    specs = {spec["name"]: spec for spec in DEFAULT_RULES}
+    path = path or FRAUD_RULES_PATH
+    if path:
+        for spec in json.loads(Path(path).read_text(encoding="utf-8")):
+            specs[spec["name"]] = spec
+    return [parse_rule(spec) for spec in specs.values()]
+
+
+@dataclass
+class RuleReport:
+    """
+    Timings of one evaluation: per rule (its comparison, plus operands it
+    was the first to need) and per shared operand.
+    """
+
+    rules: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    operands: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    total_seconds: float = 0.0
+
+
+class _GroupCache:
+    """
+    Factorized key columns and combined group codes, computed once per
+    evaluation and shared by every operand that groups on them.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.df = df
+        self._columns: Dict[str, Tuple[np.ndarray, int]] = {}
+        self._groups: Dict[Tuple[str, ...], Tuple[np.ndarray, int]] = {}
+
+    def column(self, name: str) -> Tuple[np.ndarray, int]:
+        if name not in self._columns:
+            codes, uniques = pd.factorize(self.df[name])
+            self._columns[name] = (codes.astype(np.int64), len(uniques))
+        return self._columns[name]
+
+    def codes(self, keys: Tuple[str, ...]) -> Tuple[np.ndarray, int]:
+        """
+        Dense group codes for ``keys``; -1 where any key is missing.
+        """
+        if keys not in self._groups:
+            codes, n_groups = self.column(keys[0])
+            for key in keys[1:]:
+                key_codes, key_n = self.column(key)
+                missing = (codes < 0) | (key_codes < 0)
+                combined = np.where(missing, -1, codes * key_n + key_codes)
+                uniques, dense = np.unique(combined, return_inverse=True)
+                dense = dense - 1 if len(uniques) and uniques[0] < 0 else dense
+                codes, n_groups = dense.astype(np.int64), int((uniques >= 0).sum())
+            self._groups[keys] = (codes, n_groups)
+        return self._groups[keys]
+
+
+class RuleEngine:
+    """
+    Compiled rule set. Operands are de-duplicated across rules; group codes
+    per key column and per key tuple are computed once and shared; every
+    rule is one vectorized comparison; no frame is merged.
+
+    Operand values come, in order of preference, from ``provided`` arrays
+    (e.g. group statistics of the stored population), from columns
+    preprocessing already computed (``PRECOMPUTED_OPERANDS``) or are
+    computed from the frame's group codes.
+    """
+
+    def __init__(self, rules: List[Rule]) -> None:
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+        self.rules = rules
+
+    def operands(self) -> List[Operand]:
+        seen: Dict[Operand, None] = {}
+        for rule in self.rules:
+            for operand in (rule.value, rule.baseline):
+                if operand is not None:
+                    seen.setdefault(operand)
+        return list(seen)
+
+    def evaluate(
+        self,
+        df: pd.DataFrame,
+        provided: Optional[Dict[Operand, np.ndarray]] = None,
+    ) -> Tuple[Dict[str, np.ndarray], RuleReport]:
+        """
+        Boolean mask per rule for the rows of ``df``, and the timing report.
+        """
+        start_all = time.perf_counter()
+        provided = provided or {}
+        groups = _GroupCache(df)
+        values: Dict[Operand, np.ndarray] = {}
+        report = RuleReport()
+
+        def operand_value(operand: Operand, rule_name: str) -> np.ndarray:
+            if operand in values:
+                report.operands[operand.label]["used_by"].append(rule_name)
+                return values[operand]
+            start = time.perf_counter()
+            value, source = self._resolve(operand, df, groups, provided)
+            values[operand] = value
+            report.operands[operand.label] = {
+                "source": source,
+                "seconds": time.perf_counter() - start,
+                "used_by": [rule_name],
+            }
+            return value
+
+        masks = {}
+        for rule in self.rules:
+            start = time.perf_counter()
+            value = operand_value(rule.value, rule.name)
+            if rule.baseline is not None:
+                other = rule.factor * operand_value(rule.baseline, rule.name)
+            else:
+                other = rule.threshold
+            with np.errstate(invalid="ignore"):
+                # Missing values compare False
+                masks[rule.name] = _OPS[rule.op](value, other)
+            report.rules[rule.name] = {
+                "seconds": time.perf_counter() - start,
+                "flagged": int(masks[rule.name].sum()),
+            }
+        report.total_seconds = time.perf_counter() - start_all
+        return masks, report
+
+    def _resolve(
+        self,
+        operand: Operand,
+        df: pd.DataFrame,
+        groups: _GroupCache,
+        provided: Dict[Operand, np.ndarray],
+    ) -> Tuple[np.ndarray, str]:
+        if operand in provided:
+            return np.asarray(provided[operand], dtype=float), "provided"
+        if operand.kind == "column":
+            return df[operand.column].to_numpy(dtype=float, na_value=np.nan), "column"
+        for column in PRECOMPUTED_OPERANDS.get(operand, ()):
+            if column in df.columns:
+                return df[column].to_numpy(dtype=float, na_value=np.nan), f"precomputed:{column}"
+
+        codes, n_groups = groups.codes(operand.by if operand.kind != "count_mean" else operand.within)
+        has_key = codes >= 0
+        out = np.full(len(df), np.nan)
+        if operand.kind == "count":
+            present = df["claim_id"].notna().to_numpy(dtype=float)
+            counts = np.bincount(codes[has_key], weights=present[has_key], minlength=n_groups)
+            out[has_key] = counts[codes[has_key]]
+        elif operand.kind == "mean":
+            # pandas on the integer codes, so the summation matches groupby().mean()
+            column = df[operand.column].to_numpy(dtype=float, na_value=np.nan)
+            means = pd.Series(column[has_key]).groupby(codes[has_key]).mean()
+            out[has_key] = means.reindex(range(n_groups)).to_numpy()[codes[has_key]]
+        else:
+            present = df["claim_id"].notna().to_numpy(dtype=float)
+            sub_counts = np.bincount(codes[has_key], weights=present[has_key], minlength=n_groups)
+            coarse, n_coarse = groups.codes(operand.by)
+            # Every sub-group lies in one coarse group: map via any of its rows
+            coarse_of_sub = np.full(n_groups, -1, dtype=np.int64)
+            coarse_of_sub[codes[has_key]] = coarse[has_key]
+            valid = coarse_of_sub >= 0
+            totals = np.bincount(coarse_of_sub[valid], weights=sub_counts[valid], minlength=n_coarse)
+            n_subs = np.bincount(coarse_of_sub[valid], minlength=n_coarse)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                coarse_mean = totals / n_subs
+            row_coarse = coarse[has_key]
+            out[has_key] = np.where(row_coarse >= 0, coarse_mean[np.maximum(row_coarse, 0)], np.nan)
+        return out, "computed"
+
+
+_default_engine: Optional[RuleEngine] = None
+
+
+def get_rule_engine() -> RuleEngine:
+    """
+    The engine for the configured rules (DEFAULT_RULES + FRAUD_RULES_PATH),
+    compiled once per process.
+    """
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = RuleEngine(load_rules())
+    return _default_engine
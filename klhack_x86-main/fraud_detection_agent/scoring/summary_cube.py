@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+CUBE_DIMENSIONS = ["hospital_type", "state", "district"]
+
+# Rule count measures, as labelled in /get-summary's anomaly_type_counts
+RULE_MEASURES = {
+    "Up-coding": "rule_upcoding",
+    "Ghost Billing": "rule_ghost_billing",
+    "Claim Surge": "rule_claim_surge",
+    "Duplicates": "rule_duplicate",
+    "ML Anomalies": "anomaly_label",
+}
+
+RISK_CATEGORIES = ["Low", "Medium", "High"]
+
+# Filter values meaning "no filter" (the API's defaults)
+_NO_FILTER = (None, "", "All")
+
+
+def _cells(df: pd.DataFrame, columns: list) -> tuple:
+    """
+    ``(codes per column, labels per column, cell of each row, n_cells)``;
+    a missing value gets its own code so it still counts in the "All" rollups.
+    """
+    codes, labels = [], []
+    for column in columns:
+        column_codes, uniques = pd.factorize(df[column], sort=True)
+        codes.append(column_codes + 1)
+        labels.append([None] + [str(value) for value in uniques])
+    if not len(df):
+        return [np.empty(0, dtype=np.int64) for _ in columns], labels, np.empty(0, dtype=np.int64), 0
+    key = np.ravel_multi_index(codes, [len(l) for l in labels])
+    cells, row_cell = np.unique(key, return_inverse=True)
+    cell_codes = list(np.unravel_index(cells, [len(l) for l in labels]))
+    return cell_codes, labels, row_cell, len(cells)
+
+
+class SummaryCube:
+    """
+    Additive aggregates of the scored claims over hospital_type x state x
+    district x month, and of the hospital risk table over hospital_type x
+    state x district, built once per pipeline build.
+
+    ``summary(hospital_type=..., state=..., district=...)`` answers
+    /get-summary for any filter combination ("All" / None meaning a rollup)
+    by summing the matching cells, never the claim rows: a few thousand
+    cells instead of every claim on each poll.
+    """
+
+    def __init__(self, claims: pd.DataFrame, hospitals: pd.DataFrame, suspicious: np.ndarray) -> None:
+        codes, labels, row_cell, n_cells = _cells(claims, CUBE_DIMENSIONS + ["month"])
+        self._labels = dict(zip(CUBE_DIMENSIONS, labels))
+        self._months = labels[-1]
+        self._claim_codes = dict(zip(CUBE_DIMENSIONS, codes))
+        self._month_codes = codes[-1]
+
+        suspicious = np.asarray(suspicious, dtype=bool)
+        amount = claims["claim_amount"].to_numpy(dtype=float, na_value=0.0)
+        self.claims = np.bincount(row_cell, minlength=n_cells)
+        self.suspicious = np.bincount(row_cell, weights=suspicious, minlength=n_cells).astype(np.int64)
+        self.fraud_amount = np.bincount(row_cell, weights=np.where(suspicious, amount, 0.0), minlength=n_cells)
+        self.rule_counts = {
+            label: np.bincount(
+                row_cell, weights=claims[column].to_numpy(dtype=float, na_value=0.0), minlength=n_cells
+            ).astype(np.int64)
+            for label, column in RULE_MEASURES.items()
+        }
+
+        codes, labels, row_cell, n_cells = _cells(hospitals, CUBE_DIMENSIONS)
+        self._hospital_labels = dict(zip(CUBE_DIMENSIONS, labels))
+        self._hospital_codes = dict(zip(CUBE_DIMENSIONS, codes))
+        self.hospitals = np.bincount(row_cell, minlength=n_cells)
+        self.risk_sum = np.bincount(
+            row_cell, weights=hospitals["avg_risk_score"].to_numpy(dtype=float, na_value=0.0), minlength=n_cells
+        )
+        # Hospitals with a risk score, the denominator of the mean risk
+        self.risk_count = np.bincount(
+            row_cell, weights=hospitals["avg_risk_score"].notna().to_numpy(), minlength=n_cells
+        ).astype(np.int64)
+        category = hospitals["risk_category_overall"].astype(object).to_numpy()
+        self.risk_categories = {
+            name: np.bincount(row_cell, weights=category == name, minlength=n_cells).astype(np.int64)
+            for name in RISK_CATEGORIES
+        }
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.claims) + len(self.hospitals)
+
+    @staticmethod
+    def _select(codes: Dict[str, np.ndarray], labels: Dict[str, list], filters: Dict[str, Optional[str]]) -> np.ndarray:
+        """
+        Boolean mask of the cells matching every filter.
+        """
+        n_cells = len(next(iter(codes.values())))
+        selected = np.ones(n_cells, dtype=bool)
+        for column, value in filters.items():
+            if value in _NO_FILTER:
+                continue
+            try:
+                code = labels[column].index(str(value), 1)
+            except ValueError:
+                return np.zeros(n_cells, dtype=bool)
+            selected &= codes[column] == code
+        return selected
+
+    def summary(
+        self,
+        hospital_type: Optional[str] = None,
+        state: Optional[str] = "All",
+        district: Optional[str] = "All",
+    ) -> Dict[str, object]:
+        """
+        The /get-summary payload for the filters, from the cube cells.
+        """
+        filters = {"hospital_type": hospital_type, "state": state, "district": district}
+        cells = self._select(self._claim_codes, self._labels, filters)
+        months = self._month_codes[cells]
+        n_months = len(self._months)
+        claims_by_month = np.bincount(months, weights=self.claims[cells], minlength=n_months)
+        suspicious_by_month = np.bincount(months, weights=self.suspicious[cells], minlength=n_months)
+        # groupby("month", observed=True): months with claims, missing month dropped
+        monthly: List[Dict[str, object]] = [
+            {"month": self._months[m], "is_suspicious": int(suspicious_by_month[m])}
+            for m in range(1, n_months)
+            if claims_by_month[m] > 0
+        ]
+
+        hospital_cells = self._select(self._hospital_codes, self._hospital_labels, filters)
+        types = self._hospital_codes["hospital_type"][hospital_cells]
+        n_types = len(self._hospital_labels["hospital_type"])
+        risk_sum = np.bincount(types, weights=self.risk_sum[hospital_cells], minlength=n_types)
+        risk_count = np.bincount(types, weights=self.risk_count[hospital_cells], minlength=n_types)
+        hosp_type_risk = [
+            {"hospital_type": self._hospital_labels["hospital_type"][t], "avg_risk_score": float(risk_sum[t] / risk_count[t])}
+            for t in range(1, n_types)
+            if risk_count[t] > 0
+        ]
+
+        return {
+            "stats": {
+                "total_claims": int(self.claims[cells].sum()),
+                "suspicious_claims": int(self.suspicious[cells].sum()),
+                "total_hospitals": int(self.hospitals[hospital_cells].sum()),
+                "total_fraud_amount": float(self.fraud_amount[cells].sum()),
+            },
+            "monthly_trends": monthly,
+            "risk_distribution": [
+                {"category": name, "count": int(self.risk_categories[name][hospital_cells].sum())}
+                for name in RISK_CATEGORIES
+            ],
+            "hosp_type_risk": hosp_type_risk,
+            "anomaly_type_counts": [
+                {"type": label, "count": int(counts[cells].sum())} for label, counts in self.rule_counts.items()
+            ],
+        }
@@ -0,0 +1,42 @@
+"""
+Every test runs against a scratch database, model registry and CSV export,
+set up before the package is imported (the paths are read at import time).
+"""
+import atexit
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="fraud_tests_"))
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+os.environ["CLAIMS_DB_DIR"] = str(SCRATCH_DIR / "database")
+os.environ["CLAIMS_DATA_DIR"] = str(SCRATCH_DIR / "data")
+os.environ["MODEL_REGISTRY_DIR"] = str(SCRATCH_DIR / "registry")
+os.environ["BACKGROUND_RETRAIN"] = "0"
+
+import pytest  # noqa: E402
+
+# Claims seeded into the scratch database for the backend comparisons
+N_TEST_CLAIMS = 5_000
+
+
+@pytest.fixture(scope="session")
+def claims_db():
+    """
+    The scratch claims database, seeded once with ``N_TEST_CLAIMS`` claims.
+    """
+    from fraud_detection_agent.database.db_setup import DB_PATH, init_csv_and_db
+
+    init_csv_and_db(n_rows=N_TEST_CLAIMS, reuse_existing=True, load_data=False)
+    return DB_PATH
+
+
+@pytest.fixture(scope="session")
+def pipeline(claims_db):
+    """
+    The national in-memory pipeline output over the scratch database.
+    """
+    from fraud_detection_agent import main
+
+    return main.run_full_pipeline(persist_snapshot=False)
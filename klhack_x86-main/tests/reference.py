@@ -0,0 +1,256 @@
+"""
+Reference implementations the optimized paths are checked against (the
+claim-level code they replaced), and the synthetic data they run on.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from fraud_detection_agent.database.db_setup import _build_hospital_master, _generate_claim_chunk
+from fraud_detection_agent.scoring.duplicates import DUPLICATE_BLOCK_COLUMNS, DuplicateIndex
+
+
+# --- Filter indexes (scoring/filter_index.py) -------------------------------
+
+HOSPITAL_TYPES = ["Government", "Private", "Teaching", "Trust"]
+TOP_K = 100
+
+
+def synthetic_claims(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Scored claims over 20 states of 10 districts each.
+    """
+    state = rng.integers(0, 20, n)
+    district = state * 10 + rng.integers(0, 10, n)
+    return pd.DataFrame(
+        {
+            "hospital_type": np.array(HOSPITAL_TYPES)[rng.integers(0, 4, n)],
+            "state": np.char.add("State_", state.astype(str)),
+            "district": np.char.add("District_", district.astype(str)),
+            "risk_score": np.round(rng.random(n), 3),
+            "anomaly_label": (rng.random(n) < 0.05).astype(int),
+            "any_rule_flag": rng.random(n) < 0.1,
+        }
+    )
+
+
+def sampled_filters(df: pd.DataFrame) -> list:
+    """
+    (hospital_type, state, district) requests over a few states of ``df``:
+    no filter, an unknown state, each type x state x district, and a
+    district without its state.
+    """
+    states = sorted(df["state"].astype(str).unique())[:3]
+    requests = [(None, "All", "All"), (None, "Nowhere", "All")]
+    for hospital_type in [None] + HOSPITAL_TYPES:
+        for state in states:
+            districts = sorted(df.loc[df["state"] == state, "district"].astype(str).unique())[:2]
+            requests.append((hospital_type, state, "All"))
+            requests += [(hospital_type, state, district) for district in districts]
+            requests.append((hospital_type, "All", districts[0]))
+    return requests
+
+
+def mask_filter(df: pd.DataFrame, hospital_type, state, district) -> pd.DataFrame:
+    if hospital_type:
+        df = df[df["hospital_type"] == hospital_type]
+    if state != "All":
+        df = df[df["state"] == state]
+    if district != "All":
+        df = df[df["district"] == district]
+    return df
+
+
+def mask_anomalies(df, hospital_type, state, district) -> pd.DataFrame:
+    """
+    /get-claim-anomalies before the index; a stable sort, since the index
+    breaks risk ties by row order.
+    """
+    df = mask_filter(df, hospital_type, state, district)
+    df = df[(df["anomaly_label"] == 1) | df["any_rule_flag"]]
+    return df.sort_values(by="risk_score", ascending=False, kind="stable").head(TOP_K)
+
+
+def mask_search(df, hospital_type, state, district) -> pd.DataFrame:
+    """
+    /get-claims-search before the index (no hospital type filter).
+    """
+    df = mask_filter(df, None, state, district)
+    return df.sort_values(by="risk_score", ascending=False, kind="stable").head(TOP_K)
+
+
+def index_anomalies(df, index, hospital_type, state, district) -> pd.DataFrame:
+    return df.take(index.top_suspicious(TOP_K, hospital_type=hospital_type, state=state, district=district))
+
+
+def index_search(df, index, hospital_type, state, district) -> pd.DataFrame:
+    return df.take(index.top(TOP_K, index.positions(state=state, district=district)))
+
+
+def index_slice(df, index, hospital_type, state, district) -> pd.DataFrame:
+    return index.select(df, hospital_type=hospital_type, state=state, district=district)
+
+
+# --- Summary cube (scoring/summary_cube.py) ---------------------------------
+
+
+def location_filters(hospitals: pd.DataFrame) -> list:
+    """
+    Every (hospital_type, state, district) filter of the dashboard over the
+    hospitals' locations, with None / "All" rollups.
+    """
+    locations = hospitals[["state", "district"]].drop_duplicates().astype(str).itertuples(index=False)
+    requests = []
+    for state, district in locations:
+        requests += [(state, "All"), (state, district)]
+    requests = sorted(set(requests)) + [("All", "All")]
+    types = [None] + sorted(hospitals["hospital_type"].astype(str).unique())
+    return [(t, s, d) for t in types for s, d in requests]
+
+
+def mask_summary(claims_df, hosp_df, hospital_type, state, district, rule_measures) -> dict:
+    """
+    The claim-level /get-summary computation the cube replaced.
+    """
+    for column, value in (("hospital_type", hospital_type), ("state", state), ("district", district)):
+        if value not in (None, "All"):
+            claims_df = claims_df[claims_df[column] == value]
+            hosp_df = hosp_df[hosp_df[column] == value]
+    suspicious = (claims_df["anomaly_label"] == 1) | claims_df["any_rule_flag"]
+    monthly = (
+        claims_df.assign(is_suspicious=suspicious)
+        .groupby("month", observed=True)["is_suspicious"]
+        .sum()
+        .reset_index()
+        .to_dict(orient="records")
+    )
+    return {
+        "stats": {
+            "total_claims": len(claims_df),
+            "suspicious_claims": int(suspicious.sum()),
+            "total_hospitals": len(hosp_df),
+            "total_fraud_amount": float(claims_df[suspicious]["claim_amount"].sum()),
+        },
+        "monthly_trends": monthly,
+        "risk_distribution": [
+            {"category": c, "count": int((hosp_df["risk_category_overall"] == c).sum())}
+            for c in ("Low", "Medium", "High")
+        ],
+        "hosp_type_risk": hosp_df.groupby("hospital_type", observed=True)["avg_risk_score"]
+        .mean()
+        .reset_index()
+        .to_dict(orient="records"),
+        "anomaly_type_counts": [
+            {"type": label, "count": int(claims_df[column].sum())} for label, column in rule_measures.items()
+        ],
+    }
+
+
+def assert_same(actual, expected) -> None:
+    """
+    Equal payloads; floats may differ in the last bits (different summation order).
+    """
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys(), (actual.keys(), expected.keys())
+        for key in expected:
+            assert_same(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), (actual, expected)
+        for a, b in zip(actual, expected):
+            assert_same(a, b)
+    elif isinstance(expected, float):
+        assert math.isclose(actual, expected, rel_tol=1e-9), (actual, expected)
+    else:
+        assert str(actual) == str(expected), (actual, expected)
+
+
+# --- Near-duplicate claims (scoring/duplicates.py) --------------------------
+
+
+def generated_claims(n_rows: int) -> pd.DataFrame:
+    """
+    Generated claims with the planted fraud patterns (~5% ``DUP_`` exact duplicates).
+    """
+    master = _build_hospital_master(np.random.default_rng(42))
+    return _generate_claim_chunk((1, n_rows, np.random.SeedSequence(7), master, None))
+
+
+def exhaustive_duplicates(df: pd.DataFrame, index: DuplicateIndex) -> np.ndarray:
+    """
+    Every pair sharing the block columns, filtered by the tolerances, then
+    clustered: a claim is a duplicate when it is not its cluster's first.
+    """
+    left = df[DUPLICATE_BLOCK_COLUMNS + ["admission_date", "claim_amount"]].reset_index(names="row")
+    pairs = left.merge(left, on=DUPLICATE_BLOCK_COLUMNS, suffixes=("_a", "_b"))
+    pairs = pairs[pairs["row_a"] < pairs["row_b"]]
+    days = (pd.to_datetime(pairs["admission_date_a"]) - pd.to_datetime(pairs["admission_date_b"])).dt.days.abs()
+    a, b = pairs["claim_amount_a"].to_numpy(), pairs["claim_amount_b"].to_numpy()
+    amount_ok = np.abs(a - b) <= index.amount_tolerance * np.maximum(np.abs(a), np.abs(b))
+    pairs = pairs[(days.to_numpy() <= index.date_tolerance_days) & amount_ok]
+    n = len(df)
+    graph = coo_matrix((np.ones(len(pairs)), (pairs["row_a"], pairs["row_b"])), shape=(n, n))
+    _, component = connected_components(graph, directed=False)
+    first = np.full(component.max() + 1, n)
+    np.minimum.at(first, component, np.arange(n))
+    return first[component] < np.arange(n)
+
+
+# --- Single-pass feature engine (preprocessing/preprocess.py) ---------------
+
+
+def merge_chain_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The original groupby + merge implementation of _add_derived_features.
+    """
+    df = df.copy()
+    df["admission_date"] = pd.to_datetime(df["admission_date"])
+    df["month"] = df["admission_date"].dt.to_period("M").astype(str)
+
+    hospital_avg = df.groupby("hospital_id")["claim_amount"].mean().rename("avg_claim_per_hospital")
+    df = df.merge(hospital_avg, on="hospital_id", how="left")
+
+    freq = (
+        df.groupby(["hospital_id", "month"])["claim_id"]
+        .count()
+        .rename("claim_frequency_per_month")
+        .reset_index()
+    )
+    df = df.merge(freq, on=["hospital_id", "month"], how="left")
+
+    proc_district_avg = (
+        df.groupby(["district", "procedure_code"])["claim_amount"]
+        .mean()
+        .rename("district_proc_avg_cost")
+        .reset_index()
+    )
+    df = df.merge(proc_district_avg, on=["district", "procedure_code"], how="left")
+    df["procedure_cost_deviation"] = df["claim_amount"] - df["district_proc_avg_cost"]
+
+    patient_counts = (
+        df.groupby(["hospital_id", "month", "patient_id"])["claim_id"]
+        .count()
+        .rename("patient_claim_count_hosp_month")
+        .reset_index()
+    )
+    df = df.merge(patient_counts, on=["hospital_id", "month", "patient_id"], how="left")
+
+    hosp_month_counts = (
+        df.groupby(["hospital_id", "month"])["claim_id"]
+        .count()
+        .rename("hosp_month_total_claims")
+        .reset_index()
+    )
+    df = df.merge(hosp_month_counts, on=["hospital_id", "month"], how="left")
+
+    df["patient_repeat_ratio"] = (
+        df["patient_claim_count_hosp_month"] / df["hosp_month_total_claims"].clip(lower=1)
+    )
+    return df
+
+
+def check_equivalence(expected: pd.DataFrame, actual: pd.DataFrame) -> None:
+    assert list(expected.columns) == list(actual.columns), (list(expected.columns), list(actual.columns))
+    pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-12)
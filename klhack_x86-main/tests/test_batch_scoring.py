@@ -0,0 +1,22 @@
+import sqlite3
+
+from fraud_detection_agent.database.db_setup import generate_mock_claims
+from fraud_detection_agent.scoring.batch_scoring import SCORED_COLUMNS, score_claim_records
+
+
+def test_scoring_does_not_wait_for_the_write_lock(pipeline, claims_db):
+    records = generate_mock_claims(n_rows=50)
+    records["claim_id"] = "NEW_" + records["claim_id"]
+    # Another writer holds the write lock; scoring must only read
+    writer = sqlite3.connect(claims_db)
+    conn = sqlite3.connect(claims_db, timeout=0.1)
+    try:
+        writer.execute("BEGIN IMMEDIATE")
+        scored = score_claim_records(pipeline["scorer"], records, conn=conn)
+    finally:
+        writer.rollback()
+        writer.close()
+        conn.close()
+    assert list(scored.columns) == SCORED_COLUMNS
+    assert scored["claim_id"].tolist() == records["claim_id"].tolist()
+    assert scored["risk_score"].notna().all()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from fraud_detection_agent.scoring.duplicates import DuplicateIndex, flag_duplicates
+
+from reference import exhaustive_duplicates, generated_claims
+
+
+def test_flags_match_exhaustive_join():
+    df = generated_claims(20_000)
+    index = DuplicateIndex()
+    np.testing.assert_array_equal(index.add(df).rule_duplicate, exhaustive_duplicates(df, index))
+
+
+def test_incremental_index_matches_one_shot():
+    df = generated_claims(30_000)
+    one_shot = DuplicateIndex()
+    result = one_shot.add(df)
+    incremental = DuplicateIndex()
+    parts = [incremental.add(df.iloc[i:i + 7_000]) for i in range(0, len(df), 7_000)]
+    np.testing.assert_array_equal(np.concatenate([p.rule_duplicate for p in parts]), result.rule_duplicate)
+    np.testing.assert_array_equal(incremental._clusters, one_shot._clusters)
+
+
+def test_planted_duplicates_precision_recall():
+    df = generated_claims(60_000)
+    planted = df["claim_id"].str.startswith("DUP_").to_numpy()
+    found = DuplicateIndex().add(df).rule_duplicate
+    hits = (found & planted).sum()
+    assert planted.sum() > 0
+    assert hits / found.sum() >= 0.99
+    assert hits / planted.sum() >= 0.99
+
+
+def test_rule_flag_unchanged_unless_opted_in():
+    df = generated_claims(5_000)
+    df["any_rule_flag"] = False
+    flagged = flag_duplicates(df)
+    assert flagged["rule_duplicate"].any()
+    assert not flagged["any_rule_flag"].any()
+    folded = flag_duplicates(df, fold_into_rule_flag=True)
+    pd.testing.assert_series_equal(folded["any_rule_flag"], folded["rule_duplicate"], check_names=False)
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from fraud_detection_agent.database.db_setup import generate_mock_claims
+from fraud_detection_agent.preprocessing.preprocess import _add_derived_features
+
+from reference import check_equivalence, merge_chain_reference
+
+
+@pytest.mark.parametrize("n_rows", [3_000, 30_000])
+def test_single_pass_matches_merge_chain(n_rows):
+    df = generate_mock_claims(n_rows=n_rows)
+    df["claim_amount_norm"] = 0.0
+    check_equivalence(merge_chain_reference(df), _add_derived_features(df))
+
+
+def test_missing_keys_behave_like_groupby():
+    df = generate_mock_claims(n_rows=2000)
+    df.loc[df.index[::97], "patient_id"] = np.nan
+    df.loc[df.index[::89], "claim_id"] = np.nan
+    check_equivalence(merge_chain_reference(df), _add_derived_features(df))
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fraud_detection_agent.scoring.filter_index import FilterIndex
+
+from reference import (
+    index_anomalies,
+    index_search,
+    index_slice,
+    mask_anomalies,
+    mask_filter,
+    mask_search,
+    sampled_filters,
+    synthetic_claims,
+)
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    df = synthetic_claims(50_000, np.random.default_rng(5))
+    suspicious = (df["anomaly_label"] == 1).to_numpy() | df["any_rule_flag"].to_numpy()
+    return df, FilterIndex(df, suspicious=suspicious)
+
+
+def test_synthetic_matches_masks(synthetic):
+    df, index = synthetic
+    for request in sampled_filters(df):
+        pd.testing.assert_frame_equal(index_slice(df, index, *request), mask_filter(df, *request))
+        pd.testing.assert_frame_equal(index_anomalies(df, index, *request), mask_anomalies(df, *request))
+        pd.testing.assert_frame_equal(index_search(df, index, *request), mask_search(df, *request))
+
+
+def test_top_k_edge_cases(synthetic):
+    df, index = synthetic
+    rows = index.positions(state="State_3")
+    assert len(index.top(0, rows)) == 0
+    np.testing.assert_array_equal(index.top(len(rows) + 10, rows), index.top(len(rows), rows))
+    assert len(index.top_suspicious(5, state="Nowhere")) == 0
+    # Negative k is rejected on the filtered and the unfiltered path alike
+    with pytest.raises(ValueError):
+        index.top(-1, rows)
+    with pytest.raises(ValueError):
+        index.top_suspicious(-1)
+    with pytest.raises(ValueError):
+        index.top_suspicious(-1, state="State_3")
+
+
+def test_endpoints_reject_negative_limits(pipeline):
+    from fastapi.testclient import TestClient
+
+    from fraud_detection_agent import main
+
+    client = TestClient(main.app)
+    assert client.get("/get-claim-anomalies", params={"limit": -1}).status_code == 422
+    assert client.get("/get-claims-search", params={"limit": -1}).status_code == 422
+    assert client.get("/get-claim-anomalies", params={"limit": 3}).status_code == 200
+
+
+def test_pipeline_indexes_match_masks(pipeline):
+    claims, hospitals = pipeline["claims_all"], pipeline["hospital_risk_all"]
+    claims_index, hospital_index = pipeline["claims_index"], pipeline["hospital_index"]
+    for request in sampled_filters(claims):
+        pd.testing.assert_frame_equal(index_slice(claims, claims_index, *request), mask_filter(claims, *request))
+        pd.testing.assert_frame_equal(
+            index_slice(hospitals, hospital_index, *request), mask_filter(hospitals, *request)
+        )
+        pd.testing.assert_frame_equal(
+            index_anomalies(claims, claims_index, *request), mask_anomalies(claims, *request)
+        )
@@ -0,0 +1,85 @@
+"""
+A server started on an empty database must seed ``N_CLAIMS`` claims,
+whichever code path touches the database first, and a streamed seed must
+write its CSV backup like the in-memory one. Each case runs in its own
+process with its own scratch directories, since the paths are read at
+import time.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fraud_detection_agent.database.db_setup import N_CLAIMS
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Scripts write their result as JSON to RESULT_PATH (stdout is shared with
+# the pipeline's progress prints, including the retrainer thread's)
+RETRAINER_SCRIPT = """
+import json, os
+from fraud_detection_agent import main
+main.start_retrainer()
+try:
+    build = main._retrainer.current(timeout=600)
+    result = {"claims": len(build.value["claims_all"]), "worker": main._retrainer.worker}
+    with open(os.environ["RESULT_PATH"], "w") as f:
+        json.dump(result, f)
+finally:
+    main._retrainer.stop(timeout=60)
+"""
+
+INLINE_SCRIPT = """
+import json, os
+from fraud_detection_agent import main
+output = main.run_full_pipeline(persist_snapshot=False)
+with open(os.environ["RESULT_PATH"], "w") as f:
+    json.dump({"claims": len(output["claims_all"])}, f)
+"""
+
+STREAMING_SCRIPT = """
+import json, os, sqlite3
+import pandas as pd
+from fraud_detection_agent.database.db_setup import CSV_PATH, DB_PATH, init_csv_and_db
+init_csv_and_db(n_rows=2000, reuse_existing=False, streaming=True, chunk_size=500)
+conn = sqlite3.connect(DB_PATH)
+claims = conn.execute("SELECT count(*) FROM claims").fetchone()[0]
+conn.close()
+with open(os.environ["RESULT_PATH"], "w") as f:
+    json.dump({"claims": claims, "csv_rows": len(pd.read_csv(CSV_PATH))}, f)
+"""
+
+
+def run_on_fresh_database(tmp_path: Path, script: str, **env: str) -> dict:
+    env = {
+        **os.environ,
+        "CLAIMS_DB_DIR": str(tmp_path / "database"),
+        "CLAIMS_DATA_DIR": str(tmp_path / "data"),
+        "MODEL_REGISTRY_DIR": str(tmp_path / "registry"),
+        "PYTHONPATH": str(ROOT),
+        "RESULT_PATH": str(tmp_path / "result.json"),
+        **env,
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=900
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads((tmp_path / "result.json").read_text())
+
+
+def test_retrainer_seeds_full_dataset(tmp_path):
+    out = run_on_fresh_database(tmp_path, RETRAINER_SCRIPT, BACKGROUND_RETRAIN="1", RETRAIN_WORKER="process")
+    assert out["worker"] == "process"
+    assert out["claims"] >= N_CLAIMS
+
+
+def test_inline_build_seeds_full_dataset(tmp_path):
+    out = run_on_fresh_database(tmp_path, INLINE_SCRIPT, BACKGROUND_RETRAIN="0")
+    assert out["claims"] >= N_CLAIMS
+
+
+def test_streaming_seed_writes_csv_backup(tmp_path):
+    out = run_on_fresh_database(tmp_path, STREAMING_SCRIPT)
+    assert out["claims"] >= 2000
+    assert out["csv_rows"] == out["claims"]
@@ -0,0 +1,41 @@
+import pytest
+
+from fraud_detection_agent import main
+from fraud_detection_agent.reports import report_generator
+
+
+class _Chain:
+    """
+    Stands in for AlgorandClient, keeping the metadata it was asked to store.
+    """
+    sender_address = "TEST"
+    stored = []
+
+    def store_report_on_chain(self, report_text, metadata):
+        self.stored.append(metadata)
+        return "TXID"
+
+
+@pytest.fixture
+def chain(monkeypatch, tmp_path):
+    from fraud_detection_agent.blockchain import quantum_client
+
+    def no_seal():
+        raise RuntimeError("offline")
+
+    monkeypatch.setattr(main, "AlgorandClient", _Chain)
+    monkeypatch.setattr(quantum_client, "get_quantum_client", no_seal)
+    monkeypatch.setattr(report_generator, "REPORT_DIR", tmp_path)
+    _Chain.stored = []
+    return _Chain.stored
+
+
+@pytest.mark.parametrize("request_filters", [{}, {"hospital_type": "Private"}, {"state": "Delhi"}])
+def test_out_of_core_metadata_matches_memory(pipeline, chain, monkeypatch, request_filters):
+    main.generate_report(**request_filters)
+    monkeypatch.setattr(main, "PIPELINE_MODE", "out_of_core")
+    main.generate_report(**request_filters)
+    memory, out_of_core = chain
+    print("DBG", chain)
+    assert out_of_core["total_claims"] == memory["total_claims"] > 0
+    assert out_of_core["suspicious_count"] == memory["suspicious_count"]
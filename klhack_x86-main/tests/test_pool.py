@@ -0,0 +1,33 @@
+from fraud_detection_agent.database.pool import ConnectionPool
+
+
+def test_second_close_is_ignored(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_size=2)
+    with pool.connection() as conn:
+        conn.close()  # explicit close, then the context manager's
+    assert pool.metrics()["in_use"] == 0
+    assert pool.metrics()["idle"] == 1
+
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    first.close()
+    second.close()
+    assert (pool.metrics()["in_use"], pool.metrics()["idle"], pool.metrics()["opened"]) == (0, 2, 2)
+
+
+def test_connection_from_before_close_all_is_not_pooled(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_size=2)
+    held = pool.acquire()
+    pool.acquire().close()
+    pool.close_all()
+    held.close()
+    metrics = pool.metrics()
+    assert (metrics["in_use"], metrics["idle"], metrics["opened"]) == (0, 0, 0)
+
+    # Handed out again after being released: a new close returns it once more
+    conn = pool.acquire()
+    assert conn is not held
+    conn.close()
+    conn = pool.acquire()
+    conn.close()
+    assert pool.metrics()["idle"] == 1
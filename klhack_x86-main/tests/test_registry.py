@@ -0,0 +1,44 @@
+import json
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fraud_detection_agent.models.anomaly_model import HistogramDetector
+from fraud_detection_agent.models.registry import META_NAME, MODEL_NAME, ModelRegistry, fit_or_load
+
+
+class _Missing:
+    pass
+
+
+def _stale_sklearn(path: Path) -> None:
+    meta = json.loads((path / META_NAME).read_text(encoding="utf-8"))
+    meta["sklearn_version"] = "0.0.1"
+    (path / META_NAME).write_text(json.dumps(meta), encoding="utf-8")
+
+
+def _truncated(path: Path) -> None:
+    (path / MODEL_NAME).write_bytes(b"\x80\x04not a pickle")
+
+
+def _unknown_module(path: Path) -> None:
+    # A class the unpickler cannot import (e.g. renamed since the save)
+    (path / MODEL_NAME).write_bytes(pickle.dumps(_Missing(), protocol=0).replace(_Missing.__module__.encode(), b"no_such_module"))
+
+
+@pytest.mark.parametrize("damage", [_stale_sklearn, _truncated, _unknown_module])
+def test_unusable_versions_are_refitted(tmp_path, damage):
+    X = pd.DataFrame(np.random.default_rng(0).random((200, 3)), columns=["a", "b", "c"])
+    registry = ModelRegistry(tmp_path)
+    _, _, first = fit_or_load(X, registry=registry, detector=HistogramDetector())
+    _, _, again = fit_or_load(X, registry=registry, detector=HistogramDetector())
+    assert (first["source"], again["source"]) == ("fit", "registry")
+
+    damage(Path(first["path"]))
+    assert registry.load(first["fingerprint"]) is None
+    _, results, refit = fit_or_load(X, registry=registry, detector=HistogramDetector())
+    assert refit["source"] == "fit"
+    assert len(results.combined_score) == len(X)
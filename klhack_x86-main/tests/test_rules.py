@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+from fraud_detection_agent.database.db_setup import generate_mock_claims
+from fraud_detection_agent.scoring.batch_scoring import SCORED_COLUMNS
+
+
+def test_scoring_a_batch_keeps_the_build_rule_stats(pipeline):
+    from fraud_detection_agent import main
+
+    client = TestClient(main.app)
+    before = client.get("/get-rule-stats").json()["last_evaluation"]
+    claims = pipeline["claims_all"]
+    for name, stats in before["rules"].items():
+        assert stats["flagged"] == int(claims[name].sum())
+
+    records = generate_mock_claims(n_rows=20)
+    records["claim_id"] = "NEW_" + records["claim_id"]
+    records["admission_date"] = records["admission_date"].astype(str)
+    fields = list(main.ClaimRecord.model_fields)
+    response = client.post("/score-claims", json={"claims": records[fields].to_dict(orient="records")})
+    assert response.status_code == 200
+    assert list(response.json()[0]) == SCORED_COLUMNS
+
+    assert client.get("/get-rule-stats").json()["last_evaluation"] == before
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from fraud_detection_agent.database.db_setup import CLAIM_COLUMNS, generate_mock_claims
+from fraud_detection_agent.database.schema import NORMALIZED_SCHEMA_DDL, is_normalized, migrate_to_normalized
+
+
+def _legacy_db(claims: pd.DataFrame) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    claims.to_sql("claims", conn, index=False)
+    return conn
+
+
+def test_migration_keeps_rows_with_missing_values():
+    claims = generate_mock_claims(n_rows=200)[CLAIM_COLUMNS]
+    claims["claim_amount"] = claims["claim_amount"].astype(float)
+    claims.loc[0, "hospital_id"] = None
+    claims.loc[1, "procedure_code"] = None
+    claims.loc[2, ["district", "state"]] = None
+    claims.loc[3, "patient_id"] = None
+    claims.loc[4, "claim_amount"] = None
+    claims.loc[5, "admission_date"] = "not a date"
+    claims.loc[6, ["discharge_date", "length_of_stay"]] = None
+    conn = _legacy_db(claims)
+
+    assert migrate_to_normalized(conn) == len(claims)
+    assert is_normalized(conn)
+    migrated = pd.read_sql_query("SELECT * FROM claims", conn)
+    assert migrated["claim_id"].tolist() == claims["claim_id"].tolist()
+    assert migrated.loc[0, "hospital_id"] == "Unknown"
+    assert migrated.loc[1, "procedure_code"] == "Unknown"
+    assert (migrated.loc[2, "district"], migrated.loc[2, "state"]) == ("Unknown", "Unknown")
+    assert pd.isna(migrated.loc[3, "patient_id"])
+    assert pd.isna(migrated.loc[4, "claim_amount"])
+    assert pd.isna(migrated.loc[5, "admission_date"])
+    assert pd.isna(migrated.loc[6, "discharge_date"]) and pd.isna(migrated.loc[6, "length_of_stay"])
+    untouched = migrated.iloc[7:].reset_index(drop=True)
+    expected = claims.iloc[7:].reset_index(drop=True)
+    pd.testing.assert_frame_equal(untouched[CLAIM_COLUMNS], expected, check_dtype=False)
+
+
+def test_migration_keeps_the_source_when_rows_would_be_lost():
+    claims = generate_mock_claims(n_rows=20)[CLAIM_COLUMNS]
+    conn = _legacy_db(claims)
+    for ddl in NORMALIZED_SCHEMA_DDL:
+        conn.execute(ddl)
+    # Silently skip one fact, as a join on a missing key used to
+    conn.execute(
+        "CREATE TRIGGER skip_fact BEFORE INSERT ON claim_facts WHEN NEW.claim_id = ? "
+        "BEGIN SELECT RAISE(IGNORE); END".replace("?", f"'{claims.loc[0, 'claim_id']}'")
+    )
+
+    with pytest.raises(RuntimeError, match="source table kept"):
+        migrate_to_normalized(conn)
+    assert not is_normalized(conn)
+    assert conn.execute("SELECT count(*) FROM claims").fetchone()[0] == len(claims)
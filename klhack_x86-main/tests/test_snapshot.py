@@ -0,0 +1,48 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from fraud_detection_agent.database import snapshot
+from fraud_detection_agent.database.db_setup import CLAIM_COLUMNS, generate_mock_claims, get_claims_version
+
+
+@pytest.fixture
+def claims_with_nulls():
+    claims = generate_mock_claims(n_rows=300)[CLAIM_COLUMNS]
+    claims["claim_amount"] = claims["claim_amount"].astype(float)
+    # Nulls well past the first read chunk as well as in it
+    for row in (3, 250):
+        claims.loc[row, ["claim_id", "patient_id", "district"]] = None
+        claims.loc[row, ["claim_amount", "length_of_stay"]] = None
+    conn = sqlite3.connect(":memory:")
+    claims.to_sql("claims", conn, index=False)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("from_frame", [False, True])
+def test_snapshot_round_trips_nulls(claims_with_nulls, tmp_path, monkeypatch, from_frame):
+    conn = claims_with_nulls
+    monkeypatch.setattr(snapshot, "_READ_CHUNK_ROWS", 100)
+    expected = pd.read_sql_query("SELECT * FROM claims", conn)
+    snapshot.write_claims_snapshot(conn, df=expected if from_frame else None, snapshot_dir=tmp_path)
+
+    loaded = snapshot.load_claims_snapshot(version=get_claims_version(conn), snapshot_dir=tmp_path)
+    pd.testing.assert_frame_equal(loaded, expected)
+    assert loaded["claim_amount"].isna().sum() == 2
+    assert loaded["patient_id"].isna().sum() == 2
+
+    categorical = snapshot.load_claims_snapshot(
+        ["patient_id", "district"], snapshot_dir=tmp_path, categorical=["patient_id", "district"]
+    )
+    for c in ("patient_id", "district"):
+        assert categorical[c].isna().sum() == 2
+        pd.testing.assert_series_equal(categorical[c].astype(object), expected[c].astype(object))
+
+
+def test_older_snapshot_format_is_not_used(claims_with_nulls, tmp_path, monkeypatch):
+    snapshot.write_claims_snapshot(claims_with_nulls, snapshot_dir=tmp_path)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_FORMAT", snapshot.SNAPSHOT_FORMAT + 1)
+    assert snapshot.load_claims_snapshot(snapshot_dir=tmp_path) is None
+    assert snapshot.write_claims_snapshot(claims_with_nulls, snapshot_dir=tmp_path)
@@ -0,0 +1,32 @@
+from fraud_detection_agent.scoring.summary_cube import RULE_MEASURES
+
+from reference import assert_same, location_filters, mask_summary
+
+
+def test_cube_matches_claim_level_summary(pipeline):
+    claims, hospitals = pipeline["claims_all"], pipeline["hospital_risk_all"]
+    cube = pipeline["summary_cube"]
+    requests = location_filters(hospitals)
+    # Every hospital's own (type, state, district) filter is among them
+    located = hospitals[["hospital_type", "state", "district"]].astype(str).itertuples(index=False, name=None)
+    assert set(located) <= set(requests)
+    for request in requests:
+        assert_same(cube.summary(*request), mask_summary(claims, hospitals, *request, RULE_MEASURES))
+
+
+def test_unknown_filter_is_empty(pipeline):
+    summary = pipeline["summary_cube"].summary(state="Nowhere")
+    assert summary["stats"] == {
+        "total_claims": 0, "suspicious_claims": 0, "total_hospitals": 0, "total_fraud_amount": 0.0
+    }
+    assert summary["monthly_trends"] == [] and summary["hosp_type_risk"] == []
+
+
+def test_summary_endpoint_serves_the_cube(pipeline):
+    from fastapi.testclient import TestClient
+
+    from fraud_detection_agent import main
+
+    response = TestClient(main.app).get("/get-summary", params={"hospital_type": "Private", "state": "Delhi"})
+    assert response.status_code == 200
+    assert_same(response.json(), pipeline["summary_cube"].summary("Private", "Delhi", "All"))